@@ -0,0 +1,757 @@
+import math
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from threading import Barrier, Thread
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport.datasets import DEFAULT_START, DatasetGenerator
+from airport.models import (
+    Airport,
+    Route,
+    Crew,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+)
+
+# DatasetGenerator options per dataset size
+DATASET_SIZES = {
+    "small": {
+        "airports": 20,
+        "airplanes": 20,
+        "flights_per_airplane": 20,
+        "users": 100,
+        "orders": 2000,
+    },
+    "medium": {
+        "airports": 100,
+        "airplanes": 200,
+        "flights_per_airplane": 50,
+        "users": 1000,
+        "orders": 50000,
+    },
+    "large": {
+        "airports": 300,
+        "airplanes": 1000,
+        "flights_per_airplane": 100,
+        "users": 10000,
+        "orders": 1000000,
+    },
+}
+TIME_METRICS = ("p50_ms", "p95_ms")
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "airport-benchmark",
+    }
+}
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty sequence"""
+    values = sorted(values)
+    rank = math.ceil(percent / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, started, time.perf_counter())
+
+    def record(self, sql, started, ended):
+        self.count += 1
+        self.seconds += ended - started
+
+
+class TransactionRecorder(QueryRecorder):
+    """
+    Also records the span from the first to the last query of a request,
+    which covers its transaction, and the time spent waiting in row
+    locks (SELECT ... FOR UPDATE)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock_wait = 0.0
+        self.first_started = self.last_ended = None
+
+    def record(self, sql, started, ended):
+        super().record(sql, started, ended)
+        if self.first_started is None:
+            self.first_started = started
+        self.last_ended = ended
+        if "FOR UPDATE" in sql:
+            self.lock_wait += ended - started
+
+    @property
+    def span(self):
+        if self.first_started is None:
+            return 0.0
+        return self.last_ended - self.first_started
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Runs the block against a fresh test database, like the test runner,
+    and a private local memory cache, so benchmarks never write to the
+    configured database nor clear a shared (Redis) cache
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+def seed_dataset(size, seed=0):
+    """Empties the database and generates a dataset of the given size"""
+    call_command("flush", interactive=False, verbosity=0)
+    cache.clear()
+    return DatasetGenerator(seed=seed, **DATASET_SIZES[size]).generate()
+
+
+def measure_request(
+        client,
+        path,
+        iterations,
+        warmup=1,
+        warm_cache=False,
+        data=None,
+):
+    """
+    Requests `path` `warmup + iterations` times and summarizes the
+    measured ones. Unless `warm_cache` is set the response cache is
+    cleared before every request, so the numbers cover the full read
+    path.
+
+    With `data` the request is a JSON POST run in a transaction that is
+    rolled back, so every iteration sees the same database.
+    """
+    durations = []
+    sql_durations = []
+    queries = []
+    size = status_code = None
+    for iteration in range(warmup + iterations):
+        if not warm_cache:
+            cache.clear()
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with (
+                transaction.atomic() if data is not None else nullcontext()
+        ):
+            with connection.execute_wrapper(recorder):
+                if data is None:
+                    response = client.get(path)
+                else:
+                    response = client.post(path, data, format="json")
+                content = (
+                    b"".join(response.streaming_content)
+                    if response.streaming
+                    else response.content
+                )
+            if data is not None:
+                transaction.set_rollback(True)
+        elapsed = time.perf_counter() - started
+        if iteration < warmup:
+            continue
+        durations.append(elapsed)
+        sql_durations.append(recorder.seconds)
+        queries.append(recorder.count)
+        size = len(content)
+        status_code = response.status_code
+
+    return {
+        "path": path,
+        "status": status_code,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p95_ms": percentile(durations, 95) * 1000,
+        "queries": max(queries),
+        "sql_ms": percentile(sql_durations, 50) * 1000,
+        "bytes": size,
+    }
+
+
+def read_scenarios(customer):
+    """
+    Names and paths of the read actions to measure, with ids picked from
+    the current data; returns (name, path, admin) triples
+    """
+    flight = Flight.objects.order_by("id")[Flight.objects.count() // 2]
+    route = flight.route
+    # the airplane's next flight makes a connection for the itineraries
+    connection_flight = (
+        Flight.objects
+        .filter(
+            airplane_id=flight.airplane_id,
+            departure_time__gt=flight.departure_time
+        )
+        .select_related("route")
+        .order_by("departure_time")
+        .first()
+    ) or flight
+    airplane = flight.airplane
+    order = customer.orders.order_by("id").first()
+    day = timezone.localdate(flight.departure_time)
+    date_range = (
+        f"date_from={day}&date_to={day + timedelta(days=30)}"
+    )
+
+    def url(name, *args):
+        return reverse(f"airport:{name}", args=args)
+
+    return [
+        ("airports-list", url("airport-list"), False),
+        ("airports-retrieve", url("airport-detail", route.source_id), False),
+        ("routes-list", url("route-list"), False),
+        (
+            "routes-list-filtered",
+            f"{url('route-list')}?source={route.source_id}",
+            False,
+        ),
+        ("routes-retrieve", url("route-detail", route.id), False),
+        ("crew-list", url("crew-list"), False),
+        ("airplane-types-list", url("airplanetype-list"), False),
+        ("airplanes-list", url("airplane-list"), False),
+        ("airplanes-retrieve", url("airplane-detail", airplane.id), False),
+        (
+            "airplanes-timeline",
+            f"{url('airplane-timeline', airplane.id)}?{date_range}",
+            False,
+        ),
+        ("flights-list", url("flight-list"), False),
+        (
+            "flights-list-filtered",
+            f"{url('flight-list')}?date={day}"
+            f"&source={route.source_id}&destination={route.destination_id}",
+            False,
+        ),
+        ("flights-list-keyset", f"{url('flight-list')}?cursor=", False),
+        ("flights-retrieve", url("flight-detail", flight.id), False),
+        (
+            "flights-retrieve-bitmap",
+            f"{url('flight-detail', flight.id)}?seat_format=bitmap",
+            False,
+        ),
+        ("orders-list", url("order-list"), False),
+        ("orders-list-keyset", f"{url('order-list')}?cursor=", False),
+        ("orders-retrieve", url("order-detail", order.id), False),
+        (
+            "itineraries-list",
+            f"{url('itinerary-list')}?source={route.source_id}"
+            f"&destination={connection_flight.route.destination_id}"
+            f"&date={day}",
+            False,
+        ),
+        (
+            "route-loads-list",
+            f"{url('route-load-list')}?{date_range}",
+            True,
+        ),
+        (
+            "route-loads-list-by-route",
+            f"{url('route-load-list')}?{date_range}&group_by=route",
+            True,
+        ),
+    ]
+
+
+def run_read_benchmark(sizes, iterations=20, warm_cache=False, seed=0):
+    """
+    Seeds every dataset size in turn and measures each read scenario
+    in-process through the test client; returns results keyed
+    "<size>/<scenario>"
+    """
+    results = {}
+    for size in sizes:
+        seed_dataset(size, seed)
+        customer = get_user_model().objects.get(
+            pk=Order.objects.values("user").annotate(
+                orders=Count("id")
+            ).order_by("-orders", "user")[0]["user"]
+        )
+        admin = get_user_model().objects.create_superuser(
+            email="benchmark-admin@example.com", password="benchmark"
+        )
+        clients = {}
+        for is_admin, user in ((False, customer), (True, admin)):
+            clients[is_admin] = APIClient()
+            clients[is_admin].force_authenticate(user)
+
+        for name, path, is_admin in read_scenarios(customer):
+            results[f"{size}/{name}"] = measure_request(
+                clients[is_admin], path, iterations, warm_cache=warm_cache
+            )
+    return results
+
+
+def format_results(results):
+    """Lines of a plain-text table of request measurements"""
+    yield (
+        f"{'scenario':<40} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'queries':>7} {'sql ms':>9} {'bytes':>9} {'status':>6}"
+    )
+    for key, result in results.items():
+        yield (
+            f"{key:<40} {result['p50_ms']:>9.2f} "
+            f"{result['p95_ms']:>9.2f} {result['queries']:>7} "
+            f"{result['sql_ms']:>9.2f} {result['bytes']:>9} "
+            f"{result['status']:>6}"
+        )
+
+
+def compare_results(previous, current, threshold=0.2):
+    """
+    Lists regressions between two result sets: latency metrics that grew
+    by more than `threshold` (a fraction) and any added query
+    """
+    regressions = []
+    for key, result in current.items():
+        baseline = previous.get(key)
+        if baseline is None:
+            continue
+        for metric in TIME_METRICS:
+            if result[metric] > baseline[metric] * (1 + threshold):
+                regressions.append(
+                    (key, metric, baseline[metric], result[metric])
+                )
+        if result["queries"] > baseline["queries"]:
+            regressions.append(
+                (key, "queries", baseline["queries"], result["queries"])
+            )
+    return regressions
+
+
+BOOKING_MODES = ("seats", "auto-assign")
+
+
+def _summary(values, scale=1000):
+    if not values:
+        return {"p50": None, "p95": None}
+    return {
+        "p50": percentile(values, 50) * scale,
+        "p95": percentile(values, 95) * scale,
+    }
+
+
+class BookingWorker(Thread):
+    """
+    Books orders through the API as one JWT-authenticated user, on its
+    own database connection.
+
+    In "seats" mode every order asks for random seats and is retried
+    with new ones when a seat turns out to be taken; in "auto-assign"
+    mode the server picks the seats and a 400 means the flight is full.
+    """
+
+    def __init__(
+            self,
+            user,
+            flights,
+            orders,
+            tickets_per_order,
+            max_retries,
+            mode,
+            barrier,
+            seed,
+    ):
+        super().__init__()
+        self.user = user
+        self.flights = flights
+        self.orders = orders
+        self.tickets_per_order = tickets_per_order
+        self.max_retries = max_retries
+        self.mode = mode
+        self.barrier = barrier
+        self.random = random.Random(seed)
+        self.stats = {
+            "orders": 0,
+            "attempts": 0,
+            "conflicts": 0,
+            "retries": 0,
+            "abandoned": 0,
+            "errors": 0,
+        }
+        self.latencies = []
+        self.transactions = []
+        self.lock_waits = []
+
+    def run(self):
+        self.client = APIClient()
+        try:
+            self.barrier.wait()
+            for _ in range(self.orders):
+                if not self.book():
+                    break
+        finally:
+            connection.close()
+
+    def request_data(self, flight):
+        if self.mode == "auto-assign":
+            return reverse("airport:order-auto-assign"), {
+                "flight": flight.id,
+                "seats": self.tickets_per_order,
+            }
+
+        places = self.random.sample(
+            range(flight.airplane.capacity), self.tickets_per_order
+        )
+        seats_in_row = flight.airplane.seats_in_row
+        return reverse("airport:order-list"), {
+            "tickets": [
+                {
+                    "flight": flight.id,
+                    "row": place // seats_in_row + 1,
+                    "seat": place % seats_in_row + 1,
+                }
+                for place in places
+            ]
+        }
+
+    def post(self, path, data):
+        # a fresh token per request, so long runs outlive its lifetime
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        recorder = TransactionRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.client.post(path, data, format="json")
+        self.latencies.append(time.perf_counter() - started)
+        self.transactions.append(recorder.span)
+        self.lock_waits.append(recorder.lock_wait)
+        self.stats["attempts"] += 1
+        return response
+
+    def book(self):
+        """Places one order; returns False when the worker should stop"""
+        flight = self.random.choice(self.flights)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+            response = self.post(*self.request_data(flight))
+            if response.status_code == status.HTTP_201_CREATED:
+                self.stats["orders"] += 1
+                return True
+            if response.status_code != status.HTTP_400_BAD_REQUEST:
+                self.stats["errors"] += 1
+                return False
+            if self.mode == "auto-assign":
+                # no seats left on the flight
+                self.stats["abandoned"] += 1
+                return True
+            self.stats["conflicts"] += 1
+
+        self.stats["abandoned"] += 1
+        return True
+
+
+def seed_booking_flights(flights, users, seed=0):
+    """Generates `flights` bookable flights and `users` customers"""
+    call_command("flush", interactive=False, verbosity=0)
+    cache.clear()
+    DatasetGenerator(
+        seed=seed,
+        airports=max(flights, 2),
+        routes_per_airport=1,
+        airplanes=flights,
+        crew=4,
+        flights_per_airplane=1,
+        users=users,
+        orders=0,
+    ).generate()
+    return (
+        list(Flight.objects.select_related("airplane").order_by("id")),
+        list(get_user_model().objects.order_by("id")),
+    )
+
+
+def run_booking_benchmark(
+        workers=8,
+        orders=50,
+        flights=2,
+        tickets_per_order=2,
+        max_retries=3,
+        mode="seats",
+        seed=0,
+):
+    """
+    Starts `workers` threads at once, each placing `orders` orders on
+    the same few flights, and summarizes throughput and contention
+    """
+    flight_list, users = seed_booking_flights(flights, workers, seed)
+    barrier = Barrier(workers + 1)
+    threads = [
+        BookingWorker(
+            user,
+            flight_list,
+            orders,
+            tickets_per_order,
+            max_retries,
+            mode,
+            barrier,
+            seed * 1000 + index,
+        )
+        for index, user in enumerate(users)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals = {
+        name: sum(thread.stats[name] for thread in threads)
+        for name in threads[0].stats
+    }
+    attempts = totals["attempts"] or 1
+    lock_waits = [
+        wait for thread in threads for wait in thread.lock_waits
+    ]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "flights": flights,
+        "tickets_per_order": tickets_per_order,
+        "seconds": elapsed,
+        **totals,
+        "orders_per_second": totals["orders"] / elapsed,
+        "conflict_rate": totals["conflicts"] / attempts,
+        "retry_rate": totals["retries"] / attempts,
+        "latency_ms": _summary(
+            [value for thread in threads for value in thread.latencies]
+        ),
+        "transaction_ms": _summary(
+            [value for thread in threads for value in thread.transactions]
+        ),
+        "lock_wait_ms": {
+            **_summary(lock_waits),
+            "total": sum(lock_waits) * 1000,
+        },
+        "inventory_consistent": not (
+            Flight.objects
+            .annotate(tickets_sold=Count("tickets"))
+            .exclude(tickets_sold=F("seats_sold"))
+            .exists()
+        ),
+    }
+
+
+SCHEDULING_HISTORIES = (10, 100, 1000, 10000, 100000)
+SCHEDULING_FANOUTS = (5, 50, 500, 5000)
+SCHEDULING_FLIGHT_TIME = timedelta(hours=1)
+SCHEDULING_TURNAROUND = timedelta(hours=4)
+
+
+class SchedulingFixture:
+    """
+    Grows the two inputs of flight validation: the flight history of one
+    airplane and the number of routes leaving the airport another
+    airplane last landed at
+    """
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.admin = get_user_model().objects.create_superuser(
+            email="benchmark-admin@example.com", password="benchmark"
+        )
+        airplane_type, _ = AirplaneType.objects.get_or_create(
+            name="Benchmark"
+        )
+        self.crew = Crew.objects.create(first_name="Bench", last_name="Mark")
+        self.airports = Airport.objects.bulk_create(
+            [
+                Airport(name=f"BENCH-{name}", closest_big_city=name)
+                for name in ("A", "B", "HUB")
+            ]
+        )
+        first, second, self.hub = self.airports
+        self.routes = Route.objects.bulk_create(
+            [
+                Route(source=first, destination=second, distance=500),
+                Route(source=second, destination=first, distance=500),
+                Route(source=first, destination=self.hub, distance=500),
+            ]
+        )
+        self.history_airplane, self.fanout_airplane = (
+            Airplane.objects.bulk_create(
+                [
+                    Airplane(
+                        name=f"BENCH-{name}",
+                        rows=30,
+                        seats_in_row=6,
+                        airplane_type=airplane_type
+                    )
+                    for name in ("HISTORY", "FANOUT")
+                ]
+            )
+        )
+        self.history = []
+        self.fanout = 0
+        self.next_departure = DEFAULT_START
+        self._add_flights(self.fanout_airplane, [self.routes[2]])
+
+    def _add_flights(self, airplane, routes):
+        flights = []
+        for route in routes:
+            flights.append(
+                Flight(
+                    route=route,
+                    airplane=airplane,
+                    departure_time=self.next_departure,
+                    arrival_time=self.next_departure + SCHEDULING_FLIGHT_TIME,
+                    seats_available=airplane.capacity,
+                )
+            )
+            self.next_departure += (
+                SCHEDULING_FLIGHT_TIME + SCHEDULING_TURNAROUND
+            )
+        return Flight.objects.bulk_create(flights, batch_size=self.batch_size)
+
+    def _flight_data(self, airplane, route):
+        return {
+            "route": route.id,
+            "airplane": airplane.id,
+            "departure_time": self.next_departure.isoformat(),
+            "arrival_time": (
+                self.next_departure + SCHEDULING_FLIGHT_TIME
+            ).isoformat(),
+            "crew": [self.crew.id],
+        }
+
+    def grow_history(self, size):
+        """Adds chained flights until the airplane has `size` of them"""
+        count = size - len(self.history)
+        if count > 0:
+            self.history.extend(
+                self._add_flights(
+                    self.history_airplane,
+                    (
+                        self.routes[(len(self.history) + index) % 2]
+                        for index in range(count)
+                    )
+                )
+            )
+
+    def next_flight_data(self):
+        """A valid next flight of the airplane with the history"""
+        return self._flight_data(
+            self.history_airplane, self.routes[len(self.history) % 2]
+        )
+
+    def grow_fanout(self, size):
+        """Adds airports and routes until `size` routes leave the hub"""
+        count = size - self.fanout
+        if count > 0:
+            destinations = Airport.objects.bulk_create(
+                [
+                    Airport(
+                        name=f"BENCH-D{self.fanout + index}",
+                        closest_big_city="Benchmark"
+                    )
+                    for index in range(count)
+                ],
+                batch_size=self.batch_size
+            )
+            Route.objects.bulk_create(
+                [
+                    Route(
+                        source=self.hub,
+                        destination=destination,
+                        distance=500
+                    )
+                    for destination in destinations
+                ],
+                batch_size=self.batch_size
+            )
+            self.fanout = size
+
+    def misplaced_flight_data(self):
+        """
+        A flight of the airplane parked at the hub that departs from
+        elsewhere, so the error lists every route leaving the hub
+        """
+        return self._flight_data(self.fanout_airplane, self.routes[0])
+
+
+def run_scheduling_benchmark(
+        histories=SCHEDULING_HISTORIES,
+        fanouts=SCHEDULING_FANOUTS,
+        iterations=10,
+):
+    """
+    Measures flight creation through the API while the airplane history
+    and the airport fan-out grow; returns results keyed
+    "history/<flights>" and "fanout/<routes>"
+    """
+    fixture = SchedulingFixture()
+    client = APIClient()
+    client.force_authenticate(fixture.admin)
+    path = reverse("airport:flight-list")
+
+    results = {}
+    for size in sorted(histories):
+        fixture.grow_history(size)
+        results[f"history/{size}"] = measure_request(
+            client, path, iterations, data=fixture.next_flight_data()
+        )
+    for size in sorted(fanouts):
+        fixture.grow_fanout(size)
+        results[f"fanout/{size}"] = measure_request(
+            client, path, iterations, data=fixture.misplaced_flight_data()
+        )
+    return results
+
+
+def scaling_summary(results):
+    """
+    Compares the smallest and largest size of every "<series>/<size>"
+    series; yields (series, sizes, p50 ratio, queries) tuples
+    """
+    series = {}
+    for key, result in results.items():
+        name, size = key.rsplit("/", 1)
+        series.setdefault(name, []).append((int(size), result))
+    for name, sized in series.items():
+        (smallest, first), (largest, last) = min(sized), max(sized)
+        yield (
+            name,
+            (smallest, largest),
+            last["p50_ms"] / first["p50_ms"],
+            (first["queries"], last["queries"]),
+        )
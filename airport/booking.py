@@ -0,0 +1,344 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from airport.models import Flight, Order, RouteDailyLoad, SeatHold, Ticket
+from airport.seating import SeatMap
+
+MAX_HELD_SEATS_PER_FLIGHT = 10
+
+
+def _seat_taken_error(flight_id, row, seat):
+    return {
+        "non_field_errors": [
+            f"Seat (row: {row}, seat: {seat}) is already taken "
+            f"on flight {flight_id}."
+        ]
+    }
+
+
+def _purge_expired_holds(flight, now):
+    """
+    Drops the expired holds of a locked flight from its hold map.
+
+    The holds table is only read once `holds_expire_at` has passed.
+    Returns the hold map, the number of released seats and the next
+    expiry time.
+    """
+    hold_map = SeatMap.holds_for_flight(flight)
+    if flight.holds_expire_at is None or flight.holds_expire_at > now:
+        return hold_map, 0, flight.holds_expire_at
+
+    expired = SeatHold.objects.filter(flight_id=flight.id, expires_at__lte=now)
+    released = 0
+    for seats in expired.values_list("seats", flat=True):
+        for place in seats:
+            hold_map.release(place["row"], place["seat"])
+            released += 1
+    expired.delete()
+    return hold_map, released, _next_hold_expiry(flight.id)
+
+
+def _next_hold_expiry(flight_id):
+    return (
+        SeatHold.objects
+        .filter(flight_id=flight_id)
+        .aggregate(holds_expire_at=Min("expires_at"))["holds_expire_at"]
+    )
+
+
+def hide_expired_holds(flight, now=None):
+    """
+    Drops the expired holds of a flight from its in-memory hold map and
+    counters without writing, for safe requests.
+
+    The expired rows stay until a write path or the
+    `release_expired_holds` command purges them. Returns whether any
+    hold had expired.
+    """
+    now = now or timezone.now()
+    if flight.holds_expire_at is None or flight.holds_expire_at > now:
+        return False
+
+    hold_map = SeatMap.holds_for_flight(flight)
+    released = 0
+    for seats in (
+            SeatHold.objects
+            .filter(flight_id=flight.id, expires_at__lte=now)
+            .values_list("seats", flat=True)
+    ):
+        for place in seats:
+            hold_map.release(place["row"], place["seat"])
+            released += 1
+    flight.hold_map = hold_map.to_bytes()
+    flight.seats_held -= released
+    flight.seats_available += released
+    return True
+
+
+def release_expired_holds(flight_ids=None):
+    """Releases the expired holds of the given (by default all) flights"""
+    now = timezone.now()
+    flights = Flight.objects.filter(holds_expire_at__lte=now)
+    if flight_ids is not None:
+        flights = flights.filter(pk__in=flight_ids)
+
+    released = 0
+    with transaction.atomic():
+        locked = Flight.lock_seat_inventory(
+            flights.values_list("pk", flat=True)
+        )
+        for flight in locked.values():
+            hold_map, flight_released, holds_expire_at = (
+                _purge_expired_holds(flight, now)
+            )
+            if (
+                    flight_released
+                    or holds_expire_at != flight.holds_expire_at
+            ):
+                Flight.write_seat_inventory(
+                    flight,
+                    hold_map=hold_map,
+                    held_delta=-flight_released,
+                    holds_expire_at=holds_expire_at
+                )
+            released += flight_released
+    return released
+
+
+def book_tickets(order, tickets_data):
+    """
+    Inserts the tickets of an order with a single bulk INSERT and updates
+    the seat inventory of every flight once.
+
+    Must run inside a transaction. The flights are row-locked in id order
+    first, so bookings of the same flight run one after another and
+    requested seats are checked against the seat map before inserting.
+    A seat requested twice, already sold or held by an active seat hold
+    is reported per ticket as a ValidationError aligned with
+    `tickets_data`. The shared route daily loads are updated last, in
+    (route, date) order, so orders spanning the same route-days cannot
+    deadlock either.
+    """
+    seats = [
+        (ticket_data["flight"].id, ticket_data["row"], ticket_data["seat"])
+        for ticket_data in tickets_data
+    ]
+
+    errors = [{} for _ in seats]
+    first_index = {}
+    for index, seat in enumerate(seats):
+        if seat in first_index:
+            errors[index] = _seat_taken_error(*seat)
+        else:
+            first_index[seat] = index
+    if any(errors):
+        raise ValidationError({"tickets": errors})
+
+    now = timezone.now()
+    flights = Flight.lock_seat_inventory({seat[0] for seat in seats})
+    seat_maps = {}
+    holds = {}
+    for flight_id, flight in flights.items():
+        seat_maps[flight_id] = SeatMap.for_flight(flight)
+        holds[flight_id] = _purge_expired_holds(flight, now)
+    for index, (flight_id, row, seat) in enumerate(seats):
+        if (
+                seat_maps[flight_id].is_taken(row, seat)
+                or holds[flight_id][0].is_taken(row, seat)
+        ):
+            errors[index] = _seat_taken_error(flight_id, row, seat)
+    if any(errors):
+        raise ValidationError({"tickets": errors})
+
+    tickets = [
+        Ticket(order=order, flight_id=flight_id, row=row, seat=seat)
+        for flight_id, row, seat in seats
+    ]
+    try:
+        with transaction.atomic():
+            Ticket.objects.bulk_create(tickets)
+    except IntegrityError as exc:
+        taken_seats = Q()
+        for flight_id, row, seat in seats:
+            taken_seats |= Q(flight_id=flight_id, row=row, seat=seat)
+        for seat in (
+                Ticket.objects
+                .filter(taken_seats)
+                .values_list("flight_id", "row", "seat")
+        ):
+            errors[first_index[seat]] = _seat_taken_error(*seat)
+        if not any(errors):
+            raise
+        raise ValidationError({"tickets": errors}) from exc
+
+    seats_sold = defaultdict(int)
+    for flight_id, row, seat in seats:
+        seat_maps[flight_id].occupy(row, seat)
+        seats_sold[flight_id] += 1
+    route_loads = {}
+    for flight_id, seats_delta in sorted(seats_sold.items()):
+        hold_map, released, holds_expire_at = holds[flight_id]
+        Flight.write_seat_inventory(
+            flights[flight_id],
+            seat_maps[flight_id],
+            seats_delta,
+            hold_map=hold_map,
+            held_delta=-released,
+            route_loads=route_loads,
+            holds_expire_at=holds_expire_at
+        )
+    RouteDailyLoad.add_seats_sold(route_loads)
+
+    return tickets
+
+
+def hold_seats(user, flight, places, expires_at):
+    """
+    Holds free (row, seat) places of a flight until `expires_at`.
+
+    A user can hold at most `MAX_HELD_SEATS_PER_FLIGHT` seats of a
+    flight at a time; the count is taken under the flight lock.
+
+    The seats are marked in the flight's hold map, which keeps the
+    availability counters and the seat map accurate without reading the
+    holds table.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        flight = Flight.lock_seat_inventory([flight.id])[flight.id]
+        seat_map = SeatMap.for_flight(flight)
+        hold_map, released, holds_expire_at = _purge_expired_holds(
+            flight, now
+        )
+
+        held = sum(
+            len(seats)
+            for seats in SeatHold.objects
+            .filter(user=user, flight_id=flight.id, expires_at__gt=now)
+            .values_list("seats", flat=True)
+        )
+        if held + len(places) > MAX_HELD_SEATS_PER_FLIGHT:
+            raise ValidationError(
+                {
+                    "seats": f"At most {MAX_HELD_SEATS_PER_FLIGHT} seats "
+                             f"of a flight can be held at once; "
+                             f"{held} are already held."
+                }
+            )
+
+        errors = [
+            _seat_taken_error(flight.id, row, seat)
+            if seat_map.is_taken(row, seat) or hold_map.is_taken(row, seat)
+            else {}
+            for row, seat in places
+        ]
+        if any(errors):
+            raise ValidationError({"seats": errors})
+
+        hold = SeatHold.objects.create(
+            flight=flight,
+            user=user,
+            seats=[{"row": row, "seat": seat} for row, seat in places],
+            expires_at=expires_at
+        )
+        for row, seat in places:
+            hold_map.occupy(row, seat)
+        Flight.write_seat_inventory(
+            flight,
+            hold_map=hold_map,
+            held_delta=len(places) - released,
+            holds_expire_at=min(
+                filter(None, (holds_expire_at, expires_at))
+            )
+        )
+        return hold
+
+
+def _release_hold(hold):
+    """Releases a hold of a flight already locked by the caller"""
+    flight = Flight.lock_seat_inventory([hold.flight_id])[hold.flight_id]
+    hold_map, released, holds_expire_at = _purge_expired_holds(
+        flight, timezone.now()
+    )
+    deleted, _ = SeatHold.objects.filter(pk=hold.pk).delete()
+    if deleted:
+        for row, seat in hold.places:
+            hold_map.release(row, seat)
+        released += len(hold.places)
+        holds_expire_at = _next_hold_expiry(flight.id)
+    if released:
+        Flight.write_seat_inventory(
+            flight,
+            hold_map=hold_map,
+            held_delta=-released,
+            holds_expire_at=holds_expire_at
+        )
+    return bool(deleted)
+
+
+def release_hold(hold):
+    with transaction.atomic():
+        _release_hold(hold)
+
+
+def confirm_hold(hold):
+    """Turns an active hold into an order with one ticket per held seat"""
+    with transaction.atomic():
+        flight = Flight.lock_seat_inventory([hold.flight_id])[hold.flight_id]
+        now = timezone.now()
+        if hold.expires_at <= now or not _release_hold(hold):
+            raise ValidationError("Seat hold has expired.")
+        Ticket.validate_ticket_flight(
+            now, flight.departure_time, ValidationError
+        )
+
+        order = Order.objects.create(user=hold.user)
+        book_tickets(
+            order,
+            [
+                {"flight": flight, "row": row, "seat": seat}
+                for row, seat in hold.places
+            ]
+        )
+        return order
+
+
+def book_best_available(user, flight, count, adjacent=False):
+    """
+    Books `count` seats picked by the server on one flight.
+
+    Seats are chosen from the locked seat and hold maps and booked in
+    the same transaction, so the choice cannot be taken by a concurrent
+    booking.
+    """
+    with transaction.atomic():
+        release_expired_holds([flight.id])
+        flight = Flight.lock_seat_inventory([flight.id])[flight.id]
+        places = (
+            SeatMap.for_flight(flight)
+            .union(SeatMap.holds_for_flight(flight))
+            .find_free_seats(count, adjacent)
+        )
+        if not places:
+            raise ValidationError(
+                {
+                    "seats": f"{count} "
+                             f"{'adjacent ' if adjacent else ''}"
+                             f"seats are not available on flight "
+                             f"{flight.id}."
+                }
+            )
+
+        order = Order.objects.create(user=user)
+        book_tickets(
+            order,
+            [
+                {"flight": flight, "row": row, "seat": seat}
+                for row, seat in places
+            ]
+        )
+        return order
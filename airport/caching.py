@@ -0,0 +1,223 @@
+from hashlib import sha256
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+RESPONSE_CACHE_STATS = ("hits", "misses", "stores", "bytes_stored")
+
+
+def _version_key(model):
+    return f"airport:version:{model._meta.label_lower}"
+
+
+def _stats_key(name):
+    return f"airport:response-cache:{name}"
+
+
+def _incr(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key, delta)
+
+
+def _bump(key):
+    _incr(key)
+    transaction.on_commit(lambda: _incr(key))
+
+
+def get_model_versions(models):
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_model_version(model):
+    """
+    Invalidates every cached response that depends on the model.
+
+    The counter is bumped right away and once more after commit, so a
+    reader that cached pre-commit data in between cannot leave a stale
+    entry under the current version.
+    """
+    _bump(_version_key(model))
+
+
+def get_user_orders_version(user_id):
+    """
+    Order history version of a user. It lives on the user row rather
+    than in the cache, so every process sees the same value and it is
+    never lost to eviction.
+    """
+    return (
+        get_user_model().objects
+        .filter(pk=user_id)
+        .values_list("orders_version", flat=True)
+        .first()
+    )
+
+
+def bump_user_orders_version(**lookups):
+    """
+    Invalidates the order history ETags of the users matching `lookups`
+    with a single UPDATE, committed together with the change itself.
+    """
+    get_user_model().objects.filter(**lookups).update(
+        orders_version=F("orders_version") + 1
+    )
+
+
+def get_response_cache_stats():
+    stats = cache.get_many([_stats_key(name) for name in RESPONSE_CACHE_STATS])
+    stats = {
+        name: stats.get(_stats_key(name), 0) for name in RESPONSE_CACHE_STATS
+    }
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+    return stats
+
+
+class CachedResponseMixin:
+    """
+    Serves list/retrieve responses from the cache as pre-rendered bytes.
+
+    Entries are keyed on the version counters of `cache_models` (the
+    queryset model by default), so a single counter bump invalidates
+    every cached page of the affected viewsets.
+    """
+
+    cache_models = ()
+    cache_timeout = RESPONSE_CACHE_TIMEOUT
+
+    def get_cache_models(self):
+        return self.cache_models or (self.queryset.model,)
+
+    def get_response_cache_key(self, request):
+        versions = get_model_versions(self.get_cache_models())
+        path = sha256(request.get_full_path().encode("utf-8")).hexdigest()
+        return (
+            f"airport:response:{self.basename}:{self.action}:"
+            f"{'.'.join(str(version) for version in versions)}:"
+            f"{request.accepted_renderer.format}:{path}"
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return handler(request, *args, **kwargs)
+
+        self.response_cache_key = self.get_response_cache_key(request)
+        cached = cache.get(self.response_cache_key)
+        if cached is not None:
+            _incr(_stats_key("hits"))
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        _incr(_stats_key("misses"))
+        return handler(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        cache_key = getattr(self, "response_cache_key", None)
+        if (
+                cache_key
+                and response.status_code == status.HTTP_200_OK
+                and hasattr(response, "render")
+        ):
+            content = response.render().content
+            cache.set(
+                cache_key,
+                (content, response["Content-Type"]),
+                self.cache_timeout
+            )
+            _incr(_stats_key("stores"))
+            _incr(_stats_key("bytes_stored"), len(content))
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds strong ETags to list/retrieve and answers `304 Not Modified`
+    when If-None-Match matches, before any serializer runs.
+
+    Views override `get_etag_data()` to return cheap version data for
+    the requested resource; the default None disables conditional
+    handling.
+    """
+
+    etag_actions = ("list", "retrieve")
+
+    def get_etag_data(self, request, *args, **kwargs):
+        return None
+
+    def get_etag(self, request, *args, **kwargs):
+        data = self.get_etag_data(request, *args, **kwargs)
+        if data is None:
+            return None
+        fingerprint = repr(
+            (
+                self.basename,
+                self.action,
+                request.get_full_path(),
+                request.accepted_renderer.format,
+                data,
+            )
+        )
+        return f'"{sha256(fingerprint.encode("utf-8")).hexdigest()}"'
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.etag_actions:
+            return handler(request, *args, **kwargs)
+
+        etag = self.get_etag(request, *args, **kwargs)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        if_none_match = _parse_if_none_match(request)
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag}
+            )
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+
+def _parse_if_none_match(request):
+    header = request.headers.get("If-None-Match", "")
+    return {
+        tag.strip().removeprefix("W/")
+        for tag in header.split(",")
+        if tag.strip()
+    }
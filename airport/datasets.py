@@ -0,0 +1,409 @@
+import random
+import time
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from airport.caching import bump_model_version
+from airport.models import (
+    AIRPLANE_REST_TIME,
+    Airport,
+    Route,
+    Crew,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+    RouteDailyLoad,
+    Ticket,
+)
+from airport.seating import SeatMap
+from airport.signals import REFERENCE_DATA_MODELS
+
+# name, rows, seats_in_row
+AIRPLANE_MODELS = (
+    ("ATR 72", 18, 4),
+    ("Embraer E195", 31, 4),
+    ("Airbus A320", 30, 6),
+    ("Boeing 737-800", 32, 6),
+    ("Airbus A321", 37, 6),
+    ("Boeing 787-9", 33, 9),
+)
+FIRST_NAMES = (
+    "Anna", "Maria", "Olena", "Sofia", "Emma", "Laura", "Eva", "Ines",
+    "Jan", "Piotr", "Taras", "Lukas", "Marco", "Pablo", "Noah", "Ivan",
+)
+LAST_NAMES = (
+    "Nowak", "Kowalski", "Shevchenko", "Bondarenko", "Muller", "Schmidt",
+    "Rossi", "Garcia", "Martin", "Novak", "Horvat", "Jensen", "Silva",
+)
+DEFAULT_START = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+CRUISE_SPEED_KMH = 800
+MAX_TURNAROUND = timedelta(hours=8)
+DATASET_PASSWORD = "dataset123"
+
+
+class DatasetGenerator:
+    """
+    Builds a synthetic airline network with bulk INSERTs.
+
+    Every random choice comes from one `random.Random(seed)`, so the same
+    options produce the same network, schedules and bookings. Seats are
+    allocated in memory before any flight is inserted, so seat maps,
+    counters and route loads are written with the flights instead of
+    being updated afterwards. Names start with `prefix`, which lets
+    several datasets live in one database.
+    """
+
+    def __init__(
+            self,
+            seed=0,
+            airports=50,
+            routes_per_airport=5,
+            airplanes=100,
+            crew=300,
+            flights_per_airplane=30,
+            users=1000,
+            orders=10000,
+            max_tickets_per_order=3,
+            load_factor=0.8,
+            start=DEFAULT_START,
+            prefix=None,
+            batch_size=5000,
+    ):
+        self.random = random.Random(seed)
+        self.prefix = f"S{seed}-" if prefix is None else prefix
+        self.airport_count = max(airports, 2)
+        self.routes_per_airport = max(
+            min(routes_per_airport, self.airport_count - 1), 1
+        )
+        self.airplane_count = airplanes
+        self.crew_count = crew
+        self.flights_per_airplane = flights_per_airplane
+        self.user_count = max(users, 1)
+        self.order_count = orders
+        self.max_tickets_per_order = max(max_tickets_per_order, 1)
+        self.load_factor = load_factor
+        self.start = start
+        self.batch_size = batch_size
+        self.stats = {}
+
+    def generate(self):
+        """Inserts the dataset; returns rows created and seconds per model"""
+        airports = self._timed("airports", self._create_airports)
+        routes = self._timed("routes", self._create_routes, airports)
+        airplanes = self._timed("airplanes", self._create_airplanes)
+        crew = self._timed("crew", self._create_crew)
+        flights = self._timed(
+            "flights", self._create_flights, routes, airplanes, crew
+        )
+        self._timed("tickets", self._create_orders, flights)
+        for model in REFERENCE_DATA_MODELS:
+            bump_model_version(model)
+        self._analyze()
+        return self.stats
+
+    @staticmethod
+    def _analyze():
+        """Refreshes planner statistics of the freshly loaded tables"""
+        with connection.cursor() as cursor:
+            for model in (Route, Flight, Flight.crew.through, Order, Ticket):
+                cursor.execute(
+                    f"ANALYZE "
+                    f"{connection.ops.quote_name(model._meta.db_table)}"
+                )
+
+    def _timed(self, name, create, *args):
+        started = time.perf_counter()
+        result = create(*args)
+        self.stats[name] = {
+            "rows": len(result),
+            "seconds": time.perf_counter() - started,
+        }
+        return result
+
+    def _bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def _create_airports(self):
+        return self._bulk_create(
+            Airport,
+            [
+                Airport(
+                    name=f"{self.prefix}A{index:05d}",
+                    closest_big_city=f"City {index}"
+                )
+                for index in range(self.airport_count)
+            ]
+        )
+
+    def _create_routes(self, airports):
+        """
+        Links the airports in a ring both ways, so every airport can be
+        left and reached, and adds random routes up to the fan-out
+        """
+        count = len(airports)
+        pairs = set()
+        for index in range(count):
+            pairs.add((index, (index + 1) % count))
+            pairs.add(((index + 1) % count, index))
+        for index in range(count):
+            targets = [
+                target for target in range(count) if target != index
+            ]
+            for target in self.random.sample(
+                    targets, self.routes_per_airport
+            ):
+                pairs.add((index, target))
+
+        return self._bulk_create(
+            Route,
+            [
+                Route(
+                    source=airports[source],
+                    destination=airports[destination],
+                    distance=self.random.randint(200, 3000)
+                )
+                for source, destination in sorted(pairs)
+            ]
+        )
+
+    def _create_airplanes(self):
+        airplane_types = {}
+        for name, *_ in AIRPLANE_MODELS:
+            airplane_types[name], _ = AirplaneType.objects.get_or_create(
+                name=name
+            )
+
+        airplanes = []
+        for index in range(self.airplane_count):
+            name, rows, seats_in_row = self.random.choice(AIRPLANE_MODELS)
+            airplanes.append(
+                Airplane(
+                    name=f"{self.prefix}P{index:05d}",
+                    rows=rows,
+                    seats_in_row=seats_in_row,
+                    airplane_type=airplane_types[name]
+                )
+            )
+        return self._bulk_create(Airplane, airplanes)
+
+    def _create_crew(self):
+        return self._bulk_create(
+            Crew,
+            [
+                Crew(
+                    first_name=self.random.choice(FIRST_NAMES),
+                    last_name=self.random.choice(LAST_NAMES)
+                )
+                for _ in range(self.crew_count)
+            ]
+        )
+
+    def _schedule(self, routes_from, airplane):
+        """
+        Chains flights of an airplane from airport to airport, each one
+        leaving 3 to 8 hours after the previous arrival
+        """
+        airport_id = self.random.choice(list(routes_from))
+        departure_time = self.start + timedelta(
+            minutes=self.random.randrange(24 * 60)
+        )
+        turnaround_minutes = (
+            int(AIRPLANE_REST_TIME.total_seconds()) // 60,
+            int(MAX_TURNAROUND.total_seconds()) // 60,
+        )
+        for _ in range(self.flights_per_airplane):
+            route = self.random.choice(routes_from[airport_id])
+            arrival_time = departure_time + timedelta(
+                minutes=max(route.distance * 60 // CRUISE_SPEED_KMH, 30)
+            )
+            yield Flight(
+                route=route,
+                airplane=airplane,
+                departure_time=departure_time,
+                arrival_time=arrival_time,
+            )
+            airport_id = route.destination_id
+            departure_time = arrival_time + timedelta(
+                minutes=self.random.randint(*turnaround_minutes)
+            )
+
+    def _create_flights(self, routes, airplanes, crew):
+        routes_from = {}
+        for route in routes:
+            routes_from.setdefault(route.source_id, []).append(route)
+        flights = [
+            flight
+            for airplane in airplanes
+            for flight in self._schedule(routes_from, airplane)
+        ]
+        self.bookings = self._plan_bookings(flights)
+
+        for flight, seats_sold in zip(flights, self.seats_sold):
+            capacity = flight.airplane.capacity
+            seat_map = SeatMap(
+                flight.airplane.rows,
+                flight.airplane.seats_in_row,
+                b"\xff" * (seats_sold // 8)
+                + bytes([0xFF << (8 - seats_sold % 8) & 0xFF])
+            )
+            flight.seats_sold = seats_sold
+            flight.seats_available = capacity - seats_sold
+            flight.seat_map = seat_map.to_bytes()
+        flights = self._bulk_create(Flight, flights)
+
+        if crew:
+            Flight.crew.through.objects.bulk_create(
+                [
+                    Flight.crew.through(flight_id=flight.id, crew_id=crew_id)
+                    for flight in flights
+                    for crew_id in sorted(
+                        member.id
+                        for member in self.random.sample(
+                            crew, min(len(crew), self.random.randint(2, 4))
+                        )
+                    )
+                ],
+                batch_size=self.batch_size
+            )
+        RouteDailyLoad.rebuild(routes, batch_size=self.batch_size)
+        return flights
+
+    def _plan_bookings(self, flights):
+        """
+        Picks a flight, a user and a ticket count for every order.
+
+        Flights are filled up to the load factor and front to back, so
+        only the seats sold per flight have to be kept.
+        """
+        remaining = array(
+            "L",
+            (
+                int(flight.airplane.capacity * self.load_factor)
+                for flight in flights
+            )
+        )
+        self.seats_sold = array("L", [0]) * len(flights)
+        candidates = [
+            index for index, seats in enumerate(remaining) if seats
+        ]
+        bookings = (array("L"), array("L"), array("B"))
+        flight_indexes, user_indexes, ticket_counts = bookings
+        for _ in range(self.order_count):
+            if not candidates:
+                break
+            position = self.random.randrange(len(candidates))
+            index = candidates[position]
+            count = min(
+                self.random.randint(1, self.max_tickets_per_order),
+                remaining[index]
+            )
+            remaining[index] -= count
+            self.seats_sold[index] += count
+            if not remaining[index]:
+                candidates[position] = candidates[-1]
+                candidates.pop()
+
+            flight_indexes.append(index)
+            user_indexes.append(self.random.randrange(self.user_count))
+            ticket_counts.append(count)
+        return bookings
+
+    def _create_users(self):
+        password = make_password(DATASET_PASSWORD, salt=self.prefix or "s")
+        prefix = self.prefix.lower()
+        return get_user_model().objects.bulk_create(
+            [
+                get_user_model()(
+                    email=f"{prefix}user{index}@example.com",
+                    password=password
+                )
+                for index in range(self.user_count)
+            ],
+            batch_size=self.batch_size
+        )
+
+    @staticmethod
+    def _reserve_ids(model, count):
+        """Takes `count` ids from the model's primary key sequence"""
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [table, count]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def _copy(model, columns, rows):
+        """Loads tab separated rows with COPY FROM STDIN"""
+        data = StringIO()
+        for row in rows:
+            data.write("\t".join(map(str, row)))
+            data.write("\n")
+        data.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+                f"({', '.join(columns)}) FROM STDIN",
+                data
+            )
+
+    def _create_orders(self, flights):
+        """
+        Loads orders and their tickets with COPY in chunks of
+        `batch_size` orders; returns the number of tickets.
+
+        Order ids are reserved from the sequence first, so tickets can
+        reference them without reading the orders back.
+        """
+        user_ids = [user.id for user in self._create_users()]
+        flight_indexes, user_indexes, ticket_counts = self.bookings
+        next_seat = array("L", [0]) * len(flights)
+        created_at = timezone.now().isoformat()
+        tickets_created = 0
+        for chunk_start in range(0, len(flight_indexes), self.batch_size):
+            chunk = range(
+                chunk_start,
+                min(chunk_start + self.batch_size, len(flight_indexes))
+            )
+            order_ids = self._reserve_ids(Order, len(chunk))
+            self._copy(
+                Order,
+                ("id", "created_at", "user_id"),
+                (
+                    (order_id, created_at, user_ids[user_indexes[i]])
+                    for order_id, i in zip(order_ids, chunk)
+                )
+            )
+
+            tickets = []
+            for order_id, i in zip(order_ids, chunk):
+                flight = flights[flight_indexes[i]]
+                seats_in_row = flight.airplane.seats_in_row
+                for _ in range(ticket_counts[i]):
+                    seat = next_seat[flight_indexes[i]]
+                    next_seat[flight_indexes[i]] += 1
+                    tickets.append(
+                        (
+                            order_id,
+                            flight.id,
+                            seat // seats_in_row + 1,
+                            seat % seats_in_row + 1,
+                        )
+                    )
+            self._copy(
+                Ticket, ("order_id", "flight_id", "row", "seat"), tickets
+            )
+            tickets_created += len(tickets)
+
+        self.stats["users"] = {"rows": len(user_ids)}
+        self.stats["orders"] = {"rows": len(flight_indexes)}
+        return range(tickets_created)
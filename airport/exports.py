@@ -0,0 +1,90 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+
+from airport.models import Ticket
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = (
+    "order_id",
+    "order_created_at",
+    "user_email",
+    "ticket_id",
+    "row",
+    "seat",
+    "flight_id",
+    "route",
+    "departure_time",
+    "arrival_time",
+)
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_ticket_rows(orders=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one tuple of EXPORT_FIELDS per ticket of the given (by default
+    all) orders.
+
+    Rows are read from a server-side cursor `chunk_size` at a time, so
+    memory use does not depend on the number of exported rows.
+    """
+    tickets = Ticket.objects.all()
+    if orders is not None:
+        tickets = tickets.filter(order__in=orders)
+    return (
+        tickets
+        .annotate(
+            order_created_at=F("order__created_at"),
+            user_email=F("order__user__email"),
+            ticket_id=F("id"),
+            route=Concat(
+                "flight__route__source__name",
+                Value(" - "),
+                "flight__route__destination__name"
+            ),
+            departure_time=F("flight__departure_time"),
+            arrival_time=F("flight__arrival_time"),
+        )
+        .order_by("order_id", "id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+class _Echo:
+    """File-like object that hands written lines back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in row
+        )
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder
+        ) + "\n"
+
+
+def iter_export(orders, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the exported tickets of `orders` as CSV or NDJSON lines"""
+    rows = export_ticket_rows(orders, chunk_size)
+    if export_format == "csv":
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -0,0 +1,108 @@
+import json
+from datetime import timedelta
+from hashlib import sha256
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from airport.models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+
+def _request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return sha256(
+        f"{request.method}:{request.path}:{body}".encode("utf-8")
+    ).hexdigest()
+
+
+def purge_expired_idempotency_keys():
+    deleted, _ = IdempotencyKey.objects.filter(
+        expires_at__lte=timezone.now()
+    ).delete()
+    return deleted
+
+
+class IdempotentCreateMixin:
+    """
+    Honours the `Idempotency-Key` header on create.
+
+    The first response for a (user, key) pair is stored for
+    `idempotency_key_ttl` and replayed to retries without running the
+    create again. The key row stays locked until the first request
+    commits, so concurrent duplicates wait for it and replay its
+    response. Reusing a key with a different payload is rejected with
+    `422 Unprocessable Entity`.
+    """
+
+    idempotency_key_ttl = IDEMPOTENCY_KEY_TTL
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > 255:
+            raise ValidationError(
+                {
+                    IDEMPOTENCY_KEY_HEADER:
+                        "Key must be between 1 and 255 characters long."
+                }
+            )
+
+        fingerprint = _request_fingerprint(request)
+        with transaction.atomic():
+            now = timezone.now()
+            record, created = (
+                IdempotencyKey.objects
+                .select_for_update()
+                .get_or_create(
+                    user=request.user,
+                    key=key,
+                    defaults={
+                        "request_hash": fingerprint,
+                        "expires_at": now + self.idempotency_key_ttl,
+                    }
+                )
+            )
+            if not created and record.expires_at > now:
+                return self._replay(record, fingerprint)
+
+            try:
+                response = super().create(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+
+            record.request_hash = fingerprint
+            record.status_code = response.status_code
+            record.response = response.data
+            record.expires_at = now + self.idempotency_key_ttl
+            record.save(
+                update_fields=[
+                    "request_hash", "status_code", "response", "expires_at"
+                ]
+            )
+            return response
+
+    def _replay(self, record, fingerprint):
+        if record.request_hash != fingerprint:
+            return Response(
+                {
+                    "detail": "This idempotency key was already used "
+                              "with a different request."
+                },
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return Response(
+            record.response,
+            status=record.status_code,
+            headers={"Idempotent-Replayed": "true"}
+        )
@@ -0,0 +1,231 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from itertools import count
+
+from airport.models import Flight, Route
+
+MAX_LEG_DURATION = timedelta(hours=24)
+
+
+class Itinerary:
+    def __init__(self, legs):
+        self.legs = legs
+
+    @property
+    def departure_time(self):
+        return self.legs[0].departure_time
+
+    @property
+    def arrival_time(self):
+        return self.legs[-1].arrival_time
+
+    @property
+    def duration(self):
+        return self.arrival_time - self.departure_time
+
+    @property
+    def connections(self):
+        return len(self.legs) - 1
+
+
+class ItineraryGraph:
+    """
+    Time-expanded flight graph.
+
+    Every flight is a node; a flight connects to each flight leaving its
+    destination airport within [min_connection, max_connection] after it
+    lands. Departures are kept sorted per airport so the connections of
+    a flight are found by bisection.
+    """
+
+    def __init__(self, flights, min_connection, max_connection):
+        self.min_connection = min_connection
+        self.max_connection = max_connection
+        self.departures = defaultdict(list)
+        for flight in sorted(flights, key=lambda f: f.departure_time):
+            self.departures[flight.route.source_id].append(flight)
+        self.departure_times = {
+            airport_id: [flight.departure_time for flight in flights]
+            for airport_id, flights in self.departures.items()
+        }
+
+    def departing(self, airport_id, earliest, latest):
+        """Flights leaving the airport in the closed [earliest, latest]"""
+        times = self.departure_times.get(airport_id)
+        if not times:
+            return []
+        return self.departures[airport_id][
+            bisect_left(times, earliest):bisect_right(times, latest)
+        ]
+
+    def connections(self, flight):
+        return self.departing(
+            flight.route.destination_id,
+            flight.arrival_time + self.min_connection,
+            flight.arrival_time + self.max_connection
+        )
+
+    def search(
+            self,
+            first_legs,
+            destination_id,
+            max_legs,
+            limit,
+            legs_to_destination=None,
+    ):
+        """
+        Best-first search for the `limit` best paths without repeated
+        airports, ranked by arrival, connections and latest departure.
+
+        Partial paths are expanded in arrival order, so once `limit`
+        itineraries are found, any path landing after the worst of them
+        cannot improve the result and the search stops. Connections to
+        airports that cannot reach the destination within the remaining
+        legs (per `legs_to_destination`) are never expanded.
+        """
+        counter = count()
+        frontier = [
+            (flight.arrival_time, 1, next(counter), [flight])
+            for flight in first_legs
+        ]
+        heapq.heapify(frontier)
+        # Min-heap on the inverted rank, so its head is the worst result
+        results = []
+
+        def worst_arrival():
+            if len(results) < limit:
+                return None
+            return results[0][4].arrival_time
+
+        while frontier:
+            arrival_time, _, _, legs = heapq.heappop(frontier)
+            worst = worst_arrival()
+            if worst is not None and arrival_time > worst:
+                break
+
+            last_leg = legs[-1]
+            if last_leg.route.destination_id == destination_id:
+                itinerary = Itinerary(legs)
+                entry = (
+                    -itinerary.arrival_time.timestamp(),
+                    -itinerary.connections,
+                    itinerary.departure_time.timestamp(),
+                    next(counter),
+                    itinerary,
+                )
+                if len(results) < limit:
+                    heapq.heappush(results, entry)
+                elif entry[:3] > results[0][:3]:
+                    heapq.heapreplace(results, entry)
+                continue
+            if len(legs) >= max_legs:
+                continue
+
+            visited = {leg.route.source_id for leg in legs}
+            for flight in self.connections(last_leg):
+                airport_id = flight.route.destination_id
+                if airport_id in visited:
+                    continue
+                if legs_to_destination is not None and (
+                        airport_id not in legs_to_destination
+                        or len(legs) + 1 + legs_to_destination[airport_id]
+                        > max_legs
+                ):
+                    continue
+                if worst is not None and flight.arrival_time > worst:
+                    continue
+                heapq.heappush(
+                    frontier,
+                    (
+                        flight.arrival_time,
+                        len(legs) + 1,
+                        next(counter),
+                        legs + [flight],
+                    )
+                )
+
+        results.sort(reverse=True)
+        return [entry[4] for entry in results]
+
+
+def _hop_distances(edges, start, max_hops):
+    """Fewest hops from `start` to every node within `max_hops`"""
+    distances = {start: 0}
+    frontier = [start]
+    for hops in range(1, max_hops + 1):
+        next_frontier = []
+        for node in frontier:
+            for neighbour in edges.get(node, ()):
+                if neighbour not in distances:
+                    distances[neighbour] = hops
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return distances
+
+
+def search_itineraries(
+        source_id,
+        destination_id,
+        day_start,
+        day_end,
+        max_legs,
+        min_connection,
+        max_connection,
+        seats,
+        limit,
+):
+    """
+    Loads the flights that can be part of a trip leaving the source in
+    [day_start, day_end) in one query and searches them in memory.
+
+    Only flights on routes lying on some path from the source to the
+    destination with at most `max_legs` legs are loaded; the route
+    network is small next to the flight table.
+    """
+    outgoing = defaultdict(list)
+    incoming = defaultdict(list)
+    routes = list(
+        Route.objects.values_list("id", "source_id", "destination_id")
+    )
+    for _, route_source_id, route_destination_id in routes:
+        outgoing[route_source_id].append(route_destination_id)
+        incoming[route_destination_id].append(route_source_id)
+
+    legs_from_source = _hop_distances(outgoing, source_id, max_legs - 1)
+    legs_to_destination = _hop_distances(
+        incoming, destination_id, max_legs
+    )
+    route_ids = [
+        route_id
+        for route_id, route_source_id, route_destination_id in routes
+        if route_source_id in legs_from_source
+        and route_destination_id in legs_to_destination
+        and legs_from_source[route_source_id] + 1
+        + legs_to_destination[route_destination_id] <= max_legs
+    ]
+    if not route_ids:
+        return []
+
+    window_end = day_end + (max_legs - 1) * (
+        MAX_LEG_DURATION + max_connection
+    )
+    flights = (
+        Flight.objects
+        .filter(
+            route_id__in=route_ids,
+            departure_time__gte=day_start,
+            departure_time__lt=window_end,
+            seats_available__gte=seats,
+        )
+        .select_related("route__source", "route__destination", "airplane")
+        .order_by()
+    )
+    graph = ItineraryGraph(flights, min_connection, max_connection)
+    first_legs = graph.departing(
+        source_id, day_start, day_end - timedelta(microseconds=1)
+    )
+    return graph.search(
+        first_legs, destination_id, max_legs, limit, legs_to_destination
+    )
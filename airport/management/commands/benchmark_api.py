@@ -0,0 +1,96 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from airport.benchmarks import (
+    DATASET_SIZES,
+    benchmark_database,
+    compare_results,
+    format_results,
+    run_read_benchmark,
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the read endpoints of the API."""
+
+    help = (  # noqa: VNE003
+        "Seed a test database with generated datasets and measure latency, "
+        "query count, SQL time and response size of every read action."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            action="append",
+            dest="sizes",
+            choices=DATASET_SIZES,
+            help="Dataset size to benchmark (can be repeated, "
+                 "default: small).",
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Keep the response cache between requests.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the results to this JSON file.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="JSON results of a previous run to compare against.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Allowed latency growth before reporting a regression "
+                 "(0.2 = 20%%).",
+        )
+
+    def handle(self, *args, **options):
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                previous = json.load(file)["results"]
+
+        with benchmark_database():
+            results = run_read_benchmark(
+                options["sizes"] or ["small"],
+                options["iterations"],
+                options["warm_cache"],
+                options["seed"],
+            )
+
+        for line in format_results(results):
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(
+                    {
+                        "created_at": timezone.now().isoformat(),
+                        "iterations": options["iterations"],
+                        "warm_cache": options["warm_cache"],
+                        "results": results,
+                    },
+                    file,
+                    indent=2
+                )
+
+        if previous is not None:
+            regressions = compare_results(
+                previous, results, options["threshold"]
+            )
+            for key, metric, before, after in regressions:
+                self.stderr.write(
+                    f"{key}: {metric} {before:.2f} -> {after:.2f}"
+                )
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions.")
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
@@ -0,0 +1,71 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from airport.benchmarks import (
+    BOOKING_MODES,
+    benchmark_database,
+    run_booking_benchmark,
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark concurrent bookings."""
+
+    help = (  # noqa: VNE003
+        "Book the same few flights from concurrent threads, each with its "
+        "own connection and JWT user, on a test database and report "
+        "throughput, conflicts, retries, transaction time and lock waits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--orders",
+            type=int,
+            default=50,
+            help="Orders placed by each worker.",
+        )
+        parser.add_argument("--flights", type=int, default=2)
+        parser.add_argument("--tickets-per-order", type=int, default=2)
+        parser.add_argument(
+            "--max-retries",
+            type=int,
+            default=3,
+            help="Retries with other seats after a seat conflict.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=BOOKING_MODES,
+            default="seats",
+            help="`seats` picks random seats client-side, `auto-assign` "
+                 "lets the server pick them.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            help="Write the results to this JSON file.",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            result = run_booking_benchmark(
+                workers=options["workers"],
+                orders=options["orders"],
+                flights=options["flights"],
+                tickets_per_order=options["tickets_per_order"],
+                max_retries=options["max_retries"],
+                mode=options["mode"],
+                seed=options["seed"],
+            )
+
+        self.stdout.write(json.dumps(result, indent=2))
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(result, file, indent=2)
+
+        if not result["inventory_consistent"]:
+            self.stdout.write(
+                self.style.ERROR("Seat counters do not match the tickets.")
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
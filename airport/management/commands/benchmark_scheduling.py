@@ -0,0 +1,102 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from airport.benchmarks import (
+    SCHEDULING_FANOUTS,
+    SCHEDULING_HISTORIES,
+    benchmark_database,
+    compare_results,
+    format_results,
+    run_scheduling_benchmark,
+    scaling_summary,
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark flight scheduling validation."""
+
+    help = (  # noqa: VNE003
+        "Measure flight creation latency and query count on a test "
+        "database as an airplane's flight history and an airport's "
+        "route fan-out grow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--history",
+            type=int,
+            nargs="+",
+            default=SCHEDULING_HISTORIES,
+            help="Flight history sizes of the airplane.",
+        )
+        parser.add_argument(
+            "--fanout",
+            type=int,
+            nargs="+",
+            default=SCHEDULING_FANOUTS,
+            help="Numbers of routes leaving the previous destination.",
+        )
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument(
+            "--output",
+            help="Write the results to this JSON file.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="JSON results of a previous run to compare against.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Allowed latency growth before reporting a regression "
+                 "(0.2 = 20%%).",
+        )
+
+    def handle(self, *args, **options):
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                previous = json.load(file)["results"]
+
+        with benchmark_database():
+            results = run_scheduling_benchmark(
+                options["history"],
+                options["fanout"],
+                options["iterations"],
+            )
+
+        for line in format_results(results):
+            self.stdout.write(line)
+        for name, sizes, ratio, queries in scaling_summary(results):
+            self.stdout.write(
+                f"{name} {sizes[0]} -> {sizes[1]}: p50 x{ratio:.1f}, "
+                f"queries {queries[0]} -> {queries[1]}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(
+                    {
+                        "created_at": timezone.now().isoformat(),
+                        "iterations": options["iterations"],
+                        "results": results,
+                    },
+                    file,
+                    indent=2
+                )
+
+        if previous is not None:
+            regressions = compare_results(
+                previous, results, options["threshold"]
+            )
+            for key, metric, before, after in regressions:
+                self.stderr.write(
+                    f"{key}: {metric} {before:.2f} -> {after:.2f}"
+                )
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions.")
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
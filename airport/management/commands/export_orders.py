@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from airport.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export
+from airport.models import Order
+
+
+class Command(BaseCommand):
+    """Django command to export order tickets as CSV or NDJSON."""
+
+    help = (  # noqa: VNE003
+        "Stream orders with their tickets, flights and routes "
+        "to a file or stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            default="csv",
+            dest="export_format",
+            help="Output format.",
+        )
+        parser.add_argument(
+            "--user",
+            type=int,
+            dest="user_id",
+            help="Only export the orders of the given user id.",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write to (default: stdout).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Rows fetched from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        orders = None
+        if options["user_id"] is not None:
+            orders = Order.objects.filter(user_id=options["user_id"])
+
+        lines = iter_export(
+            orders, options["export_format"], options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,92 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from airport.datasets import DEFAULT_START, DatasetGenerator
+
+
+def _start_date(value):
+    return datetime.fromisoformat(value).replace(tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    """Django command to generate a synthetic airline dataset."""
+
+    help = (  # noqa: VNE003
+        "Generate airports, routes, airplanes, crew, chained flights, "
+        "users, orders and tickets with bulk inserts, deterministically "
+        "for a given seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--airports", type=int, default=50)
+        parser.add_argument(
+            "--routes-per-airport",
+            type=int,
+            default=5,
+            help="Random routes leaving each airport, besides the ring.",
+        )
+        parser.add_argument("--airplanes", type=int, default=100)
+        parser.add_argument("--crew", type=int, default=300)
+        parser.add_argument("--flights-per-airplane", type=int, default=30)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--orders", type=int, default=10000)
+        parser.add_argument("--max-tickets-per-order", type=int, default=3)
+        parser.add_argument(
+            "--load-factor",
+            type=float,
+            default=0.8,
+            help="Share of each flight's seats that may be sold.",
+        )
+        parser.add_argument(
+            "--start",
+            type=_start_date,
+            default=DEFAULT_START,
+            help="UTC date of the first departures (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--prefix",
+            help="Prefix of the generated names (default: S<seed>-).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        generator = DatasetGenerator(
+            seed=options["seed"],
+            airports=options["airports"],
+            routes_per_airport=options["routes_per_airport"],
+            airplanes=options["airplanes"],
+            crew=options["crew"],
+            flights_per_airplane=options["flights_per_airplane"],
+            users=options["users"],
+            orders=options["orders"],
+            max_tickets_per_order=options["max_tickets_per_order"],
+            load_factor=options["load_factor"],
+            start=options["start"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+        )
+        try:
+            with transaction.atomic():
+                stats = generator.generate()
+        except IntegrityError as error:
+            raise CommandError(
+                f"Could not generate the dataset, "
+                f"use another --seed or --prefix: {error}"
+            ) from error
+
+        for name, entity_stats in stats.items():
+            seconds = entity_stats.get("seconds")
+            self.stdout.write(
+                f"{name}: {entity_stats['rows']}"
+                + (f" ({seconds:.2f}s)" if seconds is not None else "")
+            )
+        if stats["orders"]["rows"] < options["orders"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Flights sold out before all orders were placed."
+                )
+            )
+        self.stdout.write(self.style.SUCCESS("Dataset generated."))
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from airport.network_import import NETWORK_ENTITIES, NetworkImporter
+
+
+class Command(BaseCommand):
+    """Django command to bulk import an airline network from files."""
+
+    help = (  # noqa: VNE003
+        "Import airplane types, airports, airplanes, routes, crew and "
+        "flights from CSV or JSON files, referencing related rows by name."
+    )
+
+    def add_arguments(self, parser):
+        for entity in NETWORK_ENTITIES:
+            parser.add_argument(
+                f"--{entity.replace('_', '-')}",
+                dest=entity,
+                metavar="FILE",
+                help=f"CSV or JSON file with {entity.replace('_', ' ')}.",
+            )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows inserted per INSERT statement.",
+        )
+        parser.add_argument(
+            "--skip-invalid",
+            action="store_true",
+            help="Import the valid rows even if some rows are invalid.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and report without saving anything.",
+        )
+
+    def handle(self, *args, **options):
+        sources = {entity: options[entity] for entity in NETWORK_ENTITIES}
+        if not any(sources.values()):
+            raise CommandError("No files to import.")
+
+        try:
+            with transaction.atomic():
+                importer = NetworkImporter(options["batch_size"])
+                stats = importer.run(sources)
+                if options["dry_run"] or (
+                        importer.errors and not options["skip_invalid"]
+                ):
+                    transaction.set_rollback(True)
+        except OSError as error:
+            raise CommandError(error) from error
+
+        for entity, line, message in importer.errors:
+            self.stderr.write(
+                f"{sources[entity]}:{line}: {message}"
+            )
+        for entity, entity_stats in stats.items():
+            self.stdout.write(
+                f"{entity}: {entity_stats['created']} created, "
+                f"{entity_stats['existing']} existing, "
+                f"{entity_stats['failed']} failed "
+                f"({entity_stats['rows_per_second'] or 0:.0f} rows/s)"
+            )
+
+        if importer.errors and not options["skip_invalid"]:
+            raise CommandError(
+                f"{len(importer.errors)} invalid rows, nothing imported."
+            )
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS("Dry run, nothing imported."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Network imported."))
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from airport.order_queue import drain_queue
+
+
+class Command(BaseCommand):
+    """Django command to book queued order requests."""
+
+    help = (  # noqa: VNE003
+        "Confirm or reject pending order requests with a pool of "
+        "worker threads, one flight batch at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of worker threads.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum requests of one flight booked per transaction.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.drain(options["workers"], options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} order requests.")
+            if options["once"]:
+                break
+            if not processed:
+                time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS("Order queue drained."))
+
+    def drain(self, workers, batch_size):
+        if workers <= 1:
+            return drain_queue(batch_size)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return sum(
+                executor.map(
+                    lambda _: self._worker(batch_size), range(workers)
+                )
+            )
+
+    @staticmethod
+    def _worker(batch_size):
+        try:
+            return drain_queue(batch_size)
+        finally:
+            connection.close()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from airport.idempotency import purge_expired_idempotency_keys
+
+
+class Command(BaseCommand):
+    """Django command to delete expired idempotency keys."""
+
+    help = (  # noqa: VNE003
+        "Delete stored order responses whose idempotency key expired."
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_idempotency_keys()
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} idempotency keys.")
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from airport.models import RouteDailyLoad
+
+
+class Command(BaseCommand):
+    """Django command to backfill the route daily load rollup."""
+
+    help = (  # noqa: VNE003
+        "Recompute flights, capacity and seats sold per route and day "
+        "from the flights' seat counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--route",
+            type=int,
+            action="append",
+            dest="route_ids",
+            help="Only rebuild the given route id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = RouteDailyLoad.rebuild(options["route_ids"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {created} route daily loads.")
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from airport.models import Flight
+
+
+class Command(BaseCommand):
+    """Django command to recompute flight seat inventory from tickets."""
+
+    help = (  # noqa: VNE003
+        "Recompute seats_sold / seats_available and the seat map "
+        "of flights from tickets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--flight",
+            type=int,
+            action="append",
+            dest="flight_ids",
+            help="Only rebuild the given flight id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        flights = Flight.objects.all()
+        if options["flight_ids"]:
+            flights = flights.filter(pk__in=options["flight_ids"])
+
+        with transaction.atomic():
+            updated = Flight.rebuild_seat_counters(flights)
+            Flight.rebuild_seat_maps(flights)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt seat inventory of {updated} flights.")
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from airport.booking import release_expired_holds
+
+
+class Command(BaseCommand):
+    """Django command to free the seats of expired seat holds."""
+
+    help = (  # noqa: VNE003
+        "Release expired seat holds so their seats count as available "
+        "in flight lists and searches."
+    )
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} held seats.")
+        )
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-16 19:16
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_seat_counters(apps, schema_editor):
+    Airplane = apps.get_model("airport", "Airplane")
+    Flight = apps.get_model("airport", "Flight")
+    Ticket = apps.get_model("airport", "Ticket")
+
+    seats_sold = Coalesce(
+        Subquery(
+            Ticket.objects
+            .filter(flight=OuterRef("pk"))
+            .order_by()
+            .values("flight")
+            .annotate(count=Count("id"))
+            .values("count")
+        ),
+        0
+    )
+    capacity = Subquery(
+        Airplane.objects
+        .filter(pk=OuterRef("airplane_id"))
+        .annotate(capacity=F("rows") * F("seats_in_row"))
+        .values("capacity")
+    )
+    Flight.objects.update(
+        seats_sold=seats_sold,
+        seats_available=capacity - seats_sold
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='seats_available',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seats_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_seat_counters, migrations.RunPython.noop
+        ),
+    ]
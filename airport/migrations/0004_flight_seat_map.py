@@ -0,0 +1,70 @@
+# Generated by Django 5.1.2 on 2026-10-16 19:17
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def encode_seat_map(seats_in_row, size, places):
+    # Frozen copy of airport.seating.SeatMap's layout: seat (row, seat) is
+    # bit (row - 1) * seats_in_row + (seat - 1), most significant bit first.
+    bits = bytearray(size)
+    for row, seat in places:
+        index = (row - 1) * seats_in_row + (seat - 1)
+        bits[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(bits)
+
+
+def write_seat_maps(Flight, Ticket, flights):
+    places = {flight.pk: [] for flight in flights}
+    for flight_id, row, seat in (
+            Ticket.objects
+            .filter(flight_id__in=places)
+            .order_by()
+            .values_list("flight_id", "row", "seat")
+    ):
+        places[flight_id].append((row, seat))
+
+    for flight in flights:
+        rows = flight.airplane.rows
+        seats_in_row = flight.airplane.seats_in_row
+        flight.seat_map = encode_seat_map(
+            seats_in_row, (rows * seats_in_row + 7) // 8, places[flight.pk]
+        )
+    Flight.objects.bulk_update(flights, ["seat_map"])
+
+
+def populate_seat_maps(apps, schema_editor):
+    Flight = apps.get_model("airport", "Flight")
+    Ticket = apps.get_model("airport", "Ticket")
+
+    flights = (
+        Flight.objects
+        .select_related("airplane")
+        .only("airplane", "airplane__rows", "airplane__seats_in_row")
+        .order_by("pk")
+    )
+    batch = []
+    for flight in flights.iterator(chunk_size=BATCH_SIZE):
+        batch.append(flight)
+        if len(batch) >= BATCH_SIZE:
+            write_seat_maps(Flight, Ticket, batch)
+            batch = []
+    if batch:
+        write_seat_maps(Flight, Ticket, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0003_flight_seat_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='seat_map',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(populate_seat_maps, migrations.RunPython.noop),
+    ]
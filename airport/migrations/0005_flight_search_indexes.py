@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-16 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0004_flight_seat_map'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time', 'arrival_time'], name='flight_departure_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['route', 'departure_time'], name='flight_route_departure_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-16 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0005_flight_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
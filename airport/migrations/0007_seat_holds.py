@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-16 19:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0006_flight_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='hold_map',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='holds_expire_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seats_held',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='airport.flight')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['flight', 'expires_at'], name='seat_hold_flight_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.2 on 2026-10-16 19:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_route_daily_loads(apps, schema_editor):
+    Flight = apps.get_model("airport", "Flight")
+    RouteDailyLoad = apps.get_model("airport", "RouteDailyLoad")
+
+    totals = (
+        Flight.objects
+        .annotate(date=TruncDate("departure_time"))
+        .order_by()
+        .values("route_id", "date")
+        .annotate(
+            flight_count=Count("id"),
+            seats=Sum(F("airplane__rows") * F("airplane__seats_in_row")),
+            sold=Sum("seats_sold"),
+        )
+    )
+    RouteDailyLoad.objects.bulk_create(
+        [
+            RouteDailyLoad(
+                route_id=total["route_id"],
+                date=total["date"],
+                flights=total["flight_count"],
+                capacity=total["seats"],
+                seats_sold=total["sold"],
+            )
+            for total in totals
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0010_order_user_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteDailyLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('flights', models.PositiveIntegerField(default=0)),
+                ('seats_sold', models.IntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_loads', to='airport.route')),
+            ],
+            options={
+                'ordering': ['date', 'route'],
+                'indexes': [models.Index(fields=['date'], name='route_load_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('route', 'date'), name='unique_route_daily_load')],
+            },
+        ),
+        migrations.RunPython(
+            populate_route_daily_loads, migrations.RunPython.noop
+        ),
+    ]
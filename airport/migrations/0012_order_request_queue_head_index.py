@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-16 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0011_route_daily_load'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='order_request_queue_head_idx'),
+        ),
+    ]
@@ -1,10 +1,18 @@
 from datetime import timedelta
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
 
+from airport.seating import SeatMap
 from airport_api_service import settings
 
+AIRPLANE_REST_TIME = timedelta(hours=3)
+MAX_TIME_BETWEEN_FLIGHTS = timedelta(hours=24)
+
 
 class Airport(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -120,9 +128,28 @@ class Flight(models.Model):
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
     crew = models.ManyToManyField(Crew, related_name="flights")
+    seats_sold = models.PositiveIntegerField(default=0, editable=False)
+    seats_available = models.IntegerField(default=0, editable=False)
+    seat_map = models.BinaryField(default=b"", editable=False)
+    seats_held = models.PositiveIntegerField(default=0, editable=False)
+    hold_map = models.BinaryField(default=b"", editable=False)
+    holds_expire_at = models.DateTimeField(null=True, editable=False)
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    validation_context = None
 
     class Meta:
         ordering = ["departure_time", "arrival_time"]
+        indexes = [
+            models.Index(
+                fields=["departure_time", "arrival_time"],
+                name="flight_departure_arrival_idx"
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["airplane", "departure_time"],
@@ -145,7 +172,7 @@ class Flight(models.Model):
         if previous_arrival_time:
             if departure_time < previous_arrival_time:
                 next_possible_departure = (
-                    previous_arrival_time + timedelta(hours=3)
+                    previous_arrival_time + AIRPLANE_REST_TIME
                 )
                 raise error_to_raise(
                     f"Cannot schedule this flight "
@@ -155,9 +182,9 @@ class Flight(models.Model):
                     f"The next possible departure time is "
                     f"{next_possible_departure}."
                 )
-            if departure_time < previous_arrival_time + timedelta(hours=3):
+            if departure_time < previous_arrival_time + AIRPLANE_REST_TIME:
                 next_possible_departure = (
-                    previous_arrival_time + timedelta(hours=3)
+                    previous_arrival_time + AIRPLANE_REST_TIME
                 )
                 raise error_to_raise(
                     f"The airplane needs a 3-hour rest "
@@ -168,7 +195,7 @@ class Flight(models.Model):
                 )
 
             time_difference = departure_time - previous_arrival_time
-            if time_difference > timedelta(hours=24):
+            if time_difference > MAX_TIME_BETWEEN_FLIGHTS:
                 raise error_to_raise(
                     f"The time difference between consecutive flights "
                     f"shouldn't exceed 24 hours. "
@@ -204,44 +231,192 @@ class Flight(models.Model):
     def clean(self):
         super().clean()
 
-        previous_flight = (
-            Flight.objects
-            .filter(airplane=self.airplane)
-            .order_by("-arrival_time")
-            .first()
-        )
-        previous_arrival_time = None
+        from airport.scheduling import FlightValidationContext
 
-        if previous_flight:
-            previous_arrival_time = previous_flight.arrival_time
+        context = self.validation_context or FlightValidationContext()
+        context.validate_flight(
+            self.route,
+            self.airplane_id,
+            self.departure_time,
+            self.arrival_time,
+            ValidationError
+        )
 
-            available_routes = (
-                Route.objects
-                .filter(source=previous_flight.route.destination)
-            )
-            available_route_list = None
-            if available_routes:
-                available_route_list = ", ".join(
-                    [route.full_route for route in available_routes]
+    @staticmethod
+    def lock_seat_inventory(flight_ids):
+        """
+        Row-locks the flights in ascending id order, so concurrent
+        bookings spanning the same flights queue up instead of deadlocking
+        """
+        return {
+            flight.id: flight
+            for flight in (
+                Flight.objects
+                .select_for_update(of=("self",))
+                .select_related("airplane")
+                .only(
+                    "route",
+                    "departure_time",
+                    "seat_map",
+                    "hold_map",
+                    "holds_expire_at",
+                    "airplane",
+                    "airplane__rows",
+                    "airplane__seats_in_row"
                 )
+                .filter(pk__in=flight_ids)
+                .order_by("pk")
+            )
+        }
+
+    @staticmethod
+    def write_seat_inventory(
+            flight,
+            seat_map=None,
+            seats_delta=0,
+            hold_map=None,
+            held_delta=0,
+            route_loads=None,
+            **fields
+    ):
+        """
+        Stores the seat bitmaps of a locked flight in one UPDATE and adds
+        sold seats to the route's daily load.
+
+        Callers writing several flights pass a `route_loads` dict that
+        collects the sold seats per (route_id, date) instead, and apply
+        it with `RouteDailyLoad.add_seats_sold()` once all flights are
+        written, so rollup rows are always locked in key order.
+        """
+        if seat_map is not None:
+            fields["seat_map"] = seat_map.to_bytes()
+        if hold_map is not None:
+            fields["hold_map"] = hold_map.to_bytes()
+        if seats_delta:
+            key = (flight.route_id, timezone.localdate(flight.departure_time))
+            if route_loads is None:
+                RouteDailyLoad.add(*key, seats_sold=seats_delta)
+            else:
+                route_loads[key] = route_loads.get(key, 0) + seats_delta
+        Flight.objects.filter(pk=flight.id).update(
+            seats_sold=F("seats_sold") + seats_delta,
+            seats_held=F("seats_held") + held_delta,
+            seats_available=(
+                F("seats_available") - seats_delta - held_delta
+            ),
+            version=F("version") + 1,
+            **fields
+        )
 
-            Flight.validate_flight_departure_location(
-                self.route.source,
-                previous_flight.route.destination,
-                available_route_list,
-                ValidationError
+    @staticmethod
+    def update_seat_inventory(flight_id, occupied=(), released=()):
+        """Marks (row, seat) pairs taken or free and adjusts the counters"""
+        with transaction.atomic(savepoint=False):
+            flight = Flight.lock_seat_inventory([flight_id]).get(flight_id)
+            if flight is None:
+                return
+
+            seat_map = SeatMap.for_flight(flight)
+            for row, seat in occupied:
+                seat_map.occupy(row, seat)
+            for row, seat in released:
+                seat_map.release(row, seat)
+
+            Flight.write_seat_inventory(
+                flight, seat_map, len(occupied) - len(released)
             )
 
-        Flight.validate_flight_time(
-            self.departure_time,
-            self.arrival_time,
-            previous_arrival_time,
-            ValidationError
+    @staticmethod
+    def rebuild_seat_counters(flights=None):
+        """Recomputes seat counters from the ticket rows in one UPDATE"""
+        if flights is None:
+            flights = Flight.objects.all()
+
+        seats_sold = Coalesce(
+            Subquery(
+                Ticket.objects
+                .filter(flight=OuterRef("pk"))
+                .order_by()
+                .values("flight")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0
+        )
+        capacity = Subquery(
+            Airplane.objects
+            .filter(pk=OuterRef("airplane_id"))
+            .annotate(capacity=F("rows") * F("seats_in_row"))
+            .values("capacity")
+        )
+        return flights.update(
+            seats_sold=seats_sold,
+            seats_available=capacity - seats_sold - F("seats_held")
+        )
+
+    @staticmethod
+    def rebuild_seat_maps(flights=None, batch_size=1000):
+        """Rebuilds the seat occupancy bitmaps from the ticket rows"""
+        if flights is None:
+            flights = Flight.objects.all()
+
+        flights = flights.select_related("airplane").only(
+            "airplane", "airplane__rows", "airplane__seats_in_row"
         )
+        updated = 0
+        batch = []
+        for flight in flights.iterator(chunk_size=batch_size):
+            batch.append(flight)
+            if len(batch) >= batch_size:
+                updated += Flight._write_seat_maps(batch)
+                batch = []
+        if batch:
+            updated += Flight._write_seat_maps(batch)
+        return updated
+
+    @staticmethod
+    def _write_seat_maps(flights):
+        seat_maps = {
+            flight.pk: SeatMap(
+                flight.airplane.rows, flight.airplane.seats_in_row
+            )
+            for flight in flights
+        }
+        for flight_id, row, seat in (
+                Ticket.objects
+                .filter(flight_id__in=seat_maps)
+                .order_by()
+                .values_list("flight_id", "row", "seat")
+        ):
+            seat_maps[flight_id].occupy(row, seat)
+
+        for flight in flights:
+            flight.seat_map = seat_maps[flight.pk].to_bytes()
+        return Flight.objects.bulk_update(flights, ["seat_map"])
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        context = self.validation_context
+        if context is not None and context.relations_validated:
+            self.full_clean(
+                exclude=["route", "airplane"],
+                validate_unique=False,
+                validate_constraints=False
+            )
+        else:
+            self.full_clean()
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        self.seats_available = self.airplane.capacity - self.seats_sold
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            RouteDailyLoad.add(
+                self.route_id,
+                timezone.localdate(self.departure_time),
+                flights=1,
+                capacity=self.airplane.capacity,
+                seats_sold=self.seats_sold
+            )
 
     def __str__(self):
         return (
@@ -251,6 +426,154 @@ class Flight(models.Model):
         )
 
 
+class RouteDailyLoad(models.Model):
+    """Seats sold and offered on a route per departure day"""
+
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="daily_loads"
+    )
+    date = models.DateField()
+    flights = models.PositiveIntegerField(default=0)
+    seats_sold = models.IntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["date", "route"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["route", "date"],
+                name="unique_route_daily_load"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="route_load_date_idx"),
+        ]
+
+    @property
+    def load_factor(self) -> float | None:
+        return self.seats_sold / self.capacity if self.capacity else None
+
+    @staticmethod
+    def add(route_id, date, flights=0, capacity=0, seats_sold=0):
+        """Increments the counters of a route-day with a single upsert"""
+        table = connection.ops.quote_name(RouteDailyLoad._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} "
+                f"(route_id, date, flights, capacity, seats_sold) "
+                f"VALUES (%s, %s, %s, %s, %s) "
+                f"ON CONFLICT (route_id, date) DO UPDATE SET "
+                f"flights = {table}.flights + EXCLUDED.flights, "
+                f"capacity = {table}.capacity + EXCLUDED.capacity, "
+                f"seats_sold = {table}.seats_sold + EXCLUDED.seats_sold",
+                [route_id, date, flights, capacity, seats_sold]
+            )
+
+    @staticmethod
+    def add_seats_sold(route_loads):
+        """Applies seats sold per (route_id, date) in key order"""
+        for (route_id, date), seats_sold in sorted(route_loads.items()):
+            if seats_sold:
+                RouteDailyLoad.add(route_id, date, seats_sold=seats_sold)
+
+    @staticmethod
+    def add_flights(flights):
+        """Adds newly created flights (with airplanes loaded) in bulk"""
+        totals = {}
+        for flight in flights:
+            key = (flight.route_id, timezone.localdate(flight.departure_time))
+            count, capacity, seats_sold = totals.get(key, (0, 0, 0))
+            totals[key] = (
+                count + 1,
+                capacity + flight.airplane.capacity,
+                seats_sold + flight.seats_sold
+            )
+        for (route_id, date), (count, capacity, seats_sold) in sorted(
+                totals.items()
+        ):
+            RouteDailyLoad.add(
+                route_id,
+                date,
+                flights=count,
+                capacity=capacity,
+                seats_sold=seats_sold
+            )
+
+    @staticmethod
+    def remove_flight(flight):
+        """
+        Takes a deleted flight and its seats out of its route-day.
+
+        Its sold seats are already subtracted by the ticket deletions
+        that cascade before it. A plain UPDATE is used, so nothing is
+        written when the route-day went away with a deleted route.
+        """
+        RouteDailyLoad.objects.filter(
+            route_id=flight.route_id,
+            date=timezone.localdate(flight.departure_time)
+        ).update(
+            flights=F("flights") - 1,
+            capacity=F("capacity") - flight.airplane.capacity
+        )
+
+    @staticmethod
+    def rebuild(routes=None, batch_size=1000):
+        """
+        Recomputes the rollup rows from the flights' seat counters.
+
+        The table is locked against concurrent upserts first, so a
+        booking either commits before the totals are read or adds its
+        seats after the rebuilt rows are in place.
+        """
+        flights = Flight.objects.all()
+        loads = RouteDailyLoad.objects.all()
+        if routes is not None:
+            flights = flights.filter(route__in=routes)
+            loads = loads.filter(route__in=routes)
+
+        totals = (
+            flights
+            .annotate(date=TruncDate("departure_time"))
+            .order_by()
+            .values("route_id", "date")
+            .annotate(
+                flight_count=Count("id"),
+                seats=Sum(F("airplane__rows") * F("airplane__seats_in_row")),
+                sold=Sum("seats_sold"),
+            )
+        )
+        table = connection.ops.quote_name(RouteDailyLoad._meta.db_table)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"
+                )
+            loads.delete()
+            return len(
+                RouteDailyLoad.objects.bulk_create(
+                    [
+                        RouteDailyLoad(
+                            route_id=total["route_id"],
+                            date=total["date"],
+                            flights=total["flight_count"],
+                            capacity=total["seats"],
+                            seats_sold=total["sold"],
+                        )
+                        for total in totals
+                    ],
+                    batch_size=batch_size
+                )
+            )
+
+    def __str__(self):
+        return (
+            f"{self.route_id} {self.date}: "
+            f"{self.seats_sold}/{self.capacity}"
+        )
+
+
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(
@@ -261,11 +584,49 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"],
+                name="order_user_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return str(self.created_at.strftime("%Y-%m-%d %H:%M:%S"))
 
 
+class SeatHold(models.Model):
+    flight = models.ForeignKey(
+        Flight,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    seats = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["flight", "expires_at"],
+                name="seat_hold_flight_expiry_idx"
+            ),
+        ]
+
+    @property
+    def places(self):
+        return [(place["row"], place["seat"]) for place in self.seats]
+
+    def __str__(self):
+        return f"{self.flight_id}: {len(self.seats)} seats"
+
+
 class Ticket(models.Model):
     row = models.IntegerField()
     seat = models.IntegerField()
@@ -354,3 +715,79 @@ class Ticket(models.Model):
         return (
             f"{str(self.flight)} (row: {self.row}, seat: {self.seat})"
         )
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"],
+                name="unique_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class OrderRequest(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        CONFIRMED = "confirmed"
+        REJECTED = "rejected"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="order_requests"
+    )
+    flight = models.ForeignKey(
+        Flight,
+        on_delete=models.CASCADE,
+        related_name="order_requests"
+    )
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="request"
+    )
+    errors = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["flight", "id"],
+                condition=models.Q(status="pending"),
+                name="order_request_pending_idx"
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status="pending"),
+                name="order_request_queue_head_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {self.status}"
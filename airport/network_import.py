@@ -0,0 +1,355 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from airport.caching import bump_model_version
+from airport.models import (
+    Airport,
+    Route,
+    Crew,
+    AirplaneType,
+    Airplane,
+    Flight,
+    RouteDailyLoad,
+)
+from airport.scheduling import (
+    FlightValidationContext,
+    get_last_flights,
+    validate_flight_chain,
+)
+
+# in dependency order
+NETWORK_ENTITIES = (
+    "airplane_types",
+    "airports",
+    "airplanes",
+    "routes",
+    "crew",
+    "flights",
+)
+
+
+def read_rows(path):
+    """Yields (line number, row dict) from a CSV or JSON list file"""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with path.open() as file:
+            for index, row in enumerate(json.load(file), start=1):
+                yield index, row
+    else:
+        with path.open(newline="") as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def _error_message(error):
+    detail = error.detail if isinstance(error, ValidationError) else error
+    if isinstance(detail, (list, tuple)):
+        return " ".join(str(message) for message in detail)
+    return str(detail)
+
+
+class RowError(Exception):
+    pass
+
+
+class NetworkImporter:
+    """
+    Loads an airline network with one bulk INSERT per entity and batch.
+
+    Names are resolved to rows with in-memory maps of the existing and
+    imported objects, and rows are checked with the models' static
+    validators. Airports, airplane types, airplanes and routes that
+    already exist are reused. Invalid rows are collected in `errors` as
+    (entity, line, message) and skipped.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.errors = []
+        self.stats = {}
+        self.airplane_types = {
+            airplane_type.name: airplane_type
+            for airplane_type in AirplaneType.objects.all()
+        }
+        self.airports = {
+            airport.name: airport for airport in Airport.objects.all()
+        }
+        self.airplanes = {
+            airplane.name: airplane for airplane in Airplane.objects.all()
+        }
+        self.routes = {
+            (route.source_id, route.destination_id): route
+            for route in Route.objects.all()
+        }
+        self.crew = {}
+        for crew_member in Crew.objects.all():
+            self.crew.setdefault(crew_member.full_name, []).append(
+                crew_member
+            )
+
+    def run(self, sources):
+        """Imports the files of `sources`, a mapping of entity to path"""
+        for entity in NETWORK_ENTITIES:
+            if sources.get(entity):
+                self._import(entity, sources[entity])
+        return self.stats
+
+    def _import(self, entity, path):
+        started = time.perf_counter()
+        rows = list(read_rows(path))
+        build = getattr(self, f"_build_{entity}")
+        objects = []
+        existing = 0
+        for line, row in rows:
+            try:
+                obj = build(row)
+            except RowError as error:
+                self.errors.append((entity, line, str(error)))
+                continue
+            if obj is None:
+                existing += 1
+            else:
+                objects.append((line, obj))
+
+        created = getattr(self, f"_create_{entity}")(objects)
+        elapsed = time.perf_counter() - started
+        self.stats[entity] = {
+            "rows": len(rows),
+            "created": created,
+            "existing": existing,
+            "failed": len(rows) - created - existing,
+            "seconds": elapsed,
+            "rows_per_second": len(rows) / elapsed if elapsed else None,
+        }
+
+    @staticmethod
+    def _field(row, name):
+        value = row.get(name)
+        if value is None or str(value).strip() == "":
+            raise RowError(f"Missing {name}.")
+        return str(value).strip()
+
+    @staticmethod
+    def _positive_int(row, name):
+        value = NetworkImporter._field(row, name)
+        try:
+            number = int(value)
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise RowError(f"{name} must be a positive integer: {value}.")
+        return number
+
+    @staticmethod
+    def _lookup(objects, name, kind):
+        # None marks a name whose row has not been inserted
+        obj = objects.get(name)
+        if obj is None:
+            raise RowError(f"Unknown {kind}: {name}.")
+        return obj
+
+    def _datetime(self, row, name):
+        value = self._field(row, name)
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise RowError(f"Invalid {name}: {value}.")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def _bulk_create(self, model, objects, register):
+        created = model.objects.bulk_create(
+            [obj for _, obj in objects], batch_size=self.batch_size
+        )
+        for obj in created:
+            register(obj)
+        if created:
+            bump_model_version(model)
+        return len(created)
+
+    def _build_airplane_types(self, row):
+        name = self._field(row, "name")
+        if name in self.airplane_types:
+            return None
+        self.airplane_types[name] = None
+        return AirplaneType(name=name)
+
+    def _create_airplane_types(self, objects):
+        return self._bulk_create(
+            AirplaneType,
+            objects,
+            lambda obj: self.airplane_types.__setitem__(obj.name, obj)
+        )
+
+    def _build_airports(self, row):
+        name = self._field(row, "name")
+        if name in self.airports:
+            return None
+        airport = Airport(
+            name=name,
+            closest_big_city=self._field(row, "closest_big_city")
+        )
+        self.airports[name] = None
+        return airport
+
+    def _create_airports(self, objects):
+        return self._bulk_create(
+            Airport,
+            objects,
+            lambda obj: self.airports.__setitem__(obj.name, obj)
+        )
+
+    def _build_airplanes(self, row):
+        name = self._field(row, "name")
+        if name in self.airplanes:
+            return None
+        airplane = Airplane(
+            name=name,
+            rows=self._positive_int(row, "rows"),
+            seats_in_row=self._positive_int(row, "seats_in_row"),
+            airplane_type=self._lookup(
+                self.airplane_types,
+                self._field(row, "airplane_type"),
+                "airplane type"
+            ),
+        )
+        self.airplanes[name] = None
+        return airplane
+
+    def _create_airplanes(self, objects):
+        return self._bulk_create(
+            Airplane,
+            objects,
+            lambda obj: self.airplanes.__setitem__(obj.name, obj)
+        )
+
+    def _build_routes(self, row):
+        source = self._lookup(
+            self.airports, self._field(row, "source"), "airport"
+        )
+        destination = self._lookup(
+            self.airports, self._field(row, "destination"), "airport"
+        )
+        distance = self._positive_int(row, "distance")
+        try:
+            Route.validate_route(source, destination, ValidationError)
+        except ValidationError as error:
+            raise RowError(_error_message(error)) from error
+
+        key = (source.id, destination.id)
+        if key in self.routes:
+            return None
+        self.routes[key] = None
+        return Route(source=source, destination=destination, distance=distance)
+
+    def _create_routes(self, objects):
+        return self._bulk_create(
+            Route,
+            objects,
+            lambda obj: self.routes.__setitem__(
+                (obj.source_id, obj.destination_id), obj
+            )
+        )
+
+    def _build_crew(self, row):
+        crew_member = Crew(
+            first_name=self._field(row, "first_name"),
+            last_name=self._field(row, "last_name")
+        )
+        if crew_member.full_name in self.crew:
+            return None
+        self.crew[crew_member.full_name] = None
+        return crew_member
+
+    def _create_crew(self, objects):
+        return self._bulk_create(
+            Crew,
+            objects,
+            lambda obj: self.crew.__setitem__(obj.full_name, [obj])
+        )
+
+    def _crew_member(self, full_name):
+        crew = self._lookup(self.crew, full_name, "crew member")
+        if len(crew) > 1:
+            raise RowError(f"Ambiguous crew member: {full_name}.")
+        return crew[0]
+
+    def _build_flights(self, row):
+        source = self._lookup(
+            self.airports, self._field(row, "source"), "airport"
+        )
+        destination = self._lookup(
+            self.airports, self._field(row, "destination"), "airport"
+        )
+        route = self.routes.get((source.id, destination.id))
+        if route is None:
+            raise RowError(
+                f"Unknown route: {source.name} - {destination.name}."
+            )
+        crew_names = row.get("crew") or ""
+        if isinstance(crew_names, str):
+            crew_names = crew_names.split(";")
+        return {
+            "route": route,
+            "airplane": self._lookup(
+                self.airplanes, self._field(row, "airplane"), "airplane"
+            ),
+            "departure_time": self._datetime(row, "departure_time"),
+            "arrival_time": self._datetime(row, "arrival_time"),
+            "crew": [
+                self._crew_member(name.strip())
+                for name in crew_names
+                if name.strip()
+            ],
+        }
+
+    def _create_flights(self, objects):
+        flights_data = [flight_data for _, flight_data in objects]
+        context = FlightValidationContext(
+            get_last_flights(
+                {flight_data["airplane"].id for flight_data in flights_data}
+            )
+        )
+        chain_errors = validate_flight_chain(flights_data, context)
+        for index, error in sorted(chain_errors.items()):
+            self.errors.append(
+                ("flights", objects[index][0], _error_message(error))
+            )
+
+        valid = [
+            flight_data
+            for index, flight_data in enumerate(flights_data)
+            if index not in chain_errors
+        ]
+        flights = Flight.objects.bulk_create(
+            [
+                Flight(
+                    route=flight_data["route"],
+                    airplane=flight_data["airplane"],
+                    departure_time=flight_data["departure_time"],
+                    arrival_time=flight_data["arrival_time"],
+                    seats_available=flight_data["airplane"].capacity,
+                )
+                for flight_data in valid
+            ],
+            batch_size=self.batch_size
+        )
+        Flight.crew.through.objects.bulk_create(
+            [
+                Flight.crew.through(flight_id=flight.id, crew_id=crew_id)
+                for flight, flight_data in zip(flights, valid)
+                for crew_id in dict.fromkeys(
+                    crew.id for crew in flight_data["crew"]
+                )
+            ],
+            batch_size=self.batch_size
+        )
+        RouteDailyLoad.add_flights(flights)
+        return len(flights)
@@ -0,0 +1,78 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from airport.models import OrderRequest
+from airport.serializers import OrderSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _process_request(order_request):
+    """
+    Books one request in its own savepoint.
+
+    Unexpected failures are logged and reject the request, so they
+    neither roll back the rest of the batch nor leave the request at
+    the head of the queue.
+    """
+    serializer = OrderSerializer(data=order_request.payload)
+    try:
+        with transaction.atomic():
+            serializer.is_valid(raise_exception=True)
+            order_request.order = serializer.save(user=order_request.user)
+        order_request.status = OrderRequest.Status.CONFIRMED
+    except ValidationError as error:
+        order_request.errors = error.detail
+        order_request.status = OrderRequest.Status.REJECTED
+    except Exception:
+        logger.exception("Order request %s failed", order_request.pk)
+        order_request.errors = {
+            "detail": "Order request could not be processed."
+        }
+        order_request.status = OrderRequest.Status.REJECTED
+    order_request.processed_at = timezone.now()
+    order_request.save(
+        update_fields=["order", "status", "errors", "processed_at"]
+    )
+
+
+def process_next_batch(batch_size=50):
+    """
+    Confirms or rejects up to `batch_size` pending requests of one flight.
+
+    Requests locked by other workers are skipped, so workers drain
+    different flights in parallel. A batch runs in one transaction
+    that takes the flight's seat inventory lock once for all its
+    requests. Returns the number of processed requests.
+    """
+    pending = (
+        OrderRequest.objects
+        .select_for_update(skip_locked=True)
+        .filter(status=OrderRequest.Status.PENDING)
+    )
+    with transaction.atomic():
+        head = pending.order_by("id").only("flight").first()
+        if head is None:
+            return 0
+
+        batch = list(
+            pending
+            .filter(flight_id=head.flight_id)
+            .select_related("user")
+            .order_by("id")[:batch_size]
+        )
+        for order_request in batch:
+            _process_request(order_request)
+        return len(batch)
+
+
+def drain_queue(batch_size=50):
+    processed = 0
+    while True:
+        batch = process_next_batch(batch_size)
+        if not batch:
+            return processed
+        processed += batch
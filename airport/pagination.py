@@ -0,0 +1,171 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Seeks past the last row of the previous page instead of using OFFSET.
+
+    The cursor holds the values of every ordering field of the boundary
+    row and no total count is ever computed. The ordering must end with a
+    unique field and lead with an indexed one, so the seek filter's
+    bound on that field lets any page start with an index seek.
+    """
+
+    page_size = 5
+    ordering = ("id",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(_invert_ordering(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(
+                _seek_filter(queryset.model, ordering, self.position)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._get_position(self.page[0]), True)
+
+    def encode_cursor(self, position, reverse):
+        payload = {"p": position}
+        if reverse:
+            payload["r"] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position = payload["p"]
+            reverse = bool(payload.get("r"))
+        except (BinasciiError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message) from None
+
+        if (
+                not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(
+                    isinstance(value, (str, int, float))
+                    for value in position
+                )
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def _get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+
+class FlightKeysetPagination(KeysetPagination):
+    ordering = ("departure_time", "arrival_time", "id")
+
+
+class OrderKeysetPagination(KeysetPagination):
+    ordering = ("-created_at", "id")
+
+
+class KeysetPaginationMixin:
+    """
+    Switches a viewset to keyset pagination when the request carries
+    the cursor parameter (an empty value requests the first page).
+    """
+
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if (
+                    self.keyset_pagination_class is not None
+                    and request is not None
+                    and self.keyset_pagination_class.cursor_query_param
+                    in request.query_params
+            ):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
+
+
+def _invert_ordering(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _seek_filter(model, ordering, position):
+    """
+    Builds `a >= x AND ((a > x) OR (a = x AND b > y) OR ...)` for the
+    given ordering, comparing with `<` on descending fields.
+
+    The leading bound is redundant, but without it the planner can only
+    apply the OR expansion as a filter over an index scan starting at
+    the first row, so deeper pages would cost more.
+    """
+    condition = Q()
+    equal = Q()
+    bound = None
+    for field, value in zip(ordering, position):
+        name = field.lstrip("-")
+        try:
+            value = model._meta.get_field(name).to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(KeysetPagination.invalid_cursor_message) from None
+        descending = field.startswith("-")
+        if bound is None:
+            lookup = "lte" if descending else "gte"
+            bound = Q(**{f"{name}__{lookup}": value})
+        lookup = "lt" if descending else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return bound & condition
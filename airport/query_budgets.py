@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Maximum number of SQL queries per "<basename>-<action>" request. List
+# budgets must not depend on the page size, so a query per row shows up
+# as soon as a page holds more than one row.
+QUERY_BUDGETS = {
+    "airport-list": 1,
+    "airport-retrieve": 1,
+    "airport-create": 2,
+    "route-list": 1,
+    "route-retrieve": 1,
+    "route-create": 7,
+    "crew-list": 1,
+    "crew-retrieve": 1,
+    "crew-create": 1,
+    "crew-update": 2,
+    "crew-partial_update": 2,
+    "crew-destroy": 3,
+    "airplanetype-list": 1,
+    "airplanetype-retrieve": 1,
+    "airplanetype-create": 2,
+    "airplane-list": 1,
+    "airplane-retrieve": 1,
+    "airplane-create": 3,
+    "airplane-timeline": 2,
+    "flight-list": 3,
+    "flight-retrieve": 3,
+    "flight-create": 12,
+    "flight-bulk": 11,
+    "order-list": 4,
+    "order-retrieve": 4,
+    "order-create": 14,
+    "order-export": 1,
+    "order-auto_assign": 16,
+    "order-request-create": 2,
+    "order-request-retrieve": 1,
+    "seat-hold-create": 7,
+    "seat-hold-retrieve": 1,
+    "seat-hold-destroy": 7,
+    "seat-hold-confirm": 18,
+    "route-load-list": 2,
+    "itinerary-list": 4,
+    "cache-stats-list": 0,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(name):
+    """
+    Fails with the executed SQL when the block runs more queries than
+    the budget of `name`
+    """
+    budget = QUERY_BUDGETS[name]
+    with CaptureQueriesContext(connection) as queries:
+        yield queries
+    if len(queries) > budget:
+        statements = "\n".join(
+            f"{index}. {query['sql']}"
+            for index, query in enumerate(queries.captured_queries, start=1)
+        )
+        raise QueryBudgetExceeded(
+            f"{name} ran {len(queries)} queries, over its budget of "
+            f"{budget}:\n{statements}"
+        )
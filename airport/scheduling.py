@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F, RowRange, Window
+from django.db.models.functions import FirstValue, Lag
+from rest_framework.exceptions import ValidationError
+
+from airport.models import (
+    AIRPLANE_REST_TIME,
+    MAX_TIME_BETWEEN_FLIGHTS,
+    Flight,
+    Route,
+)
+
+
+def get_last_flights(airplane_ids):
+    """Latest arriving flight (or None) of every airplane, in one query"""
+    last_flights = dict.fromkeys(airplane_ids)
+    last_flights.update(
+        (flight.airplane_id, flight)
+        for flight in (
+            Flight.objects
+            .filter(airplane_id__in=airplane_ids)
+            .select_related("route")
+            .order_by("airplane_id", "-arrival_time")
+            .distinct("airplane_id")
+        )
+    )
+    return last_flights
+
+
+class FlightValidationContext:
+    """
+    Caches the scheduling lookups made while validating flights.
+
+    One context is shared by the serializer and `Flight.clean()` within
+    a request, so the previous flight of an airplane and the routes
+    leaving an airport are each queried at most once. When
+    `relations_validated` is set, `Flight.save()` also trusts the
+    caller's foreign-key and uniqueness checks instead of repeating them.
+    """
+
+    def __init__(self, last_flights=None, relations_validated=False):
+        self.last_flights = dict(last_flights or {})
+        self.available_route_lists = {}
+        self.relations_validated = relations_validated
+
+    def get_last_flight(self, airplane_id):
+        if airplane_id not in self.last_flights:
+            self.last_flights[airplane_id] = (
+                Flight.objects
+                .filter(airplane_id=airplane_id)
+                .select_related("route")
+                .order_by("-arrival_time")
+                .first()
+            )
+        return self.last_flights[airplane_id]
+
+    def get_available_route_list(self, airport_id):
+        if airport_id not in self.available_route_lists:
+            routes = (
+                Route.objects
+                .filter(source_id=airport_id)
+                .select_related("source", "destination")
+            )
+            self.available_route_lists[airport_id] = ", ".join(
+                route.full_route for route in routes
+            ) or None
+        return self.available_route_lists[airport_id]
+
+    def validate_flight(
+            self,
+            route,
+            airplane_id,
+            departure_time,
+            arrival_time,
+            error_to_raise
+    ):
+        """Validates a flight against the airplane's last stored flight"""
+        previous_flight = self.get_last_flight(airplane_id)
+        previous_arrival_time = None
+        previous_destination_id = None
+        if previous_flight:
+            previous_arrival_time = previous_flight.arrival_time
+            previous_destination_id = previous_flight.route.destination_id
+
+        self.validate_next_flight(
+            route,
+            departure_time,
+            arrival_time,
+            previous_arrival_time,
+            previous_destination_id,
+            error_to_raise
+        )
+
+    def validate_next_flight(
+            self,
+            route,
+            departure_time,
+            arrival_time,
+            previous_arrival_time,
+            previous_destination_id,
+            error_to_raise
+    ):
+        if previous_destination_id is not None:
+            available_route_list = None
+            if route.source_id != previous_destination_id:
+                available_route_list = self.get_available_route_list(
+                    previous_destination_id
+                )
+            Flight.validate_flight_departure_location(
+                route.source_id,
+                previous_destination_id,
+                available_route_list,
+                error_to_raise
+            )
+
+        Flight.validate_flight_time(
+            departure_time,
+            arrival_time,
+            previous_arrival_time,
+            error_to_raise
+        )
+
+
+def validate_flight_chain(flights, context):
+    """
+    Validates new flights against each airplane's schedule in memory.
+
+    `flights` are dicts with route, airplane, departure_time and
+    arrival_time; every airplane's flights are checked in departure
+    order, each against the one before it (or the airplane's last
+    stored flight). Returns a mapping of flight index to error messages.
+    """
+    errors = {}
+    chains = defaultdict(list)
+    for index, flight in enumerate(flights):
+        chains[flight["airplane"].id].append(index)
+
+    for airplane_id, indexes in chains.items():
+        indexes.sort(key=lambda i: flights[i]["departure_time"])
+        previous_arrival_time = None
+        previous_destination_id = None
+        previous_flight = context.get_last_flight(airplane_id)
+        if previous_flight:
+            previous_arrival_time = previous_flight.arrival_time
+            previous_destination_id = previous_flight.route.destination_id
+
+        for index in indexes:
+            flight = flights[index]
+            try:
+                context.validate_next_flight(
+                    flight["route"],
+                    flight["departure_time"],
+                    flight["arrival_time"],
+                    previous_arrival_time,
+                    previous_destination_id,
+                    ValidationError
+                )
+            except ValidationError as error:
+                errors[index] = error.detail
+                continue
+
+            previous_arrival_time = flight["arrival_time"]
+            previous_destination_id = flight["route"].destination_id
+
+    return errors
+
+
+def _previous(expression, order_by):
+    return Window(Lag(expression), order_by=order_by)
+
+
+def get_airplane_timeline(airplane_id, date_from=None, date_to=None):
+    """
+    Flights of an airplane in departure order, each annotated with its
+    predecessor's id, arrival time and destination via LAG() and checked
+    against the scheduling rules, all in one query.
+
+    The date range filters a window annotation, which Django applies
+    outside the windowed subquery, so the first flight in range is still
+    compared with the flight before it.
+    """
+    order_by = [F("departure_time").asc(), F("id").asc()]
+    flights = (
+        Flight.objects
+        .filter(airplane_id=airplane_id)
+        .select_related("route__source", "route__destination")
+        .annotate(
+            previous_flight_id=_previous("id", order_by),
+            previous_arrival_time=_previous("arrival_time", order_by),
+            previous_destination_id=_previous(
+                "route__destination_id", order_by
+            ),
+            scheduled_departure=Window(
+                FirstValue("departure_time"),
+                order_by=order_by,
+                frame=RowRange(start=0, end=0)
+            ),
+        )
+        .order_by("departure_time", "id")
+    )
+    if date_from:
+        flights = flights.filter(scheduled_departure__gte=date_from)
+    if date_to:
+        flights = flights.filter(scheduled_departure__lt=date_to)
+
+    timeline = list(flights)
+    for flight in timeline:
+        flight.turnaround = None
+        flight.violations = []
+        if flight.previous_flight_id is None:
+            continue
+
+        flight.turnaround = (
+            flight.departure_time - flight.previous_arrival_time
+        )
+        if flight.turnaround < AIRPLANE_REST_TIME:
+            flight.violations.append(
+                "overlap" if flight.turnaround < timedelta() else "rest"
+            )
+        elif flight.turnaround > MAX_TIME_BETWEEN_FLIGHTS:
+            flight.violations.append("gap")
+        if flight.route.source_id != flight.previous_destination_id:
+            flight.violations.append("location")
+    return timeline
@@ -0,0 +1,136 @@
+from base64 import b64encode
+
+
+class SeatMap:
+    """
+    Occupancy bitset of an airplane cabin, one bit per seat.
+
+    Seats are numbered row-major starting from (1, 1); seat `(row, seat)`
+    is bit `(row - 1) * seats_in_row + (seat - 1)`, stored most significant
+    bit first within each byte.
+    """
+
+    def __init__(self, rows, seats_in_row, bitmap=b""):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        size = (rows * seats_in_row + 7) // 8
+        self.bits = bytearray(bytes(bitmap or b"")[:size]).ljust(size, b"\0")
+
+    @classmethod
+    def for_flight(cls, flight):
+        return cls(
+            flight.airplane.rows,
+            flight.airplane.seats_in_row,
+            flight.seat_map
+        )
+
+    @classmethod
+    def holds_for_flight(cls, flight):
+        return cls(
+            flight.airplane.rows,
+            flight.airplane.seats_in_row,
+            flight.hold_map
+        )
+
+    def _index(self, row, seat):
+        return (row - 1) * self.seats_in_row + (seat - 1)
+
+    def is_taken(self, row, seat):
+        index = self._index(row, seat)
+        return bool(self.bits[index >> 3] & (0x80 >> (index & 7)))
+
+    def occupy(self, row, seat):
+        index = self._index(row, seat)
+        self.bits[index >> 3] |= 0x80 >> (index & 7)
+
+    def release(self, row, seat):
+        index = self._index(row, seat)
+        self.bits[index >> 3] &= ~(0x80 >> (index & 7)) & 0xFF
+
+    def union(self, other):
+        """Seats taken in either map"""
+        return SeatMap(
+            self.rows,
+            self.seats_in_row,
+            bytes(a | b for a, b in zip(self.bits, other.bits))
+        )
+
+    def taken_places(self):
+        """Yields taken (row, seat) pairs in row, seat order"""
+        for byte_index, byte in enumerate(self.bits):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    index = (byte_index << 3) + bit
+                    yield (
+                        index // self.seats_in_row + 1,
+                        index % self.seats_in_row + 1
+                    )
+
+    def free_places(self):
+        """Yields free (row, seat) pairs in row, seat order"""
+        for index in range(self.rows * self.seats_in_row):
+            if not self.bits[index >> 3] & (0x80 >> (index & 7)):
+                yield (
+                    index // self.seats_in_row + 1,
+                    index % self.seats_in_row + 1
+                )
+
+    def find_adjacent_seats(self, count):
+        """
+        First `count` side-by-side free seats in one row, front rows first.
+
+        Each row is read as an integer mask of free seats; ANDing it with
+        itself shifted `count - 1` times leaves a bit set only where a
+        run of `count` free seats starts.
+        """
+        if not 1 <= count <= self.seats_in_row:
+            return []
+
+        padding = len(self.bits) * 8 - self.rows * self.seats_in_row
+        taken = int.from_bytes(self.bits, "big") >> padding
+        row_mask = (1 << self.seats_in_row) - 1
+        for row in range(1, self.rows + 1):
+            shift = (self.rows - row) * self.seats_in_row
+            free = ~(taken >> shift) & row_mask
+            runs = free
+            for _ in range(count - 1):
+                runs &= runs >> 1
+            if runs:
+                # the highest set bit is the leftmost run
+                first_seat = self.seats_in_row - runs.bit_length() - count + 2
+                return [
+                    (row, seat)
+                    for seat in range(first_seat, first_seat + count)
+                ]
+        return []
+
+    def find_free_seats(self, count, adjacent=False):
+        """
+        Picks `count` free seats, side by side when possible.
+
+        With `adjacent` only a single-row block is accepted; otherwise the
+        first free seats front to back are used. Returns [] when the
+        request cannot be met.
+        """
+        places = self.find_adjacent_seats(count)
+        if places or adjacent:
+            return places
+
+        places = []
+        for place in self.free_places():
+            places.append(place)
+            if len(places) == count:
+                return places
+        return []
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+    def encode(self):
+        return {
+            "rows": self.rows,
+            "seats_in_row": self.seats_in_row,
+            "bitmap": b64encode(self.bits).decode("ascii"),
+        }
@@ -1,8 +1,12 @@
+from datetime import timedelta
+
 from django.utils import timezone
 from django.db import transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from airport.booking import book_best_available, book_tickets, hold_seats
 from airport.models import (
     Airport,
     Route,
@@ -10,9 +14,18 @@ from airport.models import (
     AirplaneType,
     Airplane,
     Flight,
+    SeatHold,
     Ticket,
-    Order
+    Order,
+    OrderRequest,
+    RouteDailyLoad
+)
+from airport.scheduling import (
+    FlightValidationContext,
+    get_last_flights,
+    validate_flight_chain,
 )
+from airport.seating import SeatMap
 
 
 class AirportSerializer(serializers.ModelSerializer):
@@ -88,6 +101,38 @@ class AirplaneDetailSerializer(AirplaneSerializer):
     )
 
 
+class AirplaneTimelineFlightSerializer(serializers.ModelSerializer):
+    full_route = serializers.CharField(
+        source="route.full_route",
+        read_only=True
+    )
+    departure_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
+    arrival_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
+    previous_flight = serializers.IntegerField(
+        source="previous_flight_id",
+        allow_null=True
+    )
+    turnaround = serializers.DurationField(allow_null=True)
+    violations = serializers.ListField(
+        child=serializers.ChoiceField(
+            choices=("overlap", "rest", "gap", "location")
+        ),
+        help_text="Scheduling rules broken against the previous flight"
+    )
+
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "full_route",
+            "departure_time",
+            "arrival_time",
+            "previous_flight",
+            "turnaround",
+            "violations",
+        )
+
+
 class FlightSerializer(serializers.ModelSerializer):
     class Meta:
         model = Flight
@@ -101,46 +146,112 @@ class FlightSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        airplane = data.get("airplane")
-        route = data.get("route")
-        departure_time = data.get("departure_time")
-        arrival_time = data.get("arrival_time")
-
-        previous_flight = (
-            Flight.objects
-            .filter(airplane=airplane)
-            .order_by("-arrival_time")
-            .first()
+        self.validation_context = FlightValidationContext(
+            relations_validated=True
+        )
+        self.validation_context.validate_flight(
+            data.get("route"),
+            data.get("airplane").id,
+            data.get("departure_time"),
+            data.get("arrival_time"),
+            ValidationError
         )
-        previous_arrival_time = None
+        return data
 
-        if previous_flight:
-            previous_arrival_time = previous_flight.arrival_time
+    def create(self, validated_data):
+        crew = validated_data.pop("crew", [])
+        flight = Flight(**validated_data)
+        flight.validation_context = getattr(self, "validation_context", None)
+        flight.save()
+        flight.crew.add(*crew)
+        return flight
 
-            available_routes = Route.objects.filter(
-                source=previous_flight.route.destination
-            )
-            available_route_list = None
-            if available_routes:
-                available_route_list = ", ".join(
-                    [route.full_route for route in available_routes]
-                )
-
-            Flight.validate_flight_departure_location(
-                route.source,
-                previous_flight.route.destination,
-                available_route_list,
-                ValidationError
-            )
 
-        Flight.validate_flight_time(
-            departure_time,
-            arrival_time,
-            previous_arrival_time,
-            ValidationError
+INVALID_PK_MESSAGE = (
+    serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+)
+
+
+class FlightBulkItemSerializer(serializers.Serializer):
+    route = serializers.IntegerField()
+    airplane = serializers.IntegerField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    crew = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list
+    )
+
+
+class FlightBulkSerializer(serializers.Serializer):
+    flights = FlightBulkItemSerializer(many=True, allow_empty=False)
+
+    def validate_flights(self, flights):
+        routes = Route.objects.in_bulk({flight["route"] for flight in flights})
+        airplanes = Airplane.objects.in_bulk(
+            {flight["airplane"] for flight in flights}
+        )
+        crew_ids = set(
+            Crew.objects
+            .filter(pk__in={pk for flight in flights for pk in flight["crew"]})
+            .values_list("id", flat=True)
         )
 
-        return data
+        errors = [{} for _ in flights]
+        for flight, flight_errors in zip(flights, errors):
+            for field, objects in (("route", routes), ("airplane", airplanes)):
+                if flight[field] not in objects:
+                    flight_errors[field] = [
+                        INVALID_PK_MESSAGE.format(pk_value=flight[field])
+                    ]
+                else:
+                    flight[field] = objects[flight[field]]
+            missing_crew = [pk for pk in flight["crew"] if pk not in crew_ids]
+            if missing_crew:
+                flight_errors["crew"] = [
+                    INVALID_PK_MESSAGE.format(pk_value=pk)
+                    for pk in missing_crew
+                ]
+        if any(errors):
+            raise ValidationError(errors)
+
+        chain_errors = validate_flight_chain(
+            flights, FlightValidationContext(get_last_flights(airplanes))
+        )
+        if chain_errors:
+            for index, detail in chain_errors.items():
+                errors[index]["non_field_errors"] = detail
+            raise ValidationError(errors)
+
+        return flights
+
+    def create(self, validated_data):
+        flights_data = validated_data["flights"]
+        with transaction.atomic():
+            flights = Flight.objects.bulk_create(
+                [
+                    Flight(
+                        route=flight_data["route"],
+                        airplane=flight_data["airplane"],
+                        departure_time=flight_data["departure_time"],
+                        arrival_time=flight_data["arrival_time"],
+                        seats_available=flight_data["airplane"].capacity,
+                    )
+                    for flight_data in flights_data
+                ],
+                batch_size=1000
+            )
+            Flight.crew.through.objects.bulk_create(
+                [
+                    Flight.crew.through(flight_id=flight.id, crew_id=crew_id)
+                    for flight, flight_data in zip(flights, flights_data)
+                    for crew_id in dict.fromkeys(flight_data["crew"])
+                ],
+                batch_size=1000
+            )
+            RouteDailyLoad.add_flights(flights)
+        return flights
 
 
 class FlightListSerializer(FlightSerializer):
@@ -164,6 +275,11 @@ class TicketSeatsSerializer(serializers.ModelSerializer):
         fields = ("row", "seat")
 
 
+def _unavailable_seats(flight):
+    """Seats either sold or held by an active seat hold"""
+    return SeatMap.for_flight(flight).union(SeatMap.holds_for_flight(flight))
+
+
 class FlightDetailSerializer(serializers.ModelSerializer):
     full_route = serializers.CharField(
         source="route.full_route",
@@ -179,10 +295,11 @@ class FlightDetailSerializer(serializers.ModelSerializer):
     )
     departure_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
     arrival_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
-    tickets_available = serializers.IntegerField(read_only=True)
-    taken_places = TicketSeatsSerializer(
-        source="tickets", many=True, read_only=True
+    tickets_available = serializers.IntegerField(
+        source="seats_available",
+        read_only=True
     )
+    taken_places = serializers.SerializerMethodField()
     crew = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -203,11 +320,113 @@ class FlightDetailSerializer(serializers.ModelSerializer):
             "crew",
         )
 
+    @extend_schema_field(TicketSeatsSerializer(many=True))
+    def get_taken_places(self, obj):
+        return [
+            {"row": row, "seat": seat}
+            for row, seat in _unavailable_seats(obj).taken_places()
+        ]
+
+
+class SeatMapSerializer(serializers.Serializer):
+    rows = serializers.IntegerField()
+    seats_in_row = serializers.IntegerField()
+    bitmap = serializers.CharField(
+        help_text="Base64 row-major bitset, most significant bit first; "
+                  "bit (row - 1) * seats_in_row + (seat - 1) "
+                  "is set for taken or held seats"
+    )
+
+
+class FlightSeatMapDetailSerializer(FlightDetailSerializer):
+    seat_map = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "full_route",
+            "departure_time",
+            "arrival_time",
+            "airplane_name",
+            "airplane_capacity",
+            "tickets_available",
+            "seat_map",
+            "crew",
+        )
+
+    @extend_schema_field(SeatMapSerializer)
+    def get_seat_map(self, obj):
+        return _unavailable_seats(obj).encode()
+
+
+class ItinerarySearchSerializer(serializers.Serializer):
+    source = serializers.PrimaryKeyRelatedField(queryset=Airport.objects)
+    destination = serializers.PrimaryKeyRelatedField(
+        queryset=Airport.objects
+    )
+    date = serializers.DateField()
+    max_legs = serializers.IntegerField(min_value=1, max_value=4, default=2)
+    min_connection = serializers.IntegerField(
+        min_value=0,
+        default=60,
+        help_text="Minimum connection time in minutes"
+    )
+    max_connection = serializers.IntegerField(
+        min_value=1,
+        max_value=24 * 60,
+        default=12 * 60,
+        help_text="Maximum connection time in minutes"
+    )
+    seats = serializers.IntegerField(min_value=1, default=1)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+    def validate(self, data):
+        Route.validate_route(
+            data["source"],
+            data["destination"],
+            ValidationError
+        )
+        if data["min_connection"] > data["max_connection"]:
+            raise ValidationError(
+                "Minimum connection time cannot exceed "
+                "maximum connection time."
+            )
+        return data
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
+    arrival_time = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
+    duration = serializers.DurationField()
+    connections = serializers.IntegerField()
+    legs = FlightListSerializer(many=True)
+
+
+class PrefetchedFlightField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves flights from the `prefetched_flights` map of the root
+    serializer, falling back to a query for ids it does not hold.
+    """
+
+    def to_internal_value(self, data):
+        flights = getattr(self.root, "prefetched_flights", None) or {}
+        try:
+            return flights[int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
 
 class TicketSerializer(serializers.ModelSerializer):
+    flight = PrefetchedFlightField(
+        queryset=Flight.objects.select_related("airplane")
+    )
+
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "flight")
+        # seat uniqueness is checked for the whole order at insert time
+        validators = []
 
     def validate(self, attrs):
         data = super().validate(attrs=attrs)
@@ -259,6 +478,22 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "created_at", "tickets")
 
+    def to_internal_value(self, data):
+        tickets = data.get("tickets") if isinstance(data, dict) else None
+        if isinstance(tickets, list):
+            flight_ids = set()
+            for ticket in tickets:
+                try:
+                    flight_ids.add(int(ticket["flight"]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            self.prefetched_flights = (
+                Flight.objects
+                .select_related("airplane")
+                .in_bulk(flight_ids)
+            )
+        return super().to_internal_value(data)
+
     def validate(self, attrs):
         data = super().validate(attrs=attrs)
         created_at = (
@@ -277,11 +512,101 @@ class OrderSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
             order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
+            book_tickets(order, tickets_data)
             return order
 
 
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.select_related("airplane")
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+    ttl = serializers.IntegerField(
+        min_value=1,
+        max_value=30,
+        default=10,
+        write_only=True,
+        help_text="Hold duration in minutes"
+    )
+
+    class Meta:
+        model = SeatHold
+        fields = ("id", "flight", "seats", "ttl", "created_at", "expires_at")
+        read_only_fields = ("created_at", "expires_at")
+
+    def validate(self, attrs):
+        data = super().validate(attrs=attrs)
+        flight = data["flight"]
+        Ticket.validate_ticket_flight(
+            timezone.now(),
+            flight.departure_time,
+            ValidationError
+        )
+
+        places = set()
+        for seat in data["seats"]:
+            Ticket.validate_ticket_row_seat(
+                seat["row"],
+                seat["seat"],
+                flight.airplane,
+                ValidationError
+            )
+            places.add((seat["row"], seat["seat"]))
+        if len(places) != len(data["seats"]):
+            raise ValidationError(
+                {"seats": "The same seat cannot be held twice."}
+            )
+        return data
+
+    def create(self, validated_data):
+        return hold_seats(
+            validated_data["user"],
+            validated_data["flight"],
+            [(seat["row"], seat["seat"]) for seat in validated_data["seats"]],
+            timezone.now() + timedelta(minutes=validated_data["ttl"])
+        )
+
+
+class AutoSeatOrderSerializer(serializers.Serializer):
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.select_related("airplane")
+    )
+    seats = serializers.IntegerField(min_value=1, max_value=50)
+    adjacent = serializers.BooleanField(
+        default=False,
+        help_text="Only accept seats side by side in one row"
+    )
+
+    def validate(self, data):
+        flight = data["flight"]
+        Ticket.validate_ticket_flight(
+            timezone.now(),
+            flight.departure_time,
+            ValidationError
+        )
+        if data["adjacent"] and data["seats"] > flight.airplane.seats_in_row:
+            raise ValidationError(
+                {
+                    "seats": f"At most {flight.airplane.seats_in_row} "
+                             f"adjacent seats fit in a row."
+                }
+            )
+        return data
+
+    def create(self, validated_data):
+        return book_best_available(
+            validated_data["user"],
+            validated_data["flight"],
+            validated_data["seats"],
+            validated_data["adjacent"]
+        )
+
+
 class OrderListSerializer(OrderSerializer):
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
     tickets = TicketListSerializer(many=True, read_only=True)
@@ -290,3 +615,120 @@ class OrderListSerializer(OrderSerializer):
 class OrderDetailSerializer(OrderSerializer):
     created_at = serializers.DateTimeField(format="%Y-%m-%d %H:%M:%S")
     tickets = TicketDetailSerializer(many=True, read_only=True)
+
+
+class TicketRequestSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+    flight = serializers.IntegerField()
+
+
+class OrderRequestSerializer(serializers.ModelSerializer):
+    tickets = TicketRequestSerializer(
+        many=True,
+        allow_empty=False,
+        write_only=True
+    )
+
+    class Meta:
+        model = OrderRequest
+        fields = (
+            "id",
+            "status",
+            "order",
+            "errors",
+            "created_at",
+            "processed_at",
+            "tickets",
+        )
+        read_only_fields = (
+            "status",
+            "order",
+            "errors",
+            "created_at",
+            "processed_at",
+        )
+
+    def validate_tickets(self, tickets):
+        flight_ids = {ticket["flight"] for ticket in tickets}
+        found = set(
+            Flight.objects
+            .filter(pk__in=flight_ids)
+            .values_list("pk", flat=True)
+        )
+        missing = sorted(flight_ids - found)
+        if missing:
+            raise ValidationError(
+                f"Flights do not exist: {', '.join(map(str, missing))}."
+            )
+        return tickets
+
+    def create(self, validated_data):
+        tickets = validated_data.pop("tickets")
+        return OrderRequest.objects.create(
+            flight_id=min(ticket["flight"] for ticket in tickets),
+            payload={"tickets": tickets},
+            **validated_data
+        )
+
+
+class RouteLoadQuerySerializer(serializers.Serializer):
+    route = serializers.CharField(
+        required=False,
+        help_text="Comma-separated route ids"
+    )
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    group_by = serializers.ChoiceField(
+        choices=("day", "route"),
+        default="day",
+        help_text="`day` for one row per route and day, "
+                  "`route` for totals over the range"
+    )
+
+    def validate(self, data):
+        if data["date_from"] > data["date_to"]:
+            raise ValidationError("date_from cannot be later than date_to.")
+        if (data["date_to"] - data["date_from"]).days > 366:
+            raise ValidationError("The date range cannot exceed 366 days.")
+        return data
+
+
+class RouteDailyLoadSerializer(serializers.ModelSerializer):
+    full_route = serializers.CharField(
+        source="route.full_route",
+        read_only=True
+    )
+
+    class Meta:
+        model = RouteDailyLoad
+        fields = (
+            "route",
+            "full_route",
+            "date",
+            "flights",
+            "seats_sold",
+            "capacity",
+            "load_factor",
+        )
+
+
+class RouteLoadTotalSerializer(serializers.Serializer):
+    route = serializers.IntegerField()
+    flights = serializers.IntegerField()
+    seats_sold = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    load_factor = serializers.SerializerMethodField()
+
+    def get_load_factor(self, obj) -> float | None:
+        if not obj["capacity"]:
+            return None
+        return obj["seats_sold"] / obj["capacity"]
+
+
+class ResponseCacheStatsSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    stores = serializers.IntegerField()
+    bytes_stored = serializers.IntegerField()
+    hit_ratio = serializers.FloatField(allow_null=True)
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from airport.caching import bump_model_version, bump_user_orders_version
+from airport.models import (
+    Airport,
+    Route,
+    Crew,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+    RouteDailyLoad,
+    Ticket,
+)
+
+REFERENCE_DATA_MODELS = (Airport, Route, Crew, AirplaneType, Airplane)
+
+
+@receiver(post_save, sender=Ticket)
+def occupy_ticket_seat(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        Flight.update_seat_inventory(
+            instance.flight_id, occupied=[(instance.row, instance.seat)]
+        )
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, **kwargs):
+    Flight.update_seat_inventory(
+        instance.flight_id, released=[(instance.row, instance.seat)]
+    )
+
+
+@receiver(post_delete, sender=Flight)
+def remove_flight_route_load(sender, instance, **kwargs):
+    RouteDailyLoad.remove_flight(instance)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def bump_order_history_version(sender, instance, **kwargs):
+    bump_user_orders_version(pk=instance.user_id)
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def bump_ticket_order_history_version(sender, instance, **kwargs):
+    # Tickets deleted by an order or flight cascade are covered by the
+    # handler of that deletion, once instead of once per ticket
+    origin = kwargs.get("origin")
+    origin_model = getattr(origin, "model", type(origin))
+    if origin is not None and origin_model is not Ticket:
+        return
+    bump_user_orders_version(orders__pk=instance.order_id)
+
+
+@receiver(pre_delete, sender=Flight)
+def bump_flight_order_history_versions(sender, instance, **kwargs):
+    bump_user_orders_version(orders__tickets__flight_id=instance.pk)
+
+
+def bump_reference_data_version(sender, **kwargs):
+    bump_model_version(sender)
+
+
+for model in REFERENCE_DATA_MODELS:
+    post_save.connect(bump_reference_data_version, sender=model)
+    post_delete.connect(bump_reference_data_version, sender=model)
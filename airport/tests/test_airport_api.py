@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -9,6 +10,7 @@ from airport.serializers import AirportSerializer
 
 AIRPORT_LIST_URL = reverse("airport:airport-list")
 AIRPORT_DETAIL_URL = reverse("airport:airport-detail", kwargs={"pk": 1})
+CACHE_STATS_URL = reverse("airport:cache-stats-list")
 
 
 def sample_airport(**params):
@@ -54,6 +56,32 @@ class AuthenticatedAirportAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_airport_list_served_from_cache(self):
+        cache.clear()
+        sample_airport()
+
+        first_response = self.client.get(AIRPORT_LIST_URL)
+        Airport.objects.update(name="Changed_without_signal")
+        second_response = self.client.get(AIRPORT_LIST_URL)
+
+        self.assertEqual(second_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second_response.content, first_response.content)
+        self.assertEqual(second_response["Content-Type"], "application/json")
+
+    def test_airport_list_cache_invalidated_on_create(self):
+        cache.clear()
+        sample_airport()
+        self.client.get(AIRPORT_LIST_URL)
+
+        sample_airport(name="Another_name")
+        response = self.client.get(AIRPORT_LIST_URL)
+
+        self.assertEqual(len(response.json()), 2)
+
+    def test_cache_stats_admin_only(self):
+        response = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_airport_create_forbidden(self):
         response = self.client.post(
             AIRPORT_LIST_URL,
@@ -84,6 +112,22 @@ class AdminAirportAPITests(TestCase):
         self.assertEqual(airport.name, data["name"])
         self.assertEqual(airport.closest_big_city, data["closest_big_city"])
 
+    def test_cache_stats(self):
+        cache.clear()
+        sample_airport()
+        self.client.get(AIRPORT_LIST_URL)
+        self.client.get(AIRPORT_LIST_URL)
+        self.client.get(AIRPORT_LIST_URL)
+
+        response = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["hits"], 2)
+        self.assertEqual(response.data["misses"], 1)
+        self.assertEqual(response.data["stores"], 1)
+        self.assertGreater(response.data["bytes_stored"], 0)
+        self.assertAlmostEqual(response.data["hit_ratio"], 2 / 3)
+
     def test_airport_delete_not_allowed(self):
         sample_airport()
         response = self.client.delete(AIRPORT_DETAIL_URL)
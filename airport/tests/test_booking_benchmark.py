@@ -0,0 +1,37 @@
+from django.test import TransactionTestCase
+
+from airport.benchmarks import run_booking_benchmark
+from airport.models import Order, Ticket
+
+
+class BookingBenchmarkTests(TransactionTestCase):
+    def test_seat_conflicts_are_retried(self):
+        result = run_booking_benchmark(
+            workers=4,
+            orders=5,
+            flights=1,
+            tickets_per_order=2,
+            max_retries=2,
+        )
+
+        self.assertEqual(result["errors"], 0)
+        self.assertEqual(result["orders"], Order.objects.count())
+        self.assertEqual(
+            result["orders"] + result["abandoned"], 4 * 5
+        )
+        self.assertEqual(
+            result["attempts"],
+            result["orders"] + result["conflicts"]
+        )
+        self.assertEqual(Ticket.objects.count(), 2 * result["orders"])
+        self.assertTrue(result["inventory_consistent"])
+        self.assertIsNotNone(result["lock_wait_ms"]["p95"])
+
+    def test_auto_assign(self):
+        result = run_booking_benchmark(
+            workers=3, orders=4, flights=2, mode="auto-assign"
+        )
+
+        self.assertEqual(result["orders"], 12)
+        self.assertEqual(result["conflicts"], 0)
+        self.assertTrue(result["inventory_consistent"])
@@ -104,6 +104,17 @@ class AdminCrewAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data["first_name"], member.first_name)
 
+    def test_crew_update_invalidates_cached_detail(self):
+        member = sample_crew_member()
+        url = reverse("airport:crew-detail", kwargs={"pk": member.pk})
+        self.client.get(url)
+
+        response = self.client.patch(url, data={"first_name": "Jane"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(url)
+        self.assertEqual(response.json()["first_name"], "Jane")
+
     def test_crew_delete(self):
         sample_crew_member()
         response = self.client.delete(CREW_DETAIL_URL)
@@ -1,17 +1,36 @@
+import json
+from base64 import b64decode, urlsafe_b64encode
 from datetime import datetime, timezone, timedelta
 
 from django.contrib.auth import get_user_model
 from django.db.models import F, Count
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone as dt_timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from airport.models import Airport, Route, AirplaneType, Airplane, Flight, Crew
+from airport.models import (
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Crew,
+    Order,
+    Ticket,
+)
 from airport.serializers import FlightListSerializer, FlightDetailSerializer
 
 FLIGHT_LIST_URL = reverse("airport:flight-list")
 FLIGHT_DETAIL_URL = reverse("airport:flight-detail", kwargs={"pk": 1})
+FLIGHT_BULK_URL = reverse("airport:flight-bulk")
+
+
+def timeline_url(airplane_id):
+    return reverse("airport:airplane-timeline", args=[airplane_id])
 
 
 def get_flight_data():
@@ -129,6 +148,136 @@ class AuthenticatedFlightAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_flight_retrieve_conditional_get(self):
+        flight = sample_flight(
+            **get_flight_data()
+            | {
+                "departure_time": dt_timezone.now() + timedelta(days=1),
+                "arrival_time": dt_timezone.now() + timedelta(days=2),
+            }
+        )
+        url = reverse("airport:flight-detail", kwargs={"pk": flight.pk})
+
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flight, order=order)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_flight_retrieve_missing_has_no_etag(self):
+        url = reverse("airport:flight-detail", kwargs={"pk": 0})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_flight_list_keyset_pagination(self):
+        route = get_flight_data()["route"]
+        airplane_type = AirplaneType.objects.get(name="Boeing")
+        departure_time = datetime(2024, 10, 25, 1, tzinfo=timezone.utc)
+        for i in range(12):
+            airplane = Airplane.objects.create(
+                name=f"AP{i}",
+                rows=10,
+                seats_in_row=4,
+                airplane_type=airplane_type,
+            )
+            Flight.objects.create(
+                route=route,
+                airplane=airplane,
+                departure_time=departure_time + timedelta(hours=i % 3),
+                arrival_time=departure_time + timedelta(hours=5),
+            )
+
+        seen_ids = []
+        response = self.client.get(FLIGHT_LIST_URL, {"cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+        while True:
+            seen_ids.extend(flight["id"] for flight in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        expected_ids = list(
+            Flight.objects
+            .order_by("departure_time", "arrival_time", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(seen_ids, expected_ids)
+
+        previous_response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [flight["id"] for flight in previous_response.data["results"]],
+            expected_ids[5:10]
+        )
+
+    def test_flight_list_invalid_date_rejected(self):
+        response = self.client.get(FLIGHT_LIST_URL, {"date": "10/02/2024"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flight_list_invalid_cursor(self):
+        response = self.client.get(FLIGHT_LIST_URL, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_flight_list_malformed_cursor_position(self):
+        for position in ([None] * 3, [1, 2, 3], [{}, {}, {}], [[], [], []]):
+            cursor = urlsafe_b64encode(
+                json.dumps({"p": position}).encode()
+            ).decode()
+            with self.subTest(position=position):
+                response = self.client.get(FLIGHT_LIST_URL, {"cursor": cursor})
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+    def test_flight_retrieve_seat_map(self):
+        flight = sample_flight(
+            **get_flight_data()
+            | {
+                "departure_time": dt_timezone.now() + timedelta(days=1),
+                "arrival_time": dt_timezone.now() + timedelta(days=2),
+            }
+        )
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=2, seat=3, flight=flight, order=order)
+        Ticket.objects.create(row=1, seat=6, flight=flight, order=order)
+        url = reverse("airport:flight-detail", kwargs={"pk": flight.pk})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["taken_places"],
+            [{"row": 1, "seat": 6}, {"row": 2, "seat": 3}]
+        )
+        self.assertEqual(response.data["tickets_available"], 40 * 6 - 2)
+
+        response = self.client.get(url, {"seat_format": "bitmap"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("taken_places", response.data)
+        seat_map = response.data["seat_map"]
+        self.assertEqual(seat_map["rows"], 40)
+        self.assertEqual(seat_map["seats_in_row"], 6)
+        bitmap = b64decode(seat_map["bitmap"])
+        self.assertEqual(len(bitmap), 30)
+        self.assertEqual(bitmap[:2], bytes([0b00000100, 0b10000000]))
+        self.assertFalse(any(bitmap[2:]))
+
+        order.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.data["taken_places"], [])
+
     def test_flight_create_forbidden(self):
         data = get_flight_data()
         data["route"] = data["route"].id
@@ -170,6 +319,155 @@ class AdminFlightAPITests(TestCase):
 
         self.assertEqual(data["crew"], [crew.id for crew in flight.crew.all()])
 
+    def get_bulk_schedule(self):
+        data = get_flight_data()
+        route = data["route"]
+        return_route = Route.objects.create(
+            source=route.destination,
+            destination=route.source,
+            distance=route.distance
+        )
+        second_airplane = Airplane.objects.create(
+            name="BO5678",
+            rows=20,
+            seats_in_row=4,
+            airplane_type=data["airplane"].airplane_type,
+        )
+        crew_member = Crew.objects.create(first_name="John", last_name="Doe")
+        start = datetime(2024, 10, 25, 1, tzinfo=timezone.utc)
+        flights = []
+        for airplane in (data["airplane"], second_airplane):
+            for leg in range(3):
+                departure_time = start + timedelta(hours=leg * 6)
+                flights.append({
+                    "route": (route, return_route)[leg % 2].id,
+                    "airplane": airplane.id,
+                    "departure_time": departure_time.isoformat(),
+                    "arrival_time": (
+                        departure_time + timedelta(hours=2)
+                    ).isoformat(),
+                    "crew": [crew_member.id],
+                })
+        return flights
+
+    def test_flight_bulk_create(self):
+        flights = self.get_bulk_schedule()
+        flights.reverse()
+
+        response = self.client.post(
+            FLIGHT_BULK_URL, {"flights": flights}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(Flight.objects.count(), 6)
+        self.assertEqual(Flight.crew.through.objects.count(), 6)
+        for flight in Flight.objects.select_related("airplane"):
+            self.assertEqual(flight.seats_available, flight.airplane.capacity)
+
+    def test_flight_bulk_create_continues_existing_chain(self):
+        flights = self.get_bulk_schedule()[:3]
+        self.client.post(FLIGHT_BULK_URL, {"flights": flights}, format="json")
+
+        next_departure = datetime(2024, 10, 25, 19, tzinfo=timezone.utc)
+        response = self.client.post(
+            FLIGHT_BULK_URL,
+            {
+                "flights": [{
+                    "route": flights[1]["route"],
+                    "airplane": flights[0]["airplane"],
+                    "departure_time": next_departure.isoformat(),
+                    "arrival_time": (
+                        next_departure + timedelta(hours=2)
+                    ).isoformat(),
+                }]
+            },
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_flight_bulk_create_invalid_chain_rejected(self):
+        flights = self.get_bulk_schedule()
+        flights[4]["route"] = flights[3]["route"]
+
+        response = self.client.post(
+            FLIGHT_BULK_URL, {"flights": flights}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["flights"]
+        self.assertEqual(errors[:4], [{}, {}, {}, {}])
+        self.assertIn("non_field_errors", errors[4])
+        self.assertEqual(Flight.objects.count(), 0)
+
+    def test_flight_bulk_create_unknown_route_rejected(self):
+        flights = self.get_bulk_schedule()
+        flights[0]["route"] = 0
+
+        response = self.client.post(
+            FLIGHT_BULK_URL, {"flights": flights}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["flights"][0]["route"],
+            ['Invalid pk "0" - object does not exist.']
+        )
+
+    def test_flight_create_query_count(self):
+        flight_1 = sample_flight()
+        for i in range(10):
+            airport = Airport.objects.create(
+                name=f"Airport {i}", closest_big_city=f"City {i}"
+            )
+            Route.objects.create(
+                source=flight_1.route.destination,
+                destination=airport,
+                distance=100
+            )
+        route = Route.objects.filter(
+            source=flight_1.route.destination
+        ).first()
+        crew_member = Crew.objects.create(first_name="John", last_name="Doe")
+        data = {
+            "route": route.id,
+            "airplane": flight_1.airplane.id,
+            "departure_time": flight_1.arrival_time + timedelta(hours=4),
+            "arrival_time": flight_1.arrival_time + timedelta(hours=6),
+            "crew": [crew_member.id],
+        }
+
+        # the flight insert and its route daily load upsert run in a
+        # savepoint
+        with self.assertNumQueries(11):
+            response = self.client.post(FLIGHT_LIST_URL, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_flight_create_wrong_location_query_count(self):
+        flight_1 = sample_flight()
+        for i in range(10):
+            airport = Airport.objects.create(
+                name=f"Airport {i}", closest_big_city=f"City {i}"
+            )
+            Route.objects.create(
+                source=flight_1.route.destination,
+                destination=airport,
+                distance=100
+            )
+        crew_member = Crew.objects.create(first_name="John", last_name="Doe")
+        data = {
+            "route": flight_1.route.id,
+            "airplane": flight_1.airplane.id,
+            "departure_time": flight_1.arrival_time + timedelta(hours=4),
+            "arrival_time": flight_1.arrival_time + timedelta(hours=6),
+            "crew": [crew_member.id],
+        }
+
+        with self.assertNumQueries(6):
+            response = self.client.post(FLIGHT_LIST_URL, data=data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("PMI - Airport 9", str(response.data))
+
     def test_create_incorrent_departure_location_forbidden(self):
         flight_1 = sample_flight()
 
@@ -291,3 +589,237 @@ class AdminFlightAPITests(TestCase):
 
         response = self.client.patch(FLIGHT_DETAIL_URL, data=data)
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class FlightSearchQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+
+        airports = Airport.objects.bulk_create(
+            Airport(name=f"A{i}", closest_big_city=f"City {i}")
+            for i in range(20)
+        )
+        routes = Route.objects.bulk_create(
+            Route(source=source, destination=destination, distance=500)
+            for source in airports
+            for destination in airports
+            if source != destination
+        )
+        airplane_type = AirplaneType.objects.create(name="Boeing")
+        airplanes = Airplane.objects.bulk_create(
+            Airplane(
+                name=f"AP{i}",
+                rows=30,
+                seats_in_row=6,
+                airplane_type=airplane_type
+            )
+            for i in range(50)
+        )
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        Flight.objects.bulk_create(
+            Flight(
+                route=routes[(i * 7) % len(routes)],
+                airplane=airplanes[i % len(airplanes)],
+                departure_time=start + timedelta(hours=i // 5),
+                arrival_time=start + timedelta(hours=i // 5 + 2),
+                seats_available=180,
+            )
+            for i in range(20000)
+        )
+        cls.source = airports[3]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE airport_flight")
+            cursor.execute("ANALYZE airport_route")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _explain_list_query(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(FLIGHT_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        sql = next(
+            query["sql"] for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+            and "FROM \"airport_flight\"" in query["sql"]
+            and "ORDER BY" in query["sql"]
+        )
+        self.assertNotIn("::date", sql)
+        self.assertNotIn("DISTINCT", sql)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def test_date_filter_uses_departure_index(self):
+        plan = self._explain_list_query({"date": "2024-02-10"})
+        self.assertIn("flight_departure_arrival_idx", plan)
+        self.assertNotIn("Seq Scan on airport_flight", plan)
+
+    def test_date_and_source_filter_uses_index(self):
+        plan = self._explain_list_query(
+            {"date": "2024-02-10", "source": str(self.source.id)}
+        )
+        self.assertIn("Index", plan)
+        self.assertNotIn("Seq Scan on airport_flight", plan)
+
+    def test_keyset_page_seeks_into_departure_index(self):
+        boundary = Flight.objects.order_by(
+            "departure_time", "arrival_time", "id"
+        )[15000]
+        cursor = urlsafe_b64encode(
+            json.dumps({
+                "p": [
+                    boundary.departure_time.isoformat(),
+                    boundary.arrival_time.isoformat(),
+                    boundary.id,
+                ]
+            }).encode()
+        ).decode()
+
+        plan = self._explain_list_query({"cursor": cursor})
+        self.assertIn("flight_departure_arrival_idx", plan)
+        self.assertIn("Index Cond: (departure_time >=", plan)
+        self.assertNotIn("Seq Scan on airport_flight", plan)
+
+
+class AirplaneTimelineAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(self.user)
+        self.airplane = Airplane.objects.create(
+            name="BO1234",
+            rows=40,
+            seats_in_row=6,
+            airplane_type=AirplaneType.objects.create(name="Boeing"),
+        )
+
+        krk = Airport.objects.create(name="KRK", closest_big_city="Krakow")
+        pmi = Airport.objects.create(name="PMI", closest_big_city="Palma")
+        waw = Airport.objects.create(name="WAW", closest_big_city="Warsaw")
+        self.krk_pmi = Route.objects.create(
+            source=krk, destination=pmi, distance=1000
+        )
+        self.pmi_krk = Route.objects.create(
+            source=pmi, destination=krk, distance=1000
+        )
+        self.waw_krk = Route.objects.create(
+            source=waw, destination=krk, distance=300
+        )
+
+    def create_flights(self, *legs):
+        """Inserts flights without scheduling validation"""
+        start = datetime(2030, 5, 1, tzinfo=timezone.utc)
+        return Flight.objects.bulk_create(
+            Flight(
+                route=route,
+                airplane=self.airplane,
+                departure_time=start + timedelta(hours=departure),
+                arrival_time=start + timedelta(hours=arrival),
+            )
+            for route, departure, arrival in legs
+        )
+
+    def test_timeline(self):
+        flights = self.create_flights(
+            (self.krk_pmi, 0, 3),
+            (self.pmi_krk, 7, 10),
+            (self.krk_pmi, 11, 14),
+            (self.waw_krk, 40, 41),
+            (self.krk_pmi, 40.5, 43),
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                timeline_url(self.airplane.id), {"date_from": "2030-05-01"}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (
+                    flight["id"],
+                    flight["previous_flight"],
+                    flight["turnaround"],
+                    flight["violations"],
+                )
+                for flight in response.data
+            ],
+            [
+                (flights[0].id, None, None, []),
+                (flights[1].id, flights[0].id, "04:00:00", []),
+                (flights[2].id, flights[1].id, "01:00:00", ["rest"]),
+                (
+                    flights[3].id,
+                    flights[2].id,
+                    "1 02:00:00",
+                    ["gap", "location"]
+                ),
+                (flights[4].id, flights[3].id, "-1 23:30:00", ["overlap"]),
+            ]
+        )
+        self.assertEqual(response.data[0]["full_route"], "KRK - PMI")
+
+    def test_timeline_date_range_keeps_previous_flight(self):
+        flights = self.create_flights(
+            (self.krk_pmi, 20, 23),
+            (self.pmi_krk, 25, 28),
+            (self.krk_pmi, 50, 53),
+        )
+
+        response = self.client.get(
+            timeline_url(self.airplane.id),
+            {"date_from": "2030-05-02", "date_to": "2030-05-02"}
+        )
+
+        self.assertEqual(
+            [
+                (flight["id"], flight["previous_flight"])
+                for flight in response.data
+            ],
+            [(flights[1].id, flights[0].id)]
+        )
+        self.assertEqual(response.data[0]["turnaround"], "02:00:00")
+        self.assertEqual(response.data[0]["violations"], ["rest"])
+
+    def test_timeline_defaults_to_month_from_today(self):
+        today = dt_timezone.now().replace(minute=0, second=0, microsecond=0)
+        flights = Flight.objects.bulk_create(
+            Flight(
+                route=route,
+                airplane=self.airplane,
+                departure_time=today + timedelta(days=days),
+                arrival_time=today + timedelta(days=days, hours=3),
+            )
+            for route, days in (
+                (self.krk_pmi, -40),
+                (self.pmi_krk, 2),
+                (self.krk_pmi, 45),
+            )
+        )
+
+        response = self.client.get(timeline_url(self.airplane.id))
+
+        self.assertEqual(
+            [flight["id"] for flight in response.data], [flights[1].id]
+        )
+
+    def test_timeline_range_limited(self):
+        response = self.client.get(
+            timeline_url(self.airplane.id),
+            {"date_from": "2030-01-01", "date_to": "2031-06-01"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_timeline_unknown_airplane(self):
+        response = self.client.get(timeline_url(self.airplane.id + 1))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
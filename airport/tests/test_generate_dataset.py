@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F, Sum
+from django.test import TestCase
+
+from airport.datasets import DatasetGenerator
+from airport.models import Flight, RouteDailyLoad, Ticket
+from airport.scheduling import get_airplane_timeline
+from airport.seating import SeatMap
+
+
+def schedule(prefix):
+    return list(
+        Flight.objects
+        .filter(airplane__name__startswith=prefix)
+        .order_by("airplane__name", "departure_time")
+        .values_list(
+            "airplane__name",
+            "route__source__name",
+            "route__destination__name",
+            "departure_time",
+            "seats_sold",
+        )
+    )
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, **options):
+        options = {
+            "airports": 6,
+            "routes_per_airport": 2,
+            "airplanes": 3,
+            "crew": 10,
+            "flights_per_airplane": 5,
+            "users": 4,
+            "orders": 40,
+            "batch_size": 7,
+            **options,
+        }
+        return DatasetGenerator(**options).generate()
+
+    def test_generate_dataset(self):
+        out = StringIO()
+        call_command(
+            "generate_dataset",
+            airports=6,
+            airplanes=3,
+            flights_per_airplane=5,
+            orders=40,
+            batch_size=7,
+            stdout=out,
+        )
+
+        self.assertIn("Dataset generated.", out.getvalue())
+        self.assertEqual(Flight.objects.count(), 15)
+        self.assertEqual(
+            Ticket.objects.values("order").distinct().count(), 40
+        )
+
+    def test_flight_chains_are_valid(self):
+        self.generate()
+
+        for flight in Flight.objects.select_related("airplane"):
+            self.assertGreaterEqual(flight.crew.count(), 2)
+        airplane_ids = set(
+            Flight.objects.values_list("airplane_id", flat=True)
+        )
+        for airplane_id in airplane_ids:
+            for flight in get_airplane_timeline(airplane_id):
+                self.assertEqual(flight.violations, [])
+
+    def test_seat_inventory_matches_tickets(self):
+        self.generate()
+
+        self.assertFalse(
+            Flight.objects
+            .annotate(tickets_sold=Count("tickets"))
+            .exclude(tickets_sold=F("seats_sold"))
+            .exists()
+        )
+        for flight in Flight.objects.select_related("airplane"):
+            self.assertEqual(
+                sorted(SeatMap.for_flight(flight).taken_places()),
+                sorted(flight.tickets.values_list("row", "seat"))
+            )
+            self.assertEqual(
+                flight.seats_available,
+                flight.airplane.capacity - flight.seats_sold
+            )
+        self.assertEqual(
+            RouteDailyLoad.objects.aggregate(
+                sold=Sum("seats_sold")
+            )["sold"],
+            Ticket.objects.count()
+        )
+
+    def test_deterministic_by_seed(self):
+        self.generate(seed=3, prefix="X-")
+        self.generate(seed=3, prefix="Y-")
+        self.generate(seed=4, prefix="Z-")
+
+        first = [row[1:] for row in schedule("X-")]
+        self.assertEqual(
+            [
+                (source.replace("Y-", "X-"), destination.replace("Y-", "X-"),
+                 departure_time, seats_sold)
+                for source, destination, departure_time, seats_sold
+                in (row[1:] for row in schedule("Y-"))
+            ],
+            first
+        )
+        self.assertNotEqual(
+            [row[3] for row in schedule("Z-")],
+            [row[3] for row in schedule("X-")]
+        )
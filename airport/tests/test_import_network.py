@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from airport.models import (
+    Airport,
+    Route,
+    Crew,
+    AirplaneType,
+    Airplane,
+    Flight,
+    RouteDailyLoad,
+)
+
+AIRPORTS_CSV = """name,closest_big_city
+KRK,Krakow
+WAW,Warsaw
+"""
+AIRPLANES_CSV = """name,rows,seats_in_row,airplane_type
+SP-1,10,4,Boeing
+"""
+ROUTES_CSV = """source,destination,distance
+KRK,WAW,300
+WAW,KRK,300
+"""
+CREW_CSV = """first_name,last_name
+Anna,Nowak
+Jan,Kowalski
+"""
+FLIGHTS = [
+    {
+        "source": "KRK",
+        "destination": "WAW",
+        "airplane": "SP-1",
+        "departure_time": "2030-05-01T08:00:00+00:00",
+        "arrival_time": "2030-05-01T09:00:00+00:00",
+        "crew": "Anna Nowak;Jan Kowalski",
+    },
+    {
+        "source": "WAW",
+        "destination": "KRK",
+        "airplane": "SP-1",
+        "departure_time": "2030-05-01T13:00:00+00:00",
+        "arrival_time": "2030-05-01T14:00:00+00:00",
+        "crew": "Anna Nowak",
+    },
+]
+
+
+class ImportNetworkTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as file:
+            if name.endswith(".json"):
+                json.dump(content, file)
+            else:
+                file.write(content)
+        return path
+
+    def import_network(self, flights=FLIGHTS, **options):
+        out = StringIO()
+        call_command(
+            "import_network",
+            airplane_types=self.write("types.json", [{"name": "Boeing"}]),
+            airports=self.write("airports.csv", AIRPORTS_CSV),
+            airplanes=self.write("airplanes.csv", AIRPLANES_CSV),
+            routes=self.write("routes.csv", ROUTES_CSV),
+            crew=self.write("crew.csv", CREW_CSV),
+            flights=self.write("flights.json", flights),
+            stdout=out,
+            stderr=out,
+            **options
+        )
+        return out.getvalue()
+
+    def test_import_network(self):
+        output = self.import_network()
+
+        self.assertIn("flights: 2 created", output)
+        self.assertEqual(Airport.objects.count(), 2)
+        self.assertEqual(Route.objects.count(), 2)
+        self.assertEqual(AirplaneType.objects.count(), 1)
+        self.assertEqual(Airplane.objects.count(), 1)
+        self.assertEqual(Crew.objects.count(), 2)
+        first, second = Flight.objects.order_by("departure_time")
+        self.assertEqual(first.seats_available, 40)
+        self.assertEqual(first.crew.count(), 2)
+        self.assertEqual(second.crew.get().full_name, "Anna Nowak")
+        self.assertEqual(
+            sum(RouteDailyLoad.objects.values_list("flights", flat=True)), 2
+        )
+
+    def test_existing_rows_are_reused(self):
+        Airport.objects.create(name="KRK", closest_big_city="Krakow")
+
+        output = self.import_network(flights=[])
+
+        self.assertIn("airports: 1 created, 1 existing", output)
+        self.assertEqual(Airport.objects.count(), 2)
+
+    def test_existing_crew_is_reused(self):
+        Crew.objects.create(first_name="Anna", last_name="Nowak")
+
+        output = self.import_network()
+
+        self.assertIn("crew: 1 created, 1 existing", output)
+        self.assertIn("flights: 2 created", output)
+        self.assertEqual(Crew.objects.count(), 2)
+
+    def test_invalid_rows_roll_back_import(self):
+        flights = FLIGHTS + [
+            dict(
+                FLIGHTS[0],
+                departure_time="2030-05-01T14:30:00+00:00",
+                arrival_time="2030-05-01T15:30:00+00:00",
+            ),
+        ]
+
+        with self.assertRaisesMessage(CommandError, "1 invalid rows"):
+            self.import_network(flights=flights)
+
+        self.assertFalse(Airport.objects.exists())
+        self.assertFalse(Flight.objects.exists())
+
+    def test_skip_invalid(self):
+        flights = FLIGHTS + [dict(FLIGHTS[1], airplane="SP-2")]
+
+        output = self.import_network(flights=flights, skip_invalid=True)
+
+        self.assertIn("flights.json:3: Unknown airplane: SP-2.", output)
+        self.assertEqual(Flight.objects.count(), 2)
+
+    def test_dry_run(self):
+        output = self.import_network(dry_run=True)
+
+        self.assertIn("flights: 2 created", output)
+        self.assertFalse(Airport.objects.exists())
+
+    def test_rows_referencing_invalid_airport_are_reported(self):
+        out = StringIO()
+        call_command(
+            "import_network",
+            airports=self.write(
+                "airports.csv", "name,closest_big_city\nKRK,Krakow\nWAW,\n"
+            ),
+            routes=self.write("routes.csv", ROUTES_CSV),
+            skip_invalid=True,
+            stdout=out,
+            stderr=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn("airports.csv:3: Missing closest_big_city.", output)
+        self.assertIn("routes.csv:2: Unknown airport: WAW.", output)
+        self.assertIn("routes.csv:3: Unknown airport: WAW.", output)
+        self.assertEqual(Airport.objects.get().name, "KRK")
+        self.assertFalse(Route.objects.exists())
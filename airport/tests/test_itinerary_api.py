@@ -0,0 +1,152 @@
+from datetime import datetime, timezone, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import Airport, Route, AirplaneType, Airplane, Flight
+
+ITINERARY_LIST_URL = reverse("airport:itinerary-list")
+DAY = datetime(2024, 10, 25, tzinfo=timezone.utc)
+
+
+def sample_flight(source, destination, departure_hour, duration_hours=2):
+    route, _ = Route.objects.get_or_create(
+        source=source,
+        destination=destination,
+        defaults={"distance": 1000}
+    )
+    airplane_type, _ = AirplaneType.objects.get_or_create(name="Boeing")
+    airplane = Airplane.objects.create(
+        name=f"AP{Airplane.objects.count()}",
+        rows=10,
+        seats_in_row=4,
+        airplane_type=airplane_type,
+    )
+    return Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time=DAY + timedelta(hours=departure_hour),
+        arrival_time=DAY + timedelta(hours=departure_hour + duration_hours),
+    )
+
+
+class UnauthenticatedItineraryAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        response = self.client.get(ITINERARY_LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedItineraryAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(self.user)
+
+        self.krk = Airport.objects.create(name="KRK", closest_big_city="Krakow")
+        self.waw = Airport.objects.create(name="WAW", closest_big_city="Warsaw")
+        self.pmi = Airport.objects.create(name="PMI", closest_big_city="Palma")
+
+    def search(self, **params):
+        query = {
+            "source": self.krk.id,
+            "destination": self.pmi.id,
+            "date": "2024-10-25",
+        }
+        query.update(params)
+        return self.client.get(ITINERARY_LIST_URL, query)
+
+    def legs(self, response):
+        return [
+            [leg["id"] for leg in itinerary["legs"]]
+            for itinerary in response.data
+        ]
+
+    def test_direct_and_connecting_itineraries(self):
+        direct = sample_flight(self.krk, self.pmi, 12, duration_hours=4)
+        first_leg = sample_flight(self.krk, self.waw, 6)
+        second_leg = sample_flight(self.waw, self.pmi, 10)
+
+        response = self.search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.legs(response),
+            [[first_leg.id, second_leg.id], [direct.id]]
+        )
+        self.assertEqual(response.data[0]["connections"], 1)
+        self.assertEqual(response.data[0]["departure_time"], "2024-10-25 06:00:00")
+        self.assertEqual(response.data[0]["arrival_time"], "2024-10-25 12:00:00")
+
+    def test_max_legs(self):
+        direct = sample_flight(self.krk, self.pmi, 12)
+        sample_flight(self.krk, self.waw, 6)
+        sample_flight(self.waw, self.pmi, 10)
+
+        response = self.search(max_legs=1)
+        self.assertEqual(self.legs(response), [[direct.id]])
+
+    def test_connection_time_window(self):
+        sample_flight(self.krk, self.waw, 6)
+        sample_flight(self.waw, self.pmi, 8, duration_hours=1)
+        sample_flight(self.waw, self.pmi, 22)
+
+        self.assertEqual(self.legs(self.search(min_connection=30)), [])
+        self.assertEqual(self.legs(self.search(max_connection=12 * 60)), [])
+        self.assertEqual(len(self.search(max_connection=14 * 60).data), 1)
+
+    def test_seat_availability(self):
+        sample_flight(self.krk, self.waw, 6)
+        second_leg = sample_flight(self.waw, self.pmi, 10)
+        Flight.objects.filter(pk=second_leg.pk).update(seats_available=1)
+
+        self.assertEqual(len(self.search(seats=1).data), 1)
+        self.assertEqual(self.search(seats=2).data, [])
+
+    def test_no_cycles(self):
+        sample_flight(self.krk, self.waw, 2)
+        sample_flight(self.waw, self.krk, 6)
+        sample_flight(self.krk, self.pmi, 10)
+
+        response = self.search(max_legs=3)
+        self.assertEqual([len(legs) for legs in self.legs(response)], [1])
+
+    def test_limit_keeps_earliest_arrivals(self):
+        flights = [
+            sample_flight(self.krk, self.pmi, hour) for hour in (9, 3, 6)
+        ]
+
+        response = self.search(limit=2)
+        self.assertEqual(
+            self.legs(response), [[flights[1].id], [flights[2].id]]
+        )
+
+    def test_flights_off_useful_routes_not_loaded(self):
+        gdn = Airport.objects.create(name="GDN", closest_big_city="Gdansk")
+        direct = sample_flight(self.krk, self.pmi, 12)
+        sample_flight(self.krk, gdn, 6)
+        sample_flight(gdn, self.waw, 9)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.search(max_legs=2)
+
+        self.assertEqual(self.legs(response), [[direct.id]])
+        flight_query = next(
+            query["sql"] for query in context.captured_queries
+            if "FROM \"airport_flight\"" in query["sql"]
+        )
+        self.assertIn(f"IN ({direct.route_id})", flight_query)
+
+    def test_same_source_and_destination_rejected(self):
+        response = self.search(destination=self.krk.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,18 +1,37 @@
+import csv
+import json
+from base64 import urlsafe_b64encode
 from datetime import timedelta
+from io import StringIO
+from threading import Barrier, Thread
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from airport.models import Airport, Route, AirplaneType, Airplane, Flight, Order, Ticket
+from airport.models import (
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Crew,
+    Flight,
+    Order,
+    Ticket,
+    IdempotencyKey,
+)
 from airport.serializers import OrderListSerializer, OrderDetailSerializer
 
 ORDER_LIST_URL = reverse("airport:order-list")
 ORDER_DETAIL_URL = reverse("airport:order-detail", kwargs={"pk": 1})
+ORDER_AUTO_ASSIGN_URL = reverse("airport:order-auto-assign")
+ORDER_EXPORT_URL = reverse("airport:order-export")
 
 
 def sample_flight(**params):
@@ -72,6 +91,103 @@ class AuthenticatedOrderAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(serializer.data, response.data["results"])
 
+    def test_order_list_keyset_pagination(self):
+        flight = sample_flight()
+        created_at = timezone.now()
+        for i in range(7):
+            order = Order.objects.create(user=self.user)
+            Order.objects.filter(pk=order.pk).update(
+                created_at=created_at - timedelta(minutes=i // 2)
+            )
+            Ticket.objects.create(row=i + 1, seat=1, flight=flight, order=order)
+
+        response = self.client.get(ORDER_LIST_URL, {"cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        seen_ids = [order["id"] for order in response.data["results"]]
+        next_response = self.client.get(response.data["next"])
+        seen_ids += [order["id"] for order in next_response.data["results"]]
+
+        expected_ids = list(
+            Order.objects
+            .order_by("-created_at", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(seen_ids, expected_ids)
+        self.assertIsNone(next_response.data["next"])
+
+    def test_order_list_malformed_cursor_position(self):
+        for position in ([None, None], [1, 2], [{}, {}]):
+            cursor = urlsafe_b64encode(
+                json.dumps({"p": position}).encode()
+            ).decode()
+            with self.subTest(position=position):
+                response = self.client.get(ORDER_LIST_URL, {"cursor": cursor})
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+    def test_order_list_conditional_get(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flight, order=order)
+
+        response = self.client.get(ORDER_LIST_URL)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(ORDER_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other_user)
+        response = other_client.get(ORDER_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Ticket.objects.create(row=1, seat=2, flight=flight, order=order)
+        response = self.client.get(ORDER_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        new_etag = response["ETag"]
+        Order.objects.create(user=self.user)
+        response = self.client.get(
+            ORDER_LIST_URL, HTTP_IF_NONE_MATCH=new_etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_order_list_etag_changes_on_booking_and_ticket_delete(self):
+        flight = sample_flight()
+        etag = self.client.get(ORDER_LIST_URL)["ETag"]
+
+        self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": flight.pk}]},
+            format="json"
+        )
+        response = self.client.get(ORDER_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response["ETag"]
+        Ticket.objects.get().delete()
+        response = self.client.get(ORDER_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["tickets"], [])
+
+    def test_order_list_etag_changes_on_flight_delete(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flight, order=order)
+        etag = self.client.get(ORDER_LIST_URL)["ETag"]
+
+        flight.delete()
+        response = self.client.get(ORDER_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["tickets"], [])
+
     def test_order_retrieve(self):
         flight = sample_flight()
         order = Order.objects.create(user=self.user)
@@ -114,6 +230,40 @@ class AuthenticatedOrderAPITests(TestCase):
         self.assertEqual(ticket_2["seat"], tickets[1].seat)
         self.assertEqual(ticket_2["flight"], tickets[1].flight.id)
 
+    def test_order_create_updates_seat_counters(self):
+        flight = sample_flight()
+        data = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": flight.pk},
+                {"row": 1, "seat": 2, "flight": flight.pk},
+            ],
+        }
+        response = self.client.post(ORDER_LIST_URL, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 2)
+        self.assertEqual(flight.seats_available, flight.airplane.capacity - 2)
+
+        Order.objects.get(pk=response.data["id"]).delete()
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 0)
+        self.assertEqual(flight.seats_available, flight.airplane.capacity)
+
+    def test_rebuild_seat_inventory_command(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flight, order=order)
+        Flight.objects.filter(pk=flight.pk).update(
+            seats_sold=0, seats_available=0
+        )
+
+        call_command("rebuild_seat_inventory", stdout=StringIO())
+
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 1)
+        self.assertEqual(flight.seats_available, flight.airplane.capacity - 1)
+
     def test_order_create_row_outside_given_range_forbidden(self):
         flight = sample_flight()
         ticket = {
@@ -156,8 +306,289 @@ class AuthenticatedOrderAPITests(TestCase):
             "tickets": [ticket_1, ticket_2],
         }
 
-        with self.assertRaises(ValidationError):
-            self.client.post(ORDER_LIST_URL, data, format="json")
+        response = self.client.post(ORDER_LIST_URL, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["tickets"][0], {})
+        self.assertIn("non_field_errors", response.data["tickets"][1])
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_order_create_taken_seat_reported_per_ticket(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=2, flight=flight, order=order)
+        data = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": flight.pk},
+                {"row": 1, "seat": 2, "flight": flight.pk},
+            ],
+        }
+
+        response = self.client.post(ORDER_LIST_URL, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["tickets"][0], {})
+        self.assertIn(
+            "(row: 1, seat: 2) is already taken",
+            str(response.data["tickets"][1]["non_field_errors"][0])
+        )
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 1)
+
+    def test_order_create_taken_seat_rejected_before_insert(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=2, flight=flight, order=order)
+        data = {"tickets": [{"row": 1, "seat": 2, "flight": flight.pk}]}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(ORDER_LIST_URL, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            any(
+                query["sql"].startswith('INSERT INTO "airport_ticket"')
+                for query in queries.captured_queries
+            )
+        )
+
+    def test_order_create_query_count(self):
+        flight = sample_flight()
+        data = {
+            "tickets": [
+                {"row": row, "seat": seat, "flight": flight.pk}
+                for row in range(1, 4)
+                for seat in range(1, 4)
+            ],
+        }
+
+        # flights, order, order history version, seat inventory lock,
+        # tickets, route daily load, seat inventory update, response
+        # tickets, plus three savepoint statements
+        with self.assertNumQueries(12):
+            response = self.client.post(ORDER_LIST_URL, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 9)
+
+    def test_order_create_idempotency_key_replays_response(self):
+        flight = sample_flight()
+        data = {"tickets": [{"row": 1, "seat": 1, "flight": flight.pk}]}
+
+        first = self.client.post(
+            ORDER_LIST_URL, data, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+        )
+        with self.assertNumQueries(3):
+            retry = self.client.post(
+                ORDER_LIST_URL, data, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+            )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_order_create_idempotency_key_replays_error(self):
+        flight = sample_flight()
+        data = {"tickets": [{"row": 41, "seat": 1, "flight": flight.pk}]}
+
+        first = self.client.post(
+            ORDER_LIST_URL, data, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+        )
+        retry = self.client.post(
+            ORDER_LIST_URL, data, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.data, first.data)
+
+    def test_order_create_idempotency_key_reused_with_other_payload(self):
+        flight = sample_flight()
+        self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": flight.pk}]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+        response = self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 2, "flight": flight.pk}]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_order_create_idempotency_key_scoped_to_user(self):
+        flight = sample_flight()
+        self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": flight.pk}]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="k1"
+        )
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(other_user)
+
+        response = self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 2, "flight": flight.pk}]},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_order_create_expired_idempotency_key_processed_again(self):
+        flight = sample_flight()
+        data = {"tickets": [{"row": 1, "seat": 1, "flight": flight.pk}]}
+        self.client.post(
+            ORDER_LIST_URL, data, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+        )
+        IdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        response = self.client.post(
+            ORDER_LIST_URL, data, format="json", HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_purge_idempotency_keys_command(self):
+        flight = sample_flight()
+        for key, seat in (("k1", 1), ("k2", 2)):
+            self.client.post(
+                ORDER_LIST_URL,
+                {"tickets": [{"row": 1, "seat": seat, "flight": flight.pk}]},
+                format="json",
+                HTTP_IDEMPOTENCY_KEY=key
+            )
+        IdempotencyKey.objects.filter(key="k1").update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        call_command("purge_idempotency_keys", stdout=StringIO())
+
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list("key", flat=True)),
+            ["k2"]
+        )
+
+    def auto_assigned_places(self, response):
+        return [
+            (ticket["row"], ticket["seat"])
+            for ticket in response.data["tickets"]
+        ]
+
+    def test_order_auto_assign_adjacent_seats(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        for seat in (1, 4):
+            Ticket.objects.create(row=1, seat=seat, flight=flight, order=order)
+
+        response = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 3, "adjacent": True},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.auto_assigned_places(response), [(2, 1), (2, 2), (2, 3)]
+        )
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 5)
+
+    def test_order_auto_assign_prefers_adjacent_seats(self):
+        flight = sample_flight()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=3, flight=flight, order=order)
+
+        response = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 3},
+            format="json"
+        )
+
+        self.assertEqual(
+            self.auto_assigned_places(response), [(1, 4), (1, 5), (1, 6)]
+        )
+
+    def test_order_auto_assign_scattered_seats(self):
+        flight = sample_flight(
+            airplane=Airplane.objects.create(
+                name="SMALL",
+                rows=2,
+                seats_in_row=2,
+                airplane_type=AirplaneType.objects.create(name="Embraer"),
+            )
+        )
+        order = Order.objects.create(user=self.user)
+        for row in (1, 2):
+            Ticket.objects.create(row=row, seat=1, flight=flight, order=order)
+
+        adjacent = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 2, "adjacent": True},
+            format="json"
+        )
+        scattered = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 2},
+            format="json"
+        )
+        full = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 1},
+            format="json"
+        )
+
+        self.assertEqual(adjacent.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.auto_assigned_places(scattered), [(1, 2), (2, 2)]
+        )
+        self.assertEqual(full.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_order_auto_assign_skips_held_seats(self):
+        flight = sample_flight()
+        self.client.post(
+            reverse("airport:seat-hold-list"),
+            {"flight": flight.pk, "seats": [{"row": 1, "seat": 1}]},
+            format="json"
+        )
+
+        response = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 2},
+            format="json"
+        )
+
+        self.assertEqual(self.auto_assigned_places(response), [(1, 2), (1, 3)])
+
+    def test_order_auto_assign_more_adjacent_seats_than_row(self):
+        flight = sample_flight()
+
+        response = self.client.post(
+            ORDER_AUTO_ASSIGN_URL,
+            {"flight": flight.pk, "seats": 7, "adjacent": True},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_order_create_for_past_flights_forbidden(self):
         flight = sample_flight(departure_time=timezone.now() - timedelta(days=1))
@@ -228,3 +659,230 @@ class AuthenticatedOrderAPITests(TestCase):
 
         response = self.client.patch(ORDER_DETAIL_URL, data=data, format="json")
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        self.flight = sample_flight()
+        for user, seats in ((self.user, (1, 2)), (self.other_user, (3,))):
+            order = Order.objects.create(user=user)
+            for seat in seats:
+                Ticket.objects.create(
+                    row=1, seat=seat, flight=self.flight, order=order
+                )
+
+    def export(self, client_user, **params):
+        self.client.force_authenticate(client_user)
+        response = self.client.get(ORDER_EXPORT_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export(self.user))))
+
+        self.assertEqual([row["seat"] for row in rows], ["1", "2"])
+        self.assertEqual(rows[0]["user_email"], "test@test.com")
+        self.assertEqual(rows[0]["route"], "KRK - PMI")
+        self.assertEqual(rows[0]["flight_id"], str(self.flight.pk))
+        self.assertEqual(
+            rows[0]["departure_time"], self.flight.departure_time.isoformat()
+        )
+
+    def test_export_ndjson(self):
+        content = self.export(self.user, export_format="ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual([row["seat"] for row in rows], [1, 2])
+        self.assertEqual(rows[1]["route"], "KRK - PMI")
+
+    def test_export_invalid_format(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(ORDER_EXPORT_URL, {"export_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_exports_all_or_selected_users(self):
+        admin = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="test123",
+        )
+
+        everything = list(csv.DictReader(StringIO(self.export(admin))))
+        selected = list(
+            csv.DictReader(
+                StringIO(self.export(admin, user=self.other_user.pk))
+            )
+        )
+
+        self.assertEqual(len(everything), 3)
+        self.assertEqual(
+            [row["user_email"] for row in selected], ["other@test.com"]
+        )
+
+    def test_export_orders_command(self):
+        out = StringIO()
+
+        call_command(
+            "export_orders",
+            "--format",
+            "ndjson",
+            "--user",
+            str(self.other_user.pk),
+            "--chunk-size",
+            "1",
+            stdout=out
+        )
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["seat"] for row in rows], [3])
+
+
+class OrderHistoryQueryCountTests(TestCase):
+    """Order history reads take a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.flight = sample_flight(
+            airplane=Airplane.objects.create(
+                name="HISTORY",
+                rows=100,
+                seats_in_row=100,
+                airplane_type=AirplaneType.objects.create(name="Airbus"),
+            )
+        )
+        self.flight.crew.add(
+            Crew.objects.create(first_name="Anna", last_name="Nowak")
+        )
+
+    def create_user_with_orders(self, count):
+        user = get_user_model().objects.create_user(
+            email=f"history{count}@test.com",
+            password="test123",
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=user) for _ in range(count)
+        )
+        Ticket.objects.bulk_create(
+            Ticket(
+                order=order,
+                flight=self.flight,
+                row=index // 100 + 1,
+                seat=index % 100 + 1
+            )
+            for index, order in enumerate(orders)
+        )
+        return user, orders
+
+    def assert_history_queries(self, user, orders):
+        self.client.force_authenticate(user)
+        # ETag version, count, orders, tickets with flight, route and
+        # airports
+        with self.assertNumQueries(4):
+            response = self.client.get(ORDER_LIST_URL)
+        self.assertEqual(response.data["count"], len(orders))
+        self.assertEqual(
+            response.data["results"][0]["tickets"][0]["route"], "KRK - PMI"
+        )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(ORDER_LIST_URL, {"cursor": ""})
+        self.assertEqual(len(response.data["results"]), min(len(orders), 5))
+
+        # ETag version, order, tickets with their flight details, crew
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse("airport:order-detail", args=[orders[-1].pk])
+            )
+        self.assertEqual(
+            response.data["tickets"][0]["flight"]["crew"], ["Anna Nowak"]
+        )
+
+    def test_one_order(self):
+        self.assert_history_queries(*self.create_user_with_orders(1))
+
+    def test_hundred_orders(self):
+        self.assert_history_queries(*self.create_user_with_orders(100))
+
+    def test_ten_thousand_orders(self):
+        self.assert_history_queries(*self.create_user_with_orders(10_000))
+
+
+class ConcurrentOrderAPITests(TransactionTestCase):
+    def setUp(self):
+        self.flight = sample_flight()
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{index}@test.com",
+                password="test123",
+            )
+            for index in range(4)
+        ]
+
+    def book(self, user, barrier, results, **headers):
+        client = APIClient()
+        client.force_authenticate(user)
+        data = {
+            "tickets": [{"row": 1, "seat": 1, "flight": self.flight.pk}],
+        }
+        try:
+            barrier.wait()
+            results.append(
+                client.post(ORDER_LIST_URL, data, format="json", **headers)
+            )
+        finally:
+            connection.close()
+
+    def book_concurrently(self, users, **headers):
+        barrier = Barrier(len(users))
+        results = []
+        threads = [
+            Thread(
+                target=self.book,
+                args=(user, barrier, results),
+                kwargs=headers
+            )
+            for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_bookings_of_same_seat(self):
+        results = self.book_concurrently(self.users)
+
+        self.assertEqual(
+            sorted(response.status_code for response in results),
+            [status.HTTP_201_CREATED] + [status.HTTP_400_BAD_REQUEST] * 3
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_sold, 1)
+
+    def test_concurrent_duplicate_requests_coalesced(self):
+        results = self.book_concurrently(
+            [self.users[0]] * 4, HTTP_IDEMPOTENCY_KEY="k1"
+        )
+
+        self.assertEqual(
+            [response.status_code for response in results],
+            [status.HTTP_201_CREATED] * 4
+        )
+        self.assertEqual(
+            {response.data["id"] for response in results},
+            set(Order.objects.values_list("id", flat=True))
+        )
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(
+            sum("Idempotent-Replayed" in response for response in results), 3
+        )
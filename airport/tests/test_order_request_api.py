@@ -0,0 +1,233 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import (
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+    OrderRequest,
+    Ticket,
+)
+from airport.booking import book_tickets
+from airport.order_queue import drain_queue
+
+ORDER_REQUEST_LIST_URL = reverse("airport:order-request-list")
+
+
+def detail_url(order_request_id):
+    return reverse("airport:order-request-detail", args=[order_request_id])
+
+
+def sample_flight(name="BO1234"):
+    route, _ = Route.objects.get_or_create(
+        source=Airport.objects.get_or_create(
+            name="KRK", closest_big_city="Krakow"
+        )[0],
+        destination=Airport.objects.get_or_create(
+            name="PMI", closest_big_city="Palma"
+        )[0],
+        defaults={"distance": 1000}
+    )
+    airplane = Airplane.objects.create(
+        name=name,
+        rows=10,
+        seats_in_row=4,
+        airplane_type=AirplaneType.objects.get_or_create(name="Boeing")[0],
+    )
+    return Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time=timezone.now() + timedelta(days=1),
+        arrival_time=timezone.now() + timedelta(days=1, hours=3),
+    )
+
+
+def order_data(flight, *places):
+    return {
+        "tickets": [
+            {"row": row, "seat": seat, "flight": flight.pk}
+            for row, seat in places
+        ]
+    }
+
+
+class UnauthenticatedOrderRequestAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        response = self.client.post(ORDER_REQUEST_LIST_URL, {})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedOrderRequestAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def enqueue(self, *places):
+        return self.client.post(
+            ORDER_REQUEST_LIST_URL,
+            order_data(self.flight, *places),
+            format="json"
+        )
+
+    def test_order_request_accepted(self):
+        response = self.enqueue((1, 1), (1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(
+            response["Location"],
+            "http://testserver" + detail_url(response.data["id"])
+        )
+        self.assertEqual(response.data["status_url"], response["Location"])
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_order_request_unknown_flight_rejected(self):
+        response = self.client.post(
+            ORDER_REQUEST_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.pk + 1}]},
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(OrderRequest.objects.count(), 0)
+
+    def test_order_request_confirmed(self):
+        order_request_id = self.enqueue((1, 1), (1, 2)).data["id"]
+
+        self.assertEqual(drain_queue(), 1)
+
+        response = self.client.get(detail_url(order_request_id))
+        self.assertEqual(response.data["status"], "confirmed")
+        order = Order.objects.get(pk=response.data["order"])
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(order.tickets.count(), 2)
+        self.assertIsNotNone(response.data["processed_at"])
+
+    def test_order_request_rejected(self):
+        first_id = self.enqueue((1, 1)).data["id"]
+        second_id = self.enqueue((1, 2), (1, 1)).data["id"]
+        invalid_id = self.enqueue((11, 1)).data["id"]
+
+        drain_queue()
+
+        self.assertEqual(
+            self.client.get(detail_url(first_id)).data["status"],
+            "confirmed"
+        )
+        second = self.client.get(detail_url(second_id)).data
+        self.assertEqual(second["status"], "rejected")
+        self.assertIsNone(second["order"])
+        self.assertEqual(second["errors"]["tickets"][0], {})
+        self.assertIn("non_field_errors", second["errors"]["tickets"][1])
+        invalid = self.client.get(detail_url(invalid_id)).data
+        self.assertEqual(invalid["status"], "rejected")
+        self.assertIn("row", invalid["errors"]["tickets"][0])
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_order_request_failure_does_not_block_queue(self):
+        failing_id = self.enqueue((1, 1)).data["id"]
+        next_id = self.enqueue((1, 2)).data["id"]
+
+        with mock.patch(
+            "airport.serializers.book_tickets",
+            wraps=book_tickets,
+            side_effect=[RuntimeError("boom"), mock.DEFAULT]
+        ), self.assertLogs("airport.order_queue", "ERROR"):
+            self.assertEqual(drain_queue(), 2)
+
+        failing = self.client.get(detail_url(failing_id)).data
+        self.assertEqual(failing["status"], "rejected")
+        self.assertIsNone(failing["order"])
+        self.assertIn("detail", failing["errors"])
+        self.assertEqual(
+            self.client.get(detail_url(next_id)).data["status"],
+            "confirmed"
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_other_users_order_request_not_found(self):
+        order_request_id = self.enqueue((1, 1)).data["id"]
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(other_user)
+
+        response = self.client.get(detail_url(order_request_id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_process_order_queue_command(self):
+        self.enqueue((1, 1))
+        self.enqueue((1, 1))
+        out = StringIO()
+
+        call_command(
+            "process_order_queue", "--once", "--workers", "1", stdout=out
+        )
+
+        self.assertIn("Processed 2 order requests", out.getvalue())
+        self.assertEqual(
+            sorted(OrderRequest.objects.values_list("status", flat=True)),
+            ["confirmed", "rejected"]
+        )
+
+
+class OrderQueueWorkerTests(TransactionTestCase):
+    def test_workers_drain_queue_without_double_booking(self):
+        user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        flights = [sample_flight(f"BO{index}") for index in range(3)]
+        for index in range(30):
+            flight = flights[index % 3]
+            OrderRequest.objects.create(
+                user=user,
+                flight=flight,
+                payload=order_data(flight, (index % 5 + 1, 1))
+            )
+
+        call_command(
+            "process_order_queue",
+            "--once",
+            "--workers",
+            "4",
+            "--batch-size",
+            "3",
+            stdout=StringIO()
+        )
+
+        self.assertFalse(
+            OrderRequest.objects.filter(
+                status=OrderRequest.Status.PENDING
+            ).exists()
+        )
+        self.assertEqual(
+            OrderRequest.objects.filter(
+                status=OrderRequest.Status.CONFIRMED
+            ).count(),
+            Ticket.objects.count()
+        )
+        self.assertEqual(Ticket.objects.count(), 15)
+        for flight in flights:
+            flight.refresh_from_db()
+            self.assertEqual(flight.seats_sold, 5)
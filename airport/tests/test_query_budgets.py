@@ -0,0 +1,351 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.booking import hold_seats
+from airport.models import (
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Crew,
+    Flight,
+    Order,
+    OrderRequest,
+    Ticket,
+)
+from airport.query_budgets import (
+    QUERY_BUDGETS,
+    QueryBudgetExceeded,
+    query_budget,
+)
+from airport.urls import router
+
+ROWS = 7
+
+
+def routed_actions():
+    """Every "<basename>-<action>" served by the airport router"""
+    actions = set()
+    for prefix, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            for action in route.mapping.values():
+                if hasattr(viewset, action):
+                    actions.add(f"{basename}-{action}")
+    return actions
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Runs every API action against pages of several rows, each with
+    related rows, within its query budget
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="test123"
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="test123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+
+        self.airports = [
+            Airport.objects.create(
+                name=f"QB{index}", closest_big_city=f"City {index}"
+            )
+            for index in range(ROWS)
+        ]
+        self.routes = [
+            Route.objects.create(
+                source=self.airports[index],
+                destination=self.airports[(index + 1) % ROWS],
+                distance=500 + index
+            )
+            for index in range(ROWS)
+        ]
+        self.crew = [
+            Crew.objects.create(first_name=f"First{index}", last_name="Crew")
+            for index in range(ROWS)
+        ]
+        airplane_types = [
+            AirplaneType.objects.create(name=f"QB type {index}")
+            for index in range(2)
+        ]
+        self.airplanes = [
+            Airplane.objects.create(
+                name=f"QB-{index}",
+                rows=20,
+                seats_in_row=6,
+                airplane_type=airplane_types[index % 2]
+            )
+            for index in range(ROWS)
+        ]
+
+        self.departure = (timezone.now() + timedelta(days=1)).replace(
+            microsecond=0
+        )
+        self.flights = []
+        for index in range(ROWS):
+            flight = Flight.objects.create(
+                route=self.routes[index],
+                airplane=self.airplanes[index],
+                departure_time=self.departure + timedelta(hours=index),
+                arrival_time=self.departure + timedelta(hours=index + 2),
+            )
+            flight.crew.add(self.crew[index], self.crew[(index + 1) % ROWS])
+            self.flights.append(flight)
+
+        for index in range(ROWS):
+            order = Order.objects.create(user=self.user)
+            for seat, flight in enumerate(
+                    (self.flights[index], self.flights[-1]), start=1
+            ):
+                Ticket.objects.create(
+                    order=order, flight=flight, row=index + 1, seat=seat
+                )
+        self.order = order
+        self.hold = hold_seats(
+            self.user,
+            self.flights[0],
+            [(15, 1), (15, 2)],
+            timezone.now() + timedelta(minutes=10)
+        )
+        self.order_request = OrderRequest.objects.create(
+            user=self.user,
+            flight=self.flights[0],
+            payload={"tickets": []}
+        )
+
+    def flight_data(self, airplane, route, hours_after_last):
+        departure = self.departure + timedelta(hours=hours_after_last)
+        return {
+            "route": route.id,
+            "airplane": airplane.id,
+            "departure_time": departure.isoformat(),
+            "arrival_time": (departure + timedelta(hours=2)).isoformat(),
+            "crew": [self.crew[0].id, self.crew[1].id],
+        }
+
+    def request(self, name, method, url, data=None, admin=False):
+        client = self.admin_client if admin else self.client
+        with query_budget(name):
+            response = getattr(client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(
+            response.status_code, 400, getattr(response, "data", None)
+        )
+        self.exercised.add(name)
+        return response
+
+    def url(self, name, *args):
+        return reverse(f"airport:{name}", args=args)
+
+    def test_query_budgets(self):
+        self.exercised = set()
+        flight = self.flights[0]
+        day = timezone.localdate(self.departure)
+
+        for basename, obj in (
+                ("airport", self.airports[0]),
+                ("route", self.routes[0]),
+                ("crew", self.crew[0]),
+                ("airplanetype", self.airplanes[0].airplane_type),
+                ("airplane", self.airplanes[0]),
+                ("flight", flight),
+                ("order", self.order),
+        ):
+            self.request(
+                f"{basename}-list", "get", self.url(f"{basename}-list")
+            )
+            self.request(
+                f"{basename}-retrieve",
+                "get",
+                self.url(f"{basename}-detail", obj.id)
+            )
+
+        self.request(
+            "airport-create",
+            "post",
+            self.url("airport-list"),
+            {"name": "QBX", "closest_big_city": "X"},
+            admin=True
+        )
+        self.request(
+            "route-create",
+            "post",
+            self.url("route-list"),
+            {
+                "source": self.airports[0].id,
+                "destination": self.airports[2].id,
+                "distance": 900,
+            },
+            admin=True
+        )
+        crew_data = {"first_name": "New", "last_name": "Crew"}
+        new_crew = self.request(
+            "crew-create", "post", self.url("crew-list"), crew_data,
+            admin=True
+        ).data
+        crew_url = self.url("crew-detail", self.crew[-1].id)
+        self.request("crew-update", "put", crew_url, crew_data, admin=True)
+        self.request(
+            "crew-partial_update", "patch", crew_url, {"last_name": "Z"},
+            admin=True
+        )
+        self.request(
+            "airplanetype-create",
+            "post",
+            self.url("airplanetype-list"),
+            {"name": "QB type X"},
+            admin=True
+        )
+        self.request(
+            "airplane-create",
+            "post",
+            self.url("airplane-list"),
+            {
+                "name": "QB-X",
+                "rows": 10,
+                "seats_in_row": 4,
+                "airplane_type": self.airplanes[0].airplane_type.id,
+            },
+            admin=True
+        )
+        self.request(
+            "airplane-timeline",
+            "get",
+            self.url("airplane-timeline", self.airplanes[0].id)
+        )
+
+        self.request(
+            "flight-create",
+            "post",
+            self.url("flight-list"),
+            self.flight_data(self.airplanes[0], self.routes[1], 6),
+            admin=True
+        )
+        self.request(
+            "flight-bulk",
+            "post",
+            self.url("flight-bulk"),
+            {
+                "flights": [
+                    self.flight_data(self.airplanes[1], self.routes[2], 8),
+                    self.flight_data(self.airplanes[1], self.routes[3], 14),
+                ]
+            },
+            admin=True
+        )
+
+        self.request(
+            "order-create",
+            "post",
+            self.url("order-list"),
+            {
+                "tickets": [
+                    {"row": 20, "seat": 1, "flight": flight.id},
+                    {"row": 20, "seat": 2, "flight": self.flights[1].id},
+                ]
+            }
+        )
+        self.request(
+            "order-export",
+            "get",
+            f"{self.url('order-export')}?export_format=csv"
+        )
+        self.request(
+            "order-auto_assign",
+            "post",
+            self.url("order-auto-assign"),
+            {"flight": flight.id, "seats": 2}
+        )
+
+        self.request(
+            "order-request-create",
+            "post",
+            self.url("order-request-list"),
+            {"tickets": [{"row": 19, "seat": 1, "flight": flight.id}]}
+        )
+        self.request(
+            "order-request-retrieve",
+            "get",
+            self.url("order-request-detail", self.order_request.id)
+        )
+
+        self.request(
+            "seat-hold-create",
+            "post",
+            self.url("seat-hold-list"),
+            {"flight": flight.id, "seats": [{"row": 18, "seat": 1}]}
+        )
+        self.request(
+            "seat-hold-retrieve",
+            "get",
+            self.url("seat-hold-detail", self.hold.id)
+        )
+        self.request(
+            "seat-hold-confirm",
+            "post",
+            self.url("seat-hold-confirm", self.hold.id)
+        )
+        other_hold = hold_seats(
+            self.user,
+            flight,
+            [(17, 1)],
+            timezone.now() + timedelta(minutes=10)
+        )
+        self.request(
+            "seat-hold-destroy",
+            "delete",
+            self.url("seat-hold-detail", other_hold.id)
+        )
+
+        self.request(
+            "route-load-list",
+            "get",
+            f"{self.url('route-load-list')}"
+            f"?date_from={day}&date_to={day + timedelta(days=2)}",
+            admin=True
+        )
+        self.request(
+            "itinerary-list",
+            "get",
+            f"{self.url('itinerary-list')}?source={self.airports[0].id}"
+            f"&destination={self.airports[2].id}&date={day}"
+        )
+        self.request(
+            "cache-stats-list", "get", self.url("cache-stats-list"),
+            admin=True
+        )
+        self.request(
+            "crew-destroy",
+            "delete",
+            self.url("crew-detail", new_crew["id"]),
+            admin=True
+        )
+
+        self.assertEqual(self.exercised, set(QUERY_BUDGETS))
+
+    def test_every_action_has_a_budget(self):
+        self.assertEqual(set(QUERY_BUDGETS), routed_actions())
+
+    def test_exceeded_budget_reports_sql(self):
+        with self.assertRaisesMessage(
+                QueryBudgetExceeded,
+                'cache-stats-list ran 1 queries, over its budget of 0:\n'
+                '1. SELECT COUNT(*) AS "__count" FROM "airport_airport"'
+        ):
+            with query_budget("cache-stats-list"):
+                Airport.objects.count()
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.benchmarks import (
+    compare_results,
+    measure_request,
+    percentile,
+    read_scenarios,
+)
+from airport.datasets import DatasetGenerator
+from airport.models import Order
+
+
+class BenchmarkHelperTests(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_compare_results(self):
+        previous = {
+            "small/flights-list": {"p50_ms": 10, "p95_ms": 20, "queries": 3},
+            "small/removed": {"p50_ms": 1, "p95_ms": 1, "queries": 1},
+        }
+        current = {
+            "small/flights-list": {"p50_ms": 11, "p95_ms": 30, "queries": 4},
+            "small/added": {"p50_ms": 1, "p95_ms": 1, "queries": 1},
+        }
+
+        self.assertEqual(
+            compare_results(previous, current, threshold=0.2),
+            [
+                ("small/flights-list", "p95_ms", 20, 30),
+                ("small/flights-list", "queries", 3, 4),
+            ]
+        )
+
+
+class ReadScenarioTests(TestCase):
+    def test_read_scenarios_succeed(self):
+        DatasetGenerator(
+            airports=6,
+            airplanes=3,
+            flights_per_airplane=5,
+            users=2,
+            orders=20,
+        ).generate()
+        customer = Order.objects.first().user
+        admin = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="test123"
+        )
+        clients = {}
+        for is_admin, user in ((False, customer), (True, admin)):
+            clients[is_admin] = APIClient()
+            clients[is_admin].force_authenticate(user)
+
+        for name, path, is_admin in read_scenarios(customer):
+            with self.subTest(name):
+                result = measure_request(clients[is_admin], path, 2)
+
+                self.assertEqual(result["status"], status.HTTP_200_OK)
+                self.assertGreater(result["bytes"], 2)
+                self.assertLessEqual(result["p50_ms"], result["p95_ms"])
@@ -0,0 +1,326 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from threading import Barrier, BrokenBarrierError, Thread, local
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.models import (
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+    RouteDailyLoad,
+    Ticket,
+)
+
+ROUTE_LOAD_URL = reverse("airport:route-load-list")
+FLIGHT_BULK_URL = reverse("airport:flight-bulk")
+ORDER_LIST_URL = reverse("airport:order-list")
+DAY = datetime(2030, 5, 1, 8, tzinfo=timezone.utc)
+
+
+class RouteLoadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(self.admin)
+
+        krk = Airport.objects.create(name="KRK", closest_big_city="Krakow")
+        pmi = Airport.objects.create(name="PMI", closest_big_city="Palma")
+        self.route = Route.objects.create(
+            source=krk, destination=pmi, distance=1000
+        )
+        self.back_route = Route.objects.create(
+            source=pmi, destination=krk, distance=1000
+        )
+        airplane_type = AirplaneType.objects.create(name="Boeing")
+        self.airplanes = [
+            Airplane.objects.create(
+                name=f"BO{index}",
+                rows=10,
+                seats_in_row=4,
+                airplane_type=airplane_type,
+            )
+            for index in range(2)
+        ]
+
+    def create_flight(self, airplane, route, departure_time):
+        return Flight.objects.create(
+            route=route,
+            airplane=airplane,
+            departure_time=departure_time,
+            arrival_time=departure_time + timedelta(hours=3),
+        )
+
+    def book(self, flight, *seats):
+        order = Order.objects.create(user=self.admin)
+        for seat in seats:
+            Ticket.objects.create(row=1, seat=seat, flight=flight, order=order)
+
+    def load(self, route, date):
+        return RouteDailyLoad.objects.get(route=route, date=date)
+
+    def test_flight_creation_adds_capacity(self):
+        self.create_flight(self.airplanes[0], self.route, DAY)
+        self.create_flight(self.airplanes[1], self.route, DAY)
+
+        load = self.load(self.route, DAY.date())
+        self.assertEqual(load.flights, 2)
+        self.assertEqual(load.capacity, 80)
+        self.assertEqual(load.seats_sold, 0)
+
+    def test_bulk_flight_creation_adds_capacity(self):
+        response = self.client.post(
+            FLIGHT_BULK_URL,
+            {
+                "flights": [
+                    {
+                        "route": route.id,
+                        "airplane": self.airplanes[0].id,
+                        "departure_time": departure_time,
+                        "arrival_time": departure_time + timedelta(hours=3),
+                    }
+                    for route, departure_time in (
+                        (self.route, DAY),
+                        (self.back_route, DAY + timedelta(hours=8)),
+                        (self.route, DAY + timedelta(days=1)),
+                    )
+                ]
+            },
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(
+                RouteDailyLoad.objects
+                .order_by("date", "route")
+                .values_list("route", "date", "flights", "capacity")
+            ),
+            [
+                (self.route.id, DAY.date(), 1, 40),
+                (self.back_route.id, DAY.date(), 1, 40),
+                (self.route.id, DAY.date() + timedelta(days=1), 1, 40),
+            ]
+        )
+
+    def test_ticket_changes_update_seats_sold(self):
+        flight = self.create_flight(self.airplanes[0], self.route, DAY)
+        self.book(flight, 1, 2, 3)
+        Ticket.objects.filter(seat=3).delete()
+
+        self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 2, "seat": 1, "flight": flight.id}]},
+            format="json"
+        )
+
+        self.assertEqual(self.load(self.route, DAY.date()).seats_sold, 3)
+
+    def test_flight_deletion_removes_capacity_and_seats_sold(self):
+        flight = self.create_flight(self.airplanes[0], self.route, DAY)
+        self.create_flight(
+            self.airplanes[1], self.route, DAY + timedelta(hours=2)
+        )
+        self.book(flight, 1, 2)
+
+        flight.delete()
+
+        load = self.load(self.route, DAY.date())
+        self.assertEqual(
+            (load.flights, load.capacity, load.seats_sold), (1, 40, 0)
+        )
+
+    def test_rebuild_route_loads_command(self):
+        flight = self.create_flight(self.airplanes[0], self.route, DAY)
+        self.book(flight, 1, 2)
+        RouteDailyLoad.objects.all().delete()
+        out = StringIO()
+
+        call_command("rebuild_route_loads", stdout=out)
+
+        self.assertIn("Rebuilt 1 route daily loads", out.getvalue())
+        load = self.load(self.route, DAY.date())
+        self.assertEqual(
+            (load.flights, load.capacity, load.seats_sold), (1, 40, 2)
+        )
+
+    def test_route_load_by_day(self):
+        first = self.create_flight(self.airplanes[0], self.route, DAY)
+        self.create_flight(
+            self.airplanes[1], self.route, DAY + timedelta(days=1)
+        )
+        self.book(first, 1, 2, 3, 4)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                ROUTE_LOAD_URL,
+                {
+                    "route": str(self.route.id),
+                    "date_from": "2030-01-01",
+                    "date_to": "2030-12-31",
+                }
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(
+            [row["date"] for row in results], ["2030-05-01", "2030-05-02"]
+        )
+        self.assertEqual(results[0]["full_route"], "KRK - PMI")
+        self.assertEqual(results[0]["load_factor"], 0.1)
+        self.assertEqual(results[1]["load_factor"], 0)
+
+    def test_route_load_by_route(self):
+        first = self.create_flight(self.airplanes[0], self.route, DAY)
+        self.create_flight(
+            self.airplanes[1], self.route, DAY + timedelta(days=1)
+        )
+        self.create_flight(
+            self.airplanes[0], self.back_route, DAY + timedelta(hours=6)
+        )
+        self.book(first, 1, 2, 3, 4)
+
+        response = self.client.get(
+            ROUTE_LOAD_URL,
+            {
+                "date_from": "2030-05-01",
+                "date_to": "2030-05-31",
+                "group_by": "route",
+            }
+        )
+
+        self.assertEqual(
+            [
+                (row["route"], row["flights"], row["capacity"])
+                for row in response.data["results"]
+            ],
+            [(self.route.id, 2, 80), (self.back_route.id, 1, 40)]
+        )
+        self.assertEqual(response.data["results"][0]["load_factor"], 0.05)
+
+    def test_route_load_invalid_range(self):
+        response = self.client.get(
+            ROUTE_LOAD_URL,
+            {"date_from": "2030-01-01", "date_to": "2031-06-01"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_route_load_admin_only(self):
+        user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(user)
+
+        response = self.client.get(
+            ROUTE_LOAD_URL,
+            {"date_from": "2030-01-01", "date_to": "2030-12-31"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ConcurrentRouteLoadTests(TransactionTestCase):
+    def setUp(self):
+        krk = Airport.objects.create(name="KRK", closest_big_city="Krakow")
+        pmi = Airport.objects.create(name="PMI", closest_big_city="Palma")
+        routes = [
+            Route.objects.create(source=krk, destination=pmi, distance=1000),
+            Route.objects.create(source=pmi, destination=krk, distance=1000),
+        ]
+        airplane_type = AirplaneType.objects.create(name="Boeing")
+        # flight ids ascend while the route-days alternate
+        self.flights = [
+            Flight.objects.create(
+                route=routes[index in (1, 2)],
+                airplane=Airplane.objects.create(
+                    name=f"BO{index}",
+                    rows=10,
+                    seats_in_row=4,
+                    airplane_type=airplane_type,
+                ),
+                departure_time=DAY,
+                arrival_time=DAY + timedelta(hours=3),
+            )
+            for index in range(4)
+        ]
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{index}@test.com", password="test123"
+            )
+            for index in range(2)
+        ]
+
+    def book(self, user, flights, results):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            results.append(
+                client.post(
+                    ORDER_LIST_URL,
+                    {
+                        "tickets": [
+                            {"row": 1, "seat": 1, "flight": flight.id}
+                            for flight in flights
+                        ]
+                    },
+                    format="json"
+                )
+            )
+        finally:
+            connection.close()
+
+    def test_orders_crossing_route_days_do_not_deadlock(self):
+        first, second, third, fourth = self.flights
+        barrier = Barrier(2)
+        calls = local()
+        add = RouteDailyLoad.add
+
+        def add_and_wait(*args, **kwargs):
+            add(*args, **kwargs)
+            if not getattr(calls, "waited", False):
+                # let the other order write its first rollup row too
+                calls.waited = True
+                try:
+                    barrier.wait(timeout=1)
+                except BrokenBarrierError:
+                    pass
+
+        results = []
+        with mock.patch.object(RouteDailyLoad, "add", add_and_wait):
+            threads = [
+                Thread(
+                    target=self.book,
+                    args=(self.users[0], [first, second], results)
+                ),
+                Thread(
+                    target=self.book,
+                    args=(self.users[1], [third, fourth], results)
+                ),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            [response.status_code for response in results],
+            [status.HTTP_201_CREATED] * 2
+        )
+        self.assertEqual(
+            sorted(RouteDailyLoad.objects.values_list("seats_sold", flat=True)),
+            [2, 2]
+        )
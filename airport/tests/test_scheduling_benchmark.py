@@ -0,0 +1,32 @@
+from django.test import TestCase
+from rest_framework import status
+
+from airport.benchmarks import run_scheduling_benchmark, scaling_summary
+from airport.models import Flight, Route
+
+
+class SchedulingBenchmarkTests(TestCase):
+    def test_scheduling_benchmark(self):
+        results = run_scheduling_benchmark(
+            histories=(3, 12), fanouts=(2, 7), iterations=2
+        )
+
+        self.assertEqual(
+            list(results), ["history/3", "history/12", "fanout/2", "fanout/7"]
+        )
+        for key in ("history/3", "history/12"):
+            self.assertEqual(results[key]["status"], status.HTTP_201_CREATED)
+        for key in ("fanout/2", "fanout/7"):
+            self.assertEqual(
+                results[key]["status"], status.HTTP_400_BAD_REQUEST
+            )
+        self.assertGreater(
+            results["fanout/7"]["bytes"], results["fanout/2"]["bytes"]
+        )
+        # created flights are rolled back
+        self.assertEqual(Flight.objects.count(), 12 + 1)
+        self.assertEqual(Route.objects.count(), 3 + 7)
+        self.assertEqual(
+            [name for name, *_ in scaling_summary(results)],
+            ["history", "fanout"]
+        )
@@ -0,0 +1,272 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.booking import MAX_HELD_SEATS_PER_FLIGHT
+from airport.models import (
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Flight,
+    Order,
+    SeatHold,
+    Ticket,
+)
+
+SEAT_HOLD_LIST_URL = reverse("airport:seat-hold-list")
+ORDER_LIST_URL = reverse("airport:order-list")
+
+
+def detail_url(hold_id):
+    return reverse("airport:seat-hold-detail", args=[hold_id])
+
+
+def confirm_url(hold_id):
+    return reverse("airport:seat-hold-confirm", args=[hold_id])
+
+
+def flight_detail_url(flight_id):
+    return reverse("airport:flight-detail", args=[flight_id])
+
+
+def sample_flight():
+    route = Route.objects.create(
+        source=Airport.objects.create(name="KRK", closest_big_city="Krakow"),
+        destination=Airport.objects.create(
+            name="PMI", closest_big_city="Palma"
+        ),
+        distance=1000
+    )
+    airplane = Airplane.objects.create(
+        name="BO1234",
+        rows=10,
+        seats_in_row=4,
+        airplane_type=AirplaneType.objects.create(name="Boeing"),
+    )
+    return Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time=timezone.now() + timedelta(days=1),
+        arrival_time=timezone.now() + timedelta(days=1, hours=3),
+    )
+
+
+class UnauthenticatedSeatHoldAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        response = self.client.post(SEAT_HOLD_LIST_URL, {})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedSeatHoldAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def hold(self, *places, **params):
+        data = {
+            "flight": self.flight.pk,
+            "seats": [{"row": row, "seat": seat} for row, seat in places],
+        }
+        data.update(params)
+        return self.client.post(SEAT_HOLD_LIST_URL, data, format="json")
+
+    def expire(self, hold_id):
+        past = timezone.now() - timedelta(minutes=1)
+        SeatHold.objects.filter(pk=hold_id).update(expires_at=past)
+        Flight.objects.filter(pk=self.flight.pk).update(holds_expire_at=past)
+
+    def test_hold_seats(self):
+        response = self.hold((1, 1), (1, 2), ttl=5)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.data["seats"],
+            [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}]
+        )
+        hold = SeatHold.objects.get(pk=response.data["id"])
+        self.assertAlmostEqual(
+            hold.expires_at - hold.created_at,
+            timedelta(minutes=5),
+            delta=timedelta(seconds=5)
+        )
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 2)
+        self.assertEqual(self.flight.seats_available, 38)
+        self.assertEqual(self.flight.holds_expire_at, hold.expires_at)
+
+    def test_held_seats_shown_as_taken(self):
+        self.hold((2, 3))
+
+        response = self.client.get(flight_detail_url(self.flight.pk))
+
+        self.assertEqual(response.data["tickets_available"], 39)
+        self.assertEqual(response.data["taken_places"], [{"row": 2, "seat": 3}])
+
+    def test_hold_taken_or_held_seat_rejected(self):
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=order)
+        self.hold((1, 2))
+
+        response = self.hold((1, 1), (1, 2), (1, 3))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["seats"][2], {})
+        self.assertIn("non_field_errors", response.data["seats"][0])
+        self.assertIn("non_field_errors", response.data["seats"][1])
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_hold_seat_outside_airplane_rejected(self):
+        response = self.hold((11, 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_for_held_seat_rejected(self):
+        self.hold((1, 1))
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(other_user)
+
+        response = self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.pk}]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Ticket.objects.count(), 0)
+
+    def test_confirm_hold(self):
+        hold_id = self.hold((1, 1), (1, 2)).data["id"]
+
+        response = self.client.post(confirm_url(hold_id))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(
+            list(order.tickets.values_list("row", "seat")),
+            [(1, 1), (1, 2)]
+        )
+        self.assertFalse(SeatHold.objects.exists())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 0)
+        self.assertEqual(self.flight.seats_sold, 2)
+        self.assertEqual(self.flight.seats_available, 38)
+
+    def test_confirm_expired_hold_rejected(self):
+        hold_id = self.hold((1, 1)).data["id"]
+        self.expire(hold_id)
+
+        response = self.client.post(confirm_url(hold_id))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_release_hold(self):
+        hold_id = self.hold((1, 1)).data["id"]
+
+        response = self.client.delete(detail_url(hold_id))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(SeatHold.objects.exists())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 0)
+        self.assertEqual(self.flight.seats_available, 40)
+        self.assertIsNone(self.flight.holds_expire_at)
+
+    def test_other_users_hold_not_found(self):
+        hold_id = self.hold((1, 1)).data["id"]
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(other_user)
+
+        self.assertEqual(
+            self.client.post(confirm_url(hold_id)).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(
+            self.client.delete(detail_url(hold_id)).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+    def test_expired_hold_released_on_booking(self):
+        hold_id = self.hold((1, 1)).data["id"]
+        self.expire(hold_id)
+
+        response = self.client.post(
+            ORDER_LIST_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.pk}]},
+            format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 0)
+        self.assertEqual(self.flight.seats_sold, 1)
+        self.assertEqual(self.flight.seats_available, 39)
+
+    def test_expired_hold_hidden_on_flight_retrieve(self):
+        hold_id = self.hold((1, 1)).data["id"]
+        self.expire(hold_id)
+
+        response = self.client.get(flight_detail_url(self.flight.pk))
+
+        self.assertEqual(response.data["tickets_available"], 40)
+        self.assertEqual(response.data["taken_places"], [])
+        self.assertNotIn("ETag", response)
+        self.assertTrue(SeatHold.objects.filter(pk=hold_id).exists())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 1)
+
+    def test_held_seats_per_user_capped(self):
+        places = [(row, seat) for row in (1, 2, 3) for seat in (1, 2, 3, 4)]
+        self.assertEqual(
+            self.hold(*places[:MAX_HELD_SEATS_PER_FLIGHT]).status_code,
+            status.HTTP_201_CREATED
+        )
+
+        response = self.hold(places[MAX_HELD_SEATS_PER_FLIGHT])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("seats", response.data)
+
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test123",
+        )
+        self.client.force_authenticate(other_user)
+        response = self.hold(places[MAX_HELD_SEATS_PER_FLIGHT])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_release_expired_holds_command(self):
+        expired_id = self.hold((1, 1)).data["id"]
+        self.hold((1, 2))
+        self.expire(expired_id)
+        out = StringIO()
+
+        call_command("release_expired_holds", stdout=out)
+
+        self.assertIn("Released 1 held seats", out.getvalue())
+        self.assertEqual(SeatHold.objects.count(), 1)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.seats_held, 1)
+        self.assertIsNotNone(self.flight.holds_expire_at)
@@ -7,7 +7,12 @@ from airport.views import (
     AirplaneTypeViewSet,
     AirplaneViewSet,
     FlightViewSet,
-    OrderViewSet
+    ItineraryViewSet,
+    OrderViewSet,
+    OrderRequestViewSet,
+    ResponseCacheStatsViewSet,
+    RouteLoadViewSet,
+    SeatHoldViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -18,6 +23,15 @@ router.register("airplane-types", AirplaneTypeViewSet)
 router.register("airplanes", AirplaneViewSet)
 router.register("flights", FlightViewSet)
 router.register("orders", OrderViewSet)
+router.register(
+    "order-requests", OrderRequestViewSet, basename="order-request"
+)
+router.register("seat-holds", SeatHoldViewSet, basename="seat-hold")
+router.register("route-loads", RouteLoadViewSet, basename="route-load")
+router.register("itineraries", ItineraryViewSet, basename="itinerary")
+router.register(
+    "cache-stats", ResponseCacheStatsViewSet, basename="cache-stats"
+)
 
 
 urlpatterns = router.urls
@@ -1,10 +1,38 @@
-from django.db.models import F, Count
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import (
+    Prefetch,
+    Sum,
+    prefetch_related_objects,
+)
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import mixins
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 
+from airport.booking import confirm_hold, hide_expired_holds, release_hold
+from airport.caching import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    get_model_versions,
+    get_response_cache_stats,
+    get_user_orders_version,
+)
+from airport.exports import (
+    EXPORT_CONTENT_TYPES,
+    EXPORT_FORMATS,
+    iter_export,
+)
+from airport.idempotency import IdempotentCreateMixin
+from airport.itineraries import search_itineraries
 from airport.models import (
     Airport,
     Route,
@@ -12,9 +40,19 @@ from airport.models import (
     AirplaneType,
     Airplane,
     Flight,
-    Order
+    SeatHold,
+    Ticket,
+    Order,
+    OrderRequest,
+    RouteDailyLoad
+)
+from airport.pagination import (
+    KeysetPaginationMixin,
+    FlightKeysetPagination,
+    OrderKeysetPagination,
 )
 from airport.permissions import IsAdminOrIfAuthenticatedReadOnly
+from airport.scheduling import get_airplane_timeline
 from airport.serializers import (
     AirportSerializer,
     RouteSerializer,
@@ -25,17 +63,30 @@ from airport.serializers import (
     AirplaneSerializer,
     AirplaneListSerializer,
     AirplaneDetailSerializer,
+    AirplaneTimelineFlightSerializer,
     FlightListSerializer,
     FlightSerializer,
     FlightDetailSerializer,
+    FlightSeatMapDetailSerializer,
+    FlightBulkSerializer,
+    ItinerarySearchSerializer,
+    ItinerarySerializer,
     OrderSerializer,
     OrderListSerializer,
     OrderDetailSerializer,
     CrewListSerializer,
+    SeatHoldSerializer,
+    OrderRequestSerializer,
+    AutoSeatOrderSerializer,
+    RouteLoadQuerySerializer,
+    RouteDailyLoadSerializer,
+    RouteLoadTotalSerializer,
+    ResponseCacheStatsSerializer,
 )
 
 
 class AirportViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -51,25 +102,43 @@ def _params_to_ints(qs):
     return [int(str_id) for str_id in qs.split(",")]
 
 
+def _param_to_day_range(value, param_name):
+    """Converts a YYYY-MM-DD string to a half-open [start, end) range"""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError(
+            {param_name: "Date must be in the format YYYY-MM-DD."}
+        ) from None
+    return _day_range(day)
+
+
+def _day_range(day):
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    return day_start, day_start + timedelta(days=1)
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 5
     max_page_size = 100
 
 
 class RouteViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
 ):
     queryset = Route.objects.select_related("source", "destination")
+    cache_models = (Route, Airport)
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
     def get_queryset(self):
         source = self.request.query_params.get("source")
         destination = self.request.query_params.get("destination")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if source:
             source_ids = _params_to_ints(source)
@@ -79,7 +148,7 @@ class RouteViewSet(
             destination_ids = _params_to_ints(destination)
             queryset = queryset.filter(destination__id__in=destination_ids)
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -105,10 +174,10 @@ class RouteViewSet(
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(self, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
 
 
-class CrewViewSet(ModelViewSet):
+class CrewViewSet(CachedResponseMixin, ModelViewSet):
     queryset = Crew.objects.all()
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
 
@@ -119,6 +188,7 @@ class CrewViewSet(ModelViewSet):
 
 
 class AirplaneTypeViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -130,23 +200,83 @@ class AirplaneTypeViewSet(
 
 
 class AirplaneViewSet(
+    CachedResponseMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
 ):
     queryset = Airplane.objects.select_related("airplane_type")
+    cache_models = (Airplane, AirplaneType)
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    timeline_default_range = timedelta(days=31)
+    timeline_max_range = timedelta(days=366)
 
     def get_serializer_class(self):
         if self.action == "list":
             return AirplaneListSerializer
         elif self.action == "retrieve":
             return AirplaneDetailSerializer
+        elif self.action == "timeline":
+            return AirplaneTimelineFlightSerializer
         return AirplaneSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="date_from",
+                description="First departure date, ex. 2024-01-01 "
+                            "(defaults to today, or 31 days before "
+                            "`date_to`)",
+                required=False,
+                type=str
+            ),
+            OpenApiParameter(
+                name="date_to",
+                description="Last departure date, ex. 2024-01-31 "
+                            "(defaults to 31 days after `date_from`); "
+                            "the range is limited to 366 days",
+                required=False,
+                type=str
+            )
+        ],
+        responses={200: AirplaneTimelineFlightSerializer(many=True)}
+    )
+    @action(detail=True, methods=["get"])
+    def timeline(self, request, pk=None):
+        """Flight chain with turnaround times and rule violations"""
+        date_from = request.query_params.get("date_from")
+        date_to = request.query_params.get("date_to")
+        if date_from:
+            date_from = _param_to_day_range(date_from, "date_from")[0]
+        if date_to:
+            date_to = _param_to_day_range(date_to, "date_to")[1]
+
+        if not date_from:
+            date_from = (
+                date_to - self.timeline_default_range
+                if date_to
+                else _day_range(timezone.localdate())[0]
+            )
+        if not date_to:
+            date_to = date_from + self.timeline_default_range
+        if date_to - date_from > self.timeline_max_range:
+            raise ValidationError(
+                {
+                    "date_to": f"The date range cannot exceed "
+                               f"{self.timeline_max_range.days} days."
+                }
+            )
+
+        airplane = self.get_object()
+        timeline = get_airplane_timeline(airplane.id, date_from, date_to)
+        serializer = self.get_serializer(timeline, many=True)
+        return Response(serializer.data)
+
 
 class FlightViewSet(
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -154,28 +284,52 @@ class FlightViewSet(
 ):
     queryset = (
         Flight.objects
-        .select_related("route", "airplane")
+        .select_related("route__source", "route__destination", "airplane")
         .prefetch_related("crew")
         .order_by("departure_time", "arrival_time")
-        .annotate(
-            tickets_available=(
-                F("airplane__rows") * F("airplane__seats_in_row")
-                - Count("tickets")
-            )
-        )
     )
     pagination_class = StandardResultsSetPagination
+    keyset_pagination_class = FlightKeysetPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    etag_actions = ("retrieve",)
+
+    def get_etag_data(self, request, *args, **kwargs):
+        flight = (
+            Flight.objects
+            .filter(pk=kwargs["pk"])
+            .values("version", "holds_expire_at")
+            .first()
+        )
+        # Until expired holds are purged the response changes without a
+        # version bump, so it is not cached by clients in the meantime
+        if flight is None or (
+                flight["holds_expire_at"]
+                and flight["holds_expire_at"] <= timezone.now()
+        ):
+            return None
+        return flight["version"], get_model_versions(
+            (Route, Airport, Airplane, Crew)
+        )
+
+    def get_object(self):
+        flight = super().get_object()
+        if self.action == "retrieve":
+            hide_expired_holds(flight)
+        return flight
 
     def get_queryset(self):
         departure_date = self.request.query_params.get("date")
         source = self.request.query_params.get("source")
         destination = self.request.query_params.get("destination")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if departure_date:
-            queryset = queryset.filter(departure_time__date=departure_date)
+            day_start, day_end = _param_to_day_range(departure_date, "date")
+            queryset = queryset.filter(
+                departure_time__gte=day_start,
+                departure_time__lt=day_end
+            )
 
         if source:
             source_ids = _params_to_ints(source)
@@ -187,13 +341,17 @@ class FlightViewSet(
                 route__destination__id__in=destination_ids
             )
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
             return FlightListSerializer
         elif self.action == "retrieve":
+            if self.request.query_params.get("seat_format") == "bitmap":
+                return FlightSeatMapDetailSerializer
             return FlightDetailSerializer
+        elif self.action == "bulk":
+            return FlightBulkSerializer
         return FlightSerializer
 
     @extend_schema(
@@ -215,39 +373,369 @@ class FlightViewSet(
                 description="Filter by destination airport id",
                 required=False,
                 type=str
+            ),
+            OpenApiParameter(
+                name="cursor",
+                description="Switch to keyset pagination; "
+                            "pass an empty value for the first page",
+                required=False,
+                type=str
             )
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(self, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="seat_format",
+                description="Pass `bitmap` to get a compact base64 "
+                            "`seat_map` instead of the `taken_places` list",
+                required=False,
+                type=str
+            )
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(responses={201: FlightSerializer(many=True)})
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Schedule many flights, validating each airplane's chain at once"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        flights = serializer.save()
+
+        prefetch_related_objects(flights, "crew")
+        return Response(
+            FlightSerializer(flights, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class ResponseCacheStatsViewSet(GenericViewSet):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=ResponseCacheStatsSerializer)
+    def list(self, request, *args, **kwargs):
+        return Response(get_response_cache_stats())
+
+
+class RouteLoadPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class RouteLoadViewSet(GenericViewSet):
+    """Route load factors from the daily rollup, without touching tickets"""
+
+    queryset = RouteDailyLoad.objects.select_related(
+        "route__source", "route__destination"
+    )
+    serializer_class = RouteDailyLoadSerializer
+    pagination_class = RouteLoadPagination
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        parameters=[RouteLoadQuerySerializer],
+        responses={200: RouteDailyLoadSerializer(many=True)}
+    )
+    def list(self, request, *args, **kwargs):
+        query = RouteLoadQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        queryset = self.get_queryset().filter(
+            date__gte=params["date_from"],
+            date__lte=params["date_to"]
+        )
+        if params.get("route"):
+            queryset = queryset.filter(
+                route__id__in=_params_to_ints(params["route"])
+            )
+
+        serializer_class = RouteDailyLoadSerializer
+        if params["group_by"] == "route":
+            queryset = (
+                queryset
+                .order_by("route")
+                .values("route")
+                .annotate(
+                    flights=Sum("flights"),
+                    seats_sold=Sum("seats_sold"),
+                    capacity=Sum("capacity"),
+                )
+            )
+            serializer_class = RouteLoadTotalSerializer
+
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ItineraryViewSet(GenericViewSet):
+    serializer_class = ItinerarySerializer
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(parameters=[ItinerarySearchSerializer])
+    def list(self, request, *args, **kwargs):
+        search = ItinerarySearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        day_start, day_end = _day_range(params["date"])
+        itineraries = search_itineraries(
+            params["source"].id,
+            params["destination"].id,
+            day_start,
+            day_end,
+            params["max_legs"],
+            timedelta(minutes=params["min_connection"]),
+            timedelta(minutes=params["max_connection"]),
+            params["seats"],
+            params["limit"],
+        )
+
+        prefetch_related_objects(
+            [leg for itinerary in itineraries for leg in itinerary.legs],
+            "crew"
+        )
+        serializer = self.get_serializer(itineraries, many=True)
+        return Response(serializer.data)
 
 
 class OrderViewSet(
+    IdempotentCreateMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
 ):
-    queryset = (
-        Order.objects
-        .prefetch_related(
-            "tickets__flight__route",
-            "tickets__flight__airplane",
-            "tickets__flight__crew"
-        )
-    )
+    queryset = Order.objects.all()
     pagination_class = StandardResultsSetPagination
+    keyset_pagination_class = OrderKeysetPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self.action == "list":
+            tickets = (
+                Ticket.objects
+                .select_related(
+                    "flight__route__source",
+                    "flight__route__destination"
+                )
+                .only(
+                    "row",
+                    "seat",
+                    "order",
+                    "flight__departure_time",
+                    "flight__arrival_time",
+                    "flight__route__source__name",
+                    "flight__route__destination__name",
+                )
+            )
+            return (
+                queryset
+                .only("id", "created_at")
+                .prefetch_related(Prefetch("tickets", queryset=tickets))
+            )
+
+        if self.action == "retrieve":
+            tickets = (
+                Ticket.objects
+                .select_related(
+                    "flight__route__source",
+                    "flight__route__destination",
+                    "flight__airplane"
+                )
+                .prefetch_related("flight__crew")
+            )
+            return queryset.prefetch_related(
+                Prefetch("tickets", queryset=tickets)
+            )
+
+        return queryset
+
+    def get_etag_data(self, request, *args, **kwargs):
+        return (
+            request.user.pk,
+            get_user_orders_version(request.user.pk),
+            get_model_versions((Route, Airport, Airplane, Crew)),
+        )
 
     def get_serializer_class(self):
         if self.action == "list":
             return OrderListSerializer
         elif self.action == "retrieve":
             return OrderDetailSerializer
+        elif self.action == "auto_assign":
+            return AutoSeatOrderSerializer
         return OrderSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                description="Switch to keyset pagination; "
+                            "pass an empty value for the first page",
+                required=False,
+                type=str
+            )
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="Idempotency-Key",
+                location=OpenApiParameter.HEADER,
+                description="Unique key of the order request; retries "
+                            "with the same key replay the first response",
+                required=False,
+                type=str
+            )
+        ]
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="export_format",
+                description="`csv` (default) or `ndjson`",
+                required=False,
+                type=str
+            ),
+            OpenApiParameter(
+                name="user",
+                description="Admins only: export the orders of these "
+                            "user ids instead of every order",
+                required=False,
+                type=str
+            )
+        ],
+        responses={
+            (200, "text/csv"): OpenApiTypes.STR,
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+        }
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream every ticket of the order history as CSV or NDJSON"""
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {
+                    "export_format":
+                        f"Must be one of: {', '.join(EXPORT_FORMATS)}."
+                }
+            )
+
+        orders = Order.objects.filter(user=request.user)
+        if request.user.is_staff:
+            users = request.query_params.get("user")
+            orders = None
+            if users:
+                orders = Order.objects.filter(
+                    user__id__in=_params_to_ints(users)
+                )
+
+        response = StreamingHttpResponse(
+            iter_export(orders, export_format),
+            content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="orders.{export_format}"'
+        )
+        return response
+
+    @extend_schema(responses={201: OrderSerializer})
+    @action(detail=False, methods=["post"], url_path="auto-assign")
+    def auto_assign(self, request):
+        """Book the best available seats on a flight, picked server-side"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save(user=request.user)
+        return Response(
+            OrderSerializer(order).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class OrderRequestViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    GenericViewSet
+):
+    """
+    Asynchronous order intake: requests are queued and booked by the
+    `process_order_queue` workers; poll the returned URL for the result.
+    """
+
+    serializer_class = OrderRequestSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return OrderRequest.objects.none()
+        return OrderRequest.objects.filter(user=self.request.user)
+
+    @extend_schema(responses={202: OrderRequestSerializer})
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_request = serializer.save(user=request.user)
+        status_url = reverse(
+            "airport:order-request-detail",
+            args=[order_request.id],
+            request=request
+        )
+        return Response(
+            {**serializer.data, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": status_url}
+        )
+
+
+class SeatHoldViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet
+):
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return SeatHold.objects.none()
+        return SeatHold.objects.filter(user=self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        release_hold(instance)
+
+    @extend_schema(request=None, responses={201: OrderSerializer})
+    @action(detail=True, methods=["post"])
+    def confirm(self, request, pk=None):
+        """Book the held seats as an order"""
+        order = confirm_hold(self.get_object())
+        return Response(
+            OrderSerializer(order).data,
+            status=status.HTTP_201_CREATED
+        )
@@ -95,6 +95,25 @@ DATABASES = {
     }
 }
 
+# Response cache versions and hit statistics must be shared by every
+# process (web workers and management commands), so a Redis cache is used
+# when REDIS_URL is set. Without it each process keeps its own local
+# memory cache: writes made by management commands do not invalidate the
+# cached responses of running servers and the stats are per process.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
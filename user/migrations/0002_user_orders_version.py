@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-16 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='orders_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -43,6 +43,7 @@ class UserManager(BaseUserManager):
 class User(AbstractUser):
     username = None
     email = models.EmailField(_("email address"), unique=True)
+    orders_version = models.PositiveBigIntegerField(default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []